@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark ``cosmikase search`` queries on a config scaled up to many items.
+
+The config's items are copied (with numbered names) until it holds ``--items``
+items, the index is built, saved and loaded as the CLI does, and then each
+query is timed:
+
+    scripts/bench-config-search.py cosmikase.yaml --items 50000 rip "code editor"
+"""
+
+import argparse
+import copy
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from cosmikase.config import load_config
+from cosmikase.itemindex import ItemIndex, config_items
+
+DEFAULT_QUERIES = ["ripgrep", "rip", "r", "code editor", "apt core", "firefx"]
+
+
+def scale(config: dict, items: int) -> dict:
+    """``config`` with every item list repeated until it holds ``items`` items."""
+    have = sum(1 for _ in config_items(config))
+    copies = max(1, -(-items // max(have, 1)))
+    scaled = copy.deepcopy(config)
+    lists = [value for value in scaled.values() if isinstance(value, list)]
+    for value in scaled.values():
+        if isinstance(value, dict):
+            lists.extend(items for items in value.values() if isinstance(items, list))
+    for items_list in lists:
+        original = list(items_list)
+        for n in range(1, copies):
+            for item in original:
+                if isinstance(item, dict):
+                    key = "name" if "name" in item else "id"
+                    if key in item:
+                        items_list.append({**item, key: f"{item[key]}-{n}"})
+                elif isinstance(item, str):
+                    items_list.append(f"{item}-{n}")
+    return scaled
+
+
+def timed(func, rounds: int) -> list[float]:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("config", nargs="?", default="cosmikase.yaml", help="Config to scale")
+    parser.add_argument("queries", nargs="*", help=f"Queries (default: {DEFAULT_QUERIES})")
+    parser.add_argument("--items", type=int, default=50_000, help="Items to scale up to")
+    parser.add_argument("--rounds", "-r", type=int, default=200, help="Rounds per query")
+    parser.add_argument("--limit", type=int, default=20, help="Results per query")
+    args = parser.parse_args()
+
+    config = scale(load_config(Path(args.config)), args.items)
+    start = time.perf_counter()
+    index = ItemIndex.build(config)
+    built = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "index.json"
+        index.save(path)
+        start = time.perf_counter()
+        index = ItemIndex.load(path)
+        loaded = time.perf_counter() - start
+        size = path.stat().st_size
+
+    print(f"{len(index)} items, {len(index.vocabulary)} words, {size / 1e6:.1f} MB index")
+    print(f"build {built * 1000:.0f} ms, load {loaded * 1000:.0f} ms")
+    for query in args.queries or DEFAULT_QUERIES:
+        # The first fuzzy query builds the fuzzy index; time the steady state
+        hits = index.search(query, limit=args.limit)
+        times = timed(lambda q=query: index.search(q, limit=args.limit), args.rounds)
+        median = statistics.median(times)
+        print(
+            f"{query!r:<16} median {median * 1000:7.3f} ms  (min {min(times) * 1000:.3f} ms)"
+            f"  {len(hits)} hits"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmark packed (.ctheme) themes against the directory layout.
+
+Each round lists the themes, loads every manifest and reads every file, which
+is roughly what the previewer, search index and sync do. Run it against the
+installed themes directory on the filesystem you care about (e.g. NFS):
+
+    scripts/bench-theme-packs.py ~/.local/share/cosmikase/themes --rounds 20
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from cosmikase import pack
+from cosmikase.pack import open_pack, pack_theme
+from cosmikase.themes import discover_theme_dirs, list_themes, load_manifest, resolve_theme
+
+
+def scan_directories(base: Path) -> int:
+    total = 0
+    for name in list_themes(base):
+        theme = base / name
+        load_manifest(theme)
+        for path in theme.rglob("*"):
+            if path.is_file():
+                total += len(path.read_bytes())
+    return total
+
+
+def scan_packs(base: Path) -> int:
+    # Measure cold opens, not the process-wide mapping cache
+    pack._open_cached.cache_clear()
+    total = 0
+    for name in list_themes(base):
+        theme = resolve_theme(base, name)
+        load_manifest(theme)
+        packed = open_pack(theme)
+        for member in packed.names():
+            view = packed.view(member)
+            total += len(view)
+            view.release()
+    return total
+
+
+def bench(label: str, func, base: Path, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(base)
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    print(f"{label:<12} median {median * 1000:8.2f} ms  (min {min(times) * 1000:.2f} ms)")
+    return median
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("themes_dir", nargs="?", help="Themes directory (default: discovered)")
+    parser.add_argument("--rounds", "-r", type=int, default=10, help="Rounds per layout")
+    parser.add_argument(
+        "--packs-dir", help="Where to write packs (default: temporary, next to themes)"
+    )
+    args = parser.parse_args()
+
+    if args.themes_dir:
+        base = Path(args.themes_dir).expanduser()
+    else:
+        dirs = discover_theme_dirs()
+        if not dirs:
+            print("No theme directories found", file=sys.stderr)
+            return 1
+        base = dirs[0]
+
+    names = [name for name in list_themes(base) if (base / name).is_dir()]
+    # Keep the packs on the same filesystem as the directories for a fair comparison
+    with tempfile.TemporaryDirectory(dir=args.packs_dir or base.parent) as tmp:
+        packs = Path(tmp)
+        for name in names:
+            pack_theme(base / name, packs)
+        if scan_directories(base) != scan_packs(packs):
+            print("Packed and directory contents differ", file=sys.stderr)
+            return 1
+
+        print(f"{len(names)} themes in {base}")
+        directory = bench("directories", scan_directories, base, args.rounds)
+        packed = bench("packs", scan_packs, packs, args.rounds)
+        print(f"speedup      {directory / packed:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ import sys
 
 # Add src to path to use discover_theme_dirs
 sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from cosmikase.colors import extract_palette
 from cosmikase.themes import discover_theme_dirs
 
 
@@ -62,9 +63,7 @@ def migrate_theme(theme_path: Path):
     manifest = {
         "name": theme_path.name.replace("-", " ").title(),
         "variant": "light" if is_light else "dark",
-        "colors": {
-            # Placeholder for common colors if we can extract them from RON files later
-        }
+        "colors": extract_palette(theme_path),
     }
     
     if cursor_data:
@@ -0,0 +1,217 @@
+"""In-process theme application pipeline.
+
+Mirrors ``bin/cosmikase-theme`` without re-entering bash: the theme history,
+chezmoi data, editor settings, COSMIC config and terminal reloads are all
+handled in Python, and only ``chezmoi`` (and editor CLIs for missing
+extensions) are spawned. Each stage reports progress through a callback and
+the pipeline can be cancelled between and during stages.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import signal
+import subprocess
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from cosmikase.chezmoi import read_config, update_chezmoi_data
+from cosmikase.cosmic import apply_cosmic_theme
+from cosmikase.editors import apply_editor_theme, read_cursor_theme
+from cosmikase.pack import is_pack, materialize
+from cosmikase.rendercache import RenderCache
+from cosmikase.terminals import describe, reload_terminals
+from cosmikase.themes import discover_theme_dirs, resolve_theme
+
+HISTORY_LIMIT = 20
+
+# How often a running subprocess is checked for cancellation (seconds)
+_POLL_INTERVAL = 0.1
+
+
+class ApplyError(Exception):
+    """A required stage of the theme pipeline failed."""
+
+
+class ApplyCancelled(ApplyError):
+    """The pipeline was cancelled before it finished."""
+
+
+@dataclass
+class ApplyProgress:
+    stage: str
+    message: str
+    step: int
+    total: int
+
+    def __str__(self) -> str:
+        return f"[{self.step}/{self.total}] {self.message}"
+
+
+@dataclass
+class ApplyOptions:
+    chezmoi: bool = True
+    chezmoi_apply: bool = True
+    cursor: bool = True
+    cosmic: bool = True
+    terminals: bool = True
+    render_cache: bool = True
+
+
+def history_file() -> Path:
+    return Path.home() / ".config" / "cosmikase" / "theme-history"
+
+
+def save_theme_history(theme: str) -> None:
+    """Append ``theme`` to the history file, keeping the last 20 distinct switches."""
+    path = history_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entries = path.read_text().splitlines() if path.exists() else []
+    if entries and entries[-1] == theme:
+        return
+    entries = [*entries, theme][-HISTORY_LIMIT:]
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text("\n".join(entries) + "\n")
+    tmp_path.replace(path)
+
+
+def _run(
+    cmd: list[str],
+    cancelled: Callable[[], bool] | None,
+    env: dict[str, str] | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run ``cmd``, terminating its process group if ``cancelled()`` becomes true."""
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        start_new_session=True,
+    )
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=_POLL_INTERVAL)
+            return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            if cancelled and cancelled():
+                with contextlib.suppress(ProcessLookupError):
+                    os.killpg(proc.pid, signal.SIGTERM)
+                proc.communicate()
+                raise ApplyCancelled(f"Cancelled while running {cmd[0]}") from None
+
+
+def apply_theme(
+    theme: str,
+    themes_dir: Path | None = None,
+    options: ApplyOptions | None = None,
+    on_progress: Callable[[ApplyProgress], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> list[str]:
+    """Switch to ``theme``, reporting each stage through ``on_progress``.
+
+    Args:
+        theme: Theme name.
+        themes_dir: Directory containing themes (default: auto-discover).
+        options: Which stages to run.
+        on_progress: Called with an ApplyProgress before each stage.
+        cancelled: Polled between and during stages; returning True aborts.
+
+    Returns:
+        Warnings from non-fatal stages (editors, COSMIC, terminals), as in
+        cosmikase-theme.
+
+    Raises:
+        ApplyError: If the theme is missing or chezmoi fails.
+        ApplyCancelled: If ``cancelled()`` returned True.
+    """
+    options = options or ApplyOptions()
+    if themes_dir is None:
+        dirs = discover_theme_dirs()
+        if not dirs:
+            raise ApplyError("No theme directories found")
+        themes_dir = dirs[0]
+    theme_path = resolve_theme(themes_dir, theme)
+    if is_pack(theme_path):
+        # chezmoi templates and the COSMIC wallpaper need real files
+        themes_dir = materialize(theme_path)
+    elif not theme_path.is_dir():
+        raise ApplyError(f"Theme '{theme}' not found in {themes_dir}")
+
+    stages: list[tuple[str, str, Callable[[], str | None]]] = [
+        ("history", "Saving theme history...", lambda: save_theme_history(theme)),
+    ]
+
+    if options.chezmoi:
+
+        def update_data() -> None:
+            if not update_chezmoi_data(theme, str(themes_dir)):
+                raise ApplyError("Failed to update chezmoi configuration")
+
+        def chezmoi_apply() -> None:
+            cmd = ["chezmoi", "apply", "--force"]
+            cache = data = None
+            misses: list[str] = []
+            if options.render_cache:
+                cache = RenderCache()
+                data = read_config().get("data", {})
+                _, misses = cache.write_hits(data)
+                hits = [template for template in cache.templates if template not in misses]
+                if hits:
+                    # chezmoi applies everything but the files written from the cache
+                    cmd += cache.ignore_args(hits)
+            try:
+                result = _run(cmd, cancelled)
+            except FileNotFoundError:
+                raise ApplyError("chezmoi not found. Please install chezmoi first.") from None
+            if result.returncode != 0:
+                raise ApplyError(f"chezmoi apply failed: {result.stderr.strip()}")
+            if cache is not None and data is not None and misses:
+                cache.store_targets(data, misses)
+
+        stages.append(("chezmoi-data", "Updating chezmoi configuration...", update_data))
+        if options.chezmoi_apply:
+            stages.append(("chezmoi-apply", "Applying dotfiles...", chezmoi_apply))
+
+    def editors() -> str | None:
+        try:
+            parsed = read_cursor_theme(themes_dir / theme)
+        except ValueError as e:
+            return str(e)
+        if parsed is None:
+            return None
+        results = apply_editor_theme(*parsed)
+        return "; ".join(result.warning for result in results if result.warning) or None
+
+    if options.cursor:
+        stages.append(("cursor", "Applying Cursor theme...", editors))
+
+    def cosmic() -> str | None:
+        try:
+            apply_cosmic_theme(themes_dir / theme)
+        except (OSError, ValueError) as e:
+            return f"COSMIC theme failed: {e}"
+        return None
+
+    if options.cosmic:
+        stages.append(("cosmic", "Applying COSMIC theme...", cosmic))
+
+    def terminals() -> str | None:
+        failed = [describe(result) for result in reload_terminals() if result.failed]
+        return "; ".join(failed) or None
+
+    if options.terminals:
+        stages.append(("terminals", "Reloading terminals...", terminals))
+
+    warnings: list[str] = []
+    for step, (stage, message, action) in enumerate(stages, start=1):
+        if cancelled and cancelled():
+            raise ApplyCancelled(f"Cancelled before {stage}")
+        if on_progress:
+            on_progress(ApplyProgress(stage, message, step, len(stages)))
+        warning = action()
+        if warning:
+            warnings.append(warning)
+    return warnings
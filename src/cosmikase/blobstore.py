@@ -0,0 +1,186 @@
+"""Content-addressed store for theme wallpapers and previews.
+
+Images are stored once under ``~/.local/share/cosmikase/blobs`` by SHA-256 and
+linked back into theme directories, so identical backgrounds shared by several
+themes (or by the repo and the installed copy) occupy disk space once.
+``themes sync`` links the images it installs from the store as well.
+
+Links are hardlinks where possible, reflinks (``FICLONE``) across hardlink
+boundaries where the filesystem supports them, and plain copies otherwise.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cosmikase.images import IMAGE_SUFFIXES
+
+# ioctl request number for FICLONE (linux/fs.h)
+_FICLONE = 0x40049409
+_HASH_CHUNK = 1024 * 1024
+
+
+def default_store_dir() -> Path:
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(base) / "cosmikase" / "blobs"
+
+
+def file_digest(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def iter_images(root: Path) -> Iterator[Path]:
+    """Yield image files (wallpapers, previews) below ``root``."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if not name.startswith(".") and name.lower().endswith(IMAGE_SUFFIXES):
+                yield Path(dirpath) / name
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        fcntl.ioctl(fdest.fileno(), _FICLONE, fsrc.fileno())
+
+
+def link_or_copy(src: Path, dest: Path) -> str:
+    """Atomically make ``dest`` share ``src``'s content.
+
+    Returns:
+        The method used: "hardlink", "reflink" or "copy".
+    """
+    tmp = dest.with_name(f".{dest.name}.blobtmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            try:
+                _reflink(src, tmp)
+                method = "reflink"
+            except OSError:
+                shutil.copyfile(src, tmp)
+                method = "copy"
+        os.replace(tmp, dest)
+        return method
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+@dataclass
+class DedupeStats:
+    files: int = 0
+    unique: int = 0
+    bytes_saved: int = 0
+    methods: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class GcStats:
+    blobs: int = 0
+    removed: int = 0
+    bytes_freed: int = 0
+
+
+class BlobStore:
+    """Blobs live at ``<root>/<first two hex digits>/<sha256>``."""
+
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = root or default_store_dir()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path_for(digest).is_file()
+
+    def blobs(self) -> Iterator[Path]:
+        if self.root.is_dir():
+            yield from (p for p in self.root.glob("??/*") if not p.name.startswith("."))
+
+    def add(self, path: Path, digest: str | None = None) -> str:
+        """Store ``path``'s content (if not already stored) and return its digest."""
+        digest = digest or file_digest(path)
+        blob = self.path_for(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            # The mode is left alone: a hardlinked blob shares it with the themes' files
+            link_or_copy(path, blob)
+        return digest
+
+    def link(self, digest: str, dest: Path) -> str:
+        """Replace ``dest`` with a link to the stored blob; returns the method used."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        return link_or_copy(self.path_for(digest), dest)
+
+    def dedupe(self, roots: Iterable[Path], jobs: int | None = None) -> DedupeStats:
+        """Move every image below ``roots`` into the store and link it back."""
+        images = [image for root in roots for image in iter_images(root)]
+        stats = DedupeStats(files=len(images))
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            digests = list(pool.map(file_digest, images))
+
+        for image, digest in zip(images, digests, strict=True):
+            blob = self.path_for(digest)
+            if not blob.exists():
+                # The first copy of each image becomes the blob
+                self.add(image, digest)
+                continue
+            stat = image.stat()
+            if os.path.samestat(stat, blob.stat()):
+                continue
+            method = self.link(digest, image)
+            stats.methods[method] = stats.methods.get(method, 0) + 1
+            if method != "copy":
+                stats.bytes_saved += stat.st_size
+        stats.unique = len(set(digests))
+        return stats
+
+    def gc(self, roots: Iterable[Path] = (), dry_run: bool = False) -> GcStats:
+        """Remove blobs no longer linked from any theme.
+
+        A blob with other hardlinks is in use. Blobs without hardlinks are kept
+        only if a file below ``roots`` has the same content (reflinks and copies
+        can't be detected through the link count).
+        """
+        stats = GcStats()
+        candidates: list[tuple[Path, int]] = []
+        for blob in self.blobs():
+            stats.blobs += 1
+            stat = blob.stat()
+            if stat.st_nlink <= 1:
+                candidates.append((blob, stat.st_size))
+        if not candidates:
+            return stats
+
+        referenced: set[str] = set()
+        images = [image for root in roots for image in iter_images(root)]
+        with ThreadPoolExecutor() as pool:
+            referenced.update(pool.map(file_digest, images))
+
+        for blob, size in candidates:
+            if blob.name in referenced:
+                continue
+            stats.removed += 1
+            stats.bytes_freed += size
+            if not dry_run:
+                blob.unlink(missing_ok=True)
+                with contextlib.suppress(OSError):
+                    blob.parent.rmdir()
+        return stats
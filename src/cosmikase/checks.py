@@ -0,0 +1,200 @@
+"""Evaluate installer ``check`` commands concurrently, with a cache.
+
+An installer's ``check`` names the binary that shows it is installed. The
+binary is looked up on PATH (plus the per-user dirs installers write to) and
+then run with ``--version`` (``version`` for go and zig); nvm, a shell function, is checked through
+``nvm.sh``. All checks run at once as asyncio subprocesses, each with its own
+timeout, so a slow one (``nvm`` sourcing its scripts, a cold ``--version``)
+no longer holds up the others.
+
+Results are cached for a TTL, keyed by the binary's path and mtime, so
+re-running after an upgrade re-checks just that tool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import signal
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_TTL = 24 * 60 * 60
+
+# Binaries that print their version without ``--version`` (an item's
+# ``version_args`` overrides this)
+VERSION_ARGS = {"go": ["version"], "zig": ["version"]}
+
+
+def search_path(home: Path | None = None) -> str:
+    """PATH including the per-user dirs the installers put binaries in."""
+    home = home or Path.home()
+    extra = [home / ".local" / "bin", home / ".cargo" / "bin", home / ".bun" / "bin"]
+    return os.pathsep.join([*map(str, extra), os.environ.get("PATH", "")])
+
+
+@dataclass
+class CheckResult:
+    name: str
+    check: str | None
+    installed: bool = False
+    path: str | None = None
+    version: str | None = None
+    error: str | None = None
+    cached: bool = False
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def check_command(item: dict[str, Any], home: Path | None = None) -> tuple[Path, list[str]] | None:
+    """The file a check depends on and the command that verifies it, or None if absent."""
+    home = home or Path.home()
+    if item.get("method") == "custom_nvm":
+        nvm_sh = home / ".nvm" / "nvm.sh"
+        if not nvm_sh.is_file():
+            return None
+        return nvm_sh, ["bash", "-c", f'. "{nvm_sh}" && nvm --version']
+    check = item.get("check")
+    binary = shutil.which(check, path=search_path(home)) if check else None
+    if binary is None:
+        return None
+    args = item.get("version_args") or VERSION_ARGS.get(check, ["--version"])
+    return Path(binary), [binary, *args]
+
+
+class CheckCache:
+    """Check results keyed by binary path and mtime, valid for ``ttl`` seconds."""
+
+    def __init__(self, path: Path | None = None, ttl: float = DEFAULT_TTL) -> None:
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        try:
+            self._entries: dict[str, Any] = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, binary: Path, mtime_ns: int) -> dict[str, Any] | None:
+        entry = self._entries.get(str(binary))
+        if not entry or entry.get("mtime_ns") != mtime_ns:
+            return None
+        if time.time() - entry.get("checked", 0) > self.ttl:
+            return None
+        return entry
+
+    def put(self, binary: Path, mtime_ns: int, result: CheckResult) -> None:
+        self._entries[str(binary)] = {
+            "mtime_ns": mtime_ns,
+            "checked": time.time(),
+            "installed": result.installed,
+            "version": result.version,
+            "error": result.error,
+        }
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            tmp_path.write_text(json.dumps(self._entries, sort_keys=True))
+            tmp_path.replace(self.path)
+        except OSError:
+            pass  # Only a cache
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "cosmikase" / "checks.json"
+
+
+async def _run(argv: list[str], timeout: float) -> tuple[bool, str]:
+    """Run ``argv``; (succeeded, first output line or error)."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+    except OSError as e:
+        return False, str(e)
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        # Kill the whole group: children left holding the pipe would block
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+        await process.wait()
+        return False, f"timed out after {timeout:g}s"
+    lines = stdout.decode(errors="replace").strip().splitlines()
+    first = lines[0].strip() if lines else ""
+    if process.returncode != 0:
+        return False, f"exit status {process.returncode}" + (f": {first}" if first else "")
+    return True, first
+
+
+async def _evaluate(
+    items: list[dict[str, Any]],
+    timeout: float,
+    cache: CheckCache,
+    home: Path | None,
+    refresh: bool,
+) -> list[CheckResult]:
+    async def evaluate(item: dict[str, Any]) -> CheckResult:
+        result = CheckResult(item["name"], item.get("check"))
+        found = check_command(item, home)
+        if found is None:
+            return result
+        binary, argv = found
+        result.path = str(binary)
+        try:
+            mtime_ns = binary.stat().st_mtime_ns
+        except OSError as e:
+            result.error = str(e)
+            return result
+
+        entry = None if refresh else cache.get(binary, mtime_ns)
+        if entry is not None:
+            result.installed = entry["installed"]
+            result.version = entry["version"]
+            result.error = entry.get("error")
+            result.cached = True
+            return result
+
+        ok, output = await _run(argv, timeout)
+        result.installed = ok
+        if ok:
+            result.version = output or None
+        else:
+            result.error = output
+        if ok or not output.startswith("timed out"):
+            cache.put(binary, mtime_ns, result)
+        return result
+
+    return list(await asyncio.gather(*(evaluate(item) for item in items)))
+
+
+def evaluate_checks(
+    items: Iterable[dict[str, Any]],
+    timeout: float = DEFAULT_TIMEOUT,
+    cache: CheckCache | None = None,
+    home: Path | None = None,
+    refresh: bool = False,
+) -> list[CheckResult]:
+    """Check every installer item concurrently.
+
+    An item counts as installed when its binary exists and ``--version``
+    succeeds within ``timeout`` seconds. Items without a ``check`` are
+    reported as not installed. Timeouts are not cached.
+    """
+    cache = cache or CheckCache()
+    results = asyncio.run(_evaluate(list(items), timeout, cache, home, refresh))
+    cache.save()
+    return results
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import os
+import re
 from pathlib import Path
 from typing import Any
 
@@ -14,9 +16,134 @@ except ImportError:
     import tomli as tomllib
 
 
+# Keys written to [data] when they are missing
+DEFAULTS: dict[str, Any] = {"font_family": "JetBrainsMono Nerd Font", "font_size": 9, "padding": 14}
+
+_TABLE_RE = re.compile(r"^[ \t]*\[.*$", re.MULTILINE)
+_DATA_TABLE_RE = re.compile(r"^[ \t]*\[[ \t]*(?:data|\"data\"|'data')[ \t]*\][ \t]*(?:#.*)?$", re.M)
+_KEY_RE = re.compile(
+    r"^(?P<indent>[ \t]*)(?P<key>[A-Za-z0-9_-]+|\"[^\"\n]*\"|'[^'\n]*')[ \t]*=[ \t]*", re.M
+)
+_TRAILER_RE = re.compile(r"[ \t]*(?:#.*)?$", re.M)
+
+
+def config_path() -> Path:
+    return Path.home() / ".config" / "chezmoi" / "chezmoi.toml"
+
+
+def read_config() -> dict[str, Any]:
+    """Parsed chezmoi.toml, or an empty dict if it is missing or invalid."""
+    try:
+        with open(config_path(), "rb") as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+
+
+def _toml_value(value: Any) -> str:
+    return tomli_w.dumps({"v": value})[4:].rstrip("\n")
+
+
+def _value_end(text: str, pos: int) -> int | None:
+    """End of the single-line TOML value starting at ``pos``, or None if unsupported."""
+    if text.startswith(('"""', "'''"), pos) or text[pos : pos + 1] in ("[", "{", ""):
+        return None
+    if text[pos] == '"':
+        i = pos + 1
+        while i < len(text) and text[i] not in '"\n':
+            i += 2 if text[i] == "\\" else 1
+        return i + 1 if text[i : i + 1] == '"' else None
+    if text[pos] == "'":
+        close = text.find("'", pos + 1)
+        newline = text.find("\n", pos)
+        return close + 1 if close >= 0 and (newline < 0 or close < newline) else None
+    end = pos
+    while end < len(text) and text[end] not in " \t#\r\n":
+        end += 1
+    return end
+
+
+def _splice_data(text: str, values: dict[str, Any]) -> str | None:
+    """Set ``values`` in the ``[data]`` table of ``text``, touching nothing else.
+
+    Existing keys have just their value replaced; new keys are added after the
+    table's last key. Comments, ordering and formatting are preserved. Returns
+    None if the document has a shape this editor doesn't handle.
+    """
+    header = _DATA_TABLE_RE.search(text)
+    if header is None:
+        lines = "".join(f"{key} = {_toml_value(value)}\n" for key, value in values.items())
+        if not text or text.endswith("\n\n"):
+            separator = ""
+        else:
+            separator = "\n" if text.endswith("\n") else "\n\n"
+        return f"{text}{separator}[data]\n{lines}"
+
+    next_table = _TABLE_RE.search(text, header.end())
+    span_end = next_table.start() if next_table else len(text)
+    edits: list[tuple[int, int, str]] = []
+    remaining = dict(values)
+    indent = ""
+    insert_at = text.find("\n", header.end())
+    insert_at = len(text) if insert_at < 0 else insert_at + 1
+
+    for match in _KEY_RE.finditer(text, header.end(), span_end):
+        key = match.group("key").strip("\"'")
+        indent = match.group("indent")
+        end = _value_end(text, match.end())
+        if end is None:
+            if key in values:
+                return None
+            continue
+        line_end = _TRAILER_RE.match(text, end)
+        if line_end is None or line_end.end() > span_end:
+            return None
+        insert_at = min(line_end.end() + 1, len(text))
+        if key in remaining:
+            edits.append((match.end(), end, _toml_value(remaining.pop(key))))
+
+    if remaining:
+        lines = "".join(f"{indent}{key} = {_toml_value(val)}\n" for key, val in remaining.items())
+        prefix = "" if text[insert_at - 1 : insert_at] in ("\n", "") else "\n"
+        edits.append((insert_at, insert_at, prefix + lines))
+
+    for start, end, replacement in sorted(edits, reverse=True):
+        text = text[:start] + replacement + text[end:]
+    return text
+
+
+def _parses_to(text: str, expected: dict[str, Any]) -> bool:
+    try:
+        return tomllib.loads(text) == expected
+    except tomllib.TOMLDecodeError:
+        return False
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write ``content`` to ``path`` via an fsync'd temporary file and rename."""
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
 def update_chezmoi_data(theme: str, themes_dir: str) -> bool:
     """Safely update chezmoi.toml [data] section.
 
+    Only the changed values are spliced into the existing file, so comments and
+    formatting survive. If nothing changes the file is not written at all.
+
     Args:
         theme: Theme name to set.
         themes_dir: Directory containing themes.
@@ -24,19 +151,21 @@ def update_chezmoi_data(theme: str, themes_dir: str) -> bool:
     Returns:
         True if successful, False otherwise.
     """
-    config_path = Path.home() / ".config" / "chezmoi" / "chezmoi.toml"
+    path = config_path()
 
     # Ensure directory exists
-    config_path.parent.mkdir(parents=True, exist_ok=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
 
+    text = ""
     data: dict[str, Any] = {}
 
     # Read existing config
-    if config_path.exists():
+    if path.exists():
         try:
-            with open(config_path, "rb") as f:
-                data = tomllib.load(f)
-        except tomllib.TOMLDecodeError as e:
+            with open(path, "rb") as f:
+                text = f.read().decode()
+            data = tomllib.loads(text)
+        except (tomllib.TOMLDecodeError, UnicodeDecodeError) as e:
             print(f"Error: chezmoi.toml has invalid TOML syntax: {e}")
             print("Please fix the file manually or remove it to start fresh.")
             return False
@@ -47,30 +176,27 @@ def update_chezmoi_data(theme: str, themes_dir: str) -> bool:
             print(f"Error reading chezmoi config: {e}")
             return False
 
-    # Update [data] section
-    if "data" not in data:
-        data["data"] = {}
-
-    data["data"]["theme"] = theme
-    data["data"]["themes_dir"] = themes_dir
+    current = data.get("data", {})
+    if not isinstance(current, dict):
+        print("Error: chezmoi.toml 'data' is not a table")
+        return False
+    values = {"theme": theme, "themes_dir": themes_dir}
+    missing = {key: val for key, val in DEFAULTS.items() if key not in current}
+    changed = {key: val for key, val in values.items() if current.get(key) != val}
+    if not changed and not missing:
+        return True
 
-    # Set some defaults if they don't exist
-    defaults = {"font_family": "JetBrainsMono Nerd Font", "font_size": 9, "padding": 14}
-    for key, val in defaults.items():
-        if key not in data["data"]:
-            data["data"][key] = val
+    expected = {**data, "data": {**current, **values, **missing}}
+    new_text = _splice_data(text, {**changed, **missing})
+    if new_text is None or not _parses_to(new_text, expected):
+        # Unusual layout (inline or dotted tables, multi-line values): rewrite it all
+        new_text = tomli_w.dumps(expected)
 
-    # Write atomically
-    tmp_path = config_path.with_suffix(".tmp")
     try:
-        with open(tmp_path, "wb") as f:
-            tomli_w.dump(data, f)
-        tmp_path.replace(config_path)
+        _write_atomic(path, new_text.encode())
         return True
     except Exception as e:
         print(f"Error writing chezmoi config: {e}")
-        if tmp_path.exists():
-            tmp_path.unlink()
         return False
 
 
@@ -7,14 +7,56 @@ combining theme management, configuration, and validation commands.
 from __future__ import annotations
 
 import argparse
+import contextlib
+import json
+import os
+import shutil
 import subprocess
 import sys
+import time
 from pathlib import Path
 
-from cosmikase.chezmoi import update_chezmoi_data
-from cosmikase.config import get_value, load_config
+from cosmikase.apply import ApplyError, ApplyOptions, apply_theme
+from cosmikase.blobstore import BlobStore
+from cosmikase.checks import DEFAULT_TIMEOUT as CHECK_TIMEOUT
+from cosmikase.checks import DEFAULT_TTL as CHECK_TTL
+from cosmikase.checks import CheckCache, evaluate_checks
+from cosmikase.chezmoi import DEFAULTS as CHEZMOI_DEFAULTS
+from cosmikase.chezmoi import read_config as read_chezmoi_config
+from cosmikase.colors import extract_all
+from cosmikase.config import LayerError, get_value, load_config
+from cosmikase.config import provenance as config_provenance
+from cosmikase.cosmic import CosmicConfig, apply_cosmic_theme
+from cosmikase.downloads import MIRROR_ENV, DownloadCache, DownloadError
+from cosmikase.editors import (
+    EDITORS,
+    apply_editor_theme,
+    default_extensions_file,
+    install_extensions,
+    parse_extensions_file,
+    read_cursor_theme,
+)
+from cosmikase.fleet import changed_hosts, evaluate_fleet, hosts_enabling, read_report
+from cosmikase.ghostty import GhosttyBuildError, build_ghostty
+from cosmikase.install import BACKENDS as PACKAGE_BACKENDS
+from cosmikase.install import DryRunBackend, install_packages
+from cosmikase.installers import build_graph as build_installer_graph
+from cosmikase.installers import installer_items
+from cosmikase.installers import run_graph as run_installer_graph
+from cosmikase.installers import waterfall as installer_waterfall
+from cosmikase.itemindex import load_index as load_item_index
+from cosmikase.pack import is_pack, materialize, pack_theme, unpack_theme
+from cosmikase.plan import BACKENDS as PLAN_BACKENDS
+from cosmikase.plan import plan as plan_packages
+from cosmikase.rendercache import RenderCache
 from cosmikase.schema import validate_config
-from cosmikase.themes import discover_theme_dirs, find_theme_cli, list_themes
+from cosmikase.sync import sync_themes
+from cosmikase.terminals import TERMINALS, reload_terminals
+from cosmikase.terminals import describe as describe_reload
+from cosmikase.themes import discover_theme_dirs, list_themes, resolve_theme
+from cosmikase.update import plan_update, sudo_keepalive
+
+CONFIG_HELP = "Config file path; repeat to layer files from base to host (default: cosmikase.yaml)"
 
 
 def cmd_theme(args: argparse.Namespace) -> int:
@@ -43,38 +85,71 @@ def cmd_theme(args: argparse.Namespace) -> int:
         print(f"Available: {', '.join(available)}")
         return 1
 
-    # Update chezmoi configuration
-    if not update_chezmoi_data(args.name, str(themes_dir)):
-        print("Error: Failed to update chezmoi configuration", file=sys.stderr)
+    options = ApplyOptions(
+        chezmoi_apply=not args.no_apply,
+        cursor=not args.no_helpers,
+        cosmic=not args.no_helpers,
+        terminals=not args.no_helpers,
+    )
+    try:
+        warnings = apply_theme(
+            args.name, themes_dir, options, on_progress=lambda p: print(f"  - {p.message}")
+        )
+    except ApplyError as e:
+        print(f"Error: {e}", file=sys.stderr)
         return 1
 
-    # Apply chezmoi
-    if not args.no_apply:
-        print("Applying dotfiles...")
-        result = subprocess.run(["chezmoi", "apply", "--force"], capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"Warning: chezmoi apply failed: {result.stderr}", file=sys.stderr)
-
+    for warning in warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
     print(f"Theme '{args.name}' applied successfully!")
+    return 0
 
-    # Run helper scripts if requested
-    if not args.no_helpers:
-        theme_cli = find_theme_cli()
-        if theme_cli:
-            # The shell script handles helper orchestration
-            subprocess.run([theme_cli, args.name, "--no-chezmoi"], check=False)
 
-    return 0
+def _config_layers(args: argparse.Namespace) -> list[Path] | None:
+    """The ``--config`` layers, or None (after reporting it) if one is missing."""
+    layers = [Path(path) for path in args.config or ["cosmikase.yaml"]]
+    for config_path in layers:
+        if not config_path.exists():
+            print(f"Error: Config file not found: {config_path}", file=sys.stderr)
+            return None
+    return layers
+
+
+def _load_layers(args: argparse.Namespace) -> dict | None:
+    """The merged ``--config`` layers, or None (after reporting why) if they can't be read."""
+    layers = _config_layers(args)
+    if layers is None:
+        return None
+    try:
+        return load_config(layers)
+    except LayerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return None
 
 
 def cmd_config(args: argparse.Namespace) -> int:
     """Query configuration values."""
-    config_path = Path(args.config)
-    if not config_path.exists():
-        print(f"Error: Config file not found: {config_path}", file=sys.stderr)
+    layers = _config_layers(args)
+    if layers is None:
         return 1
 
-    config = load_config(config_path)
+    try:
+        config = load_config(layers)
+        if args.origin:
+            origins = {
+                key: sources
+                for key, sources in config_provenance(layers).items()
+                if key == args.path or key.startswith((f"{args.path}.", f"{args.path}["))
+            }
+            if not origins:
+                print(f"Error: {args.path} is not set by any layer", file=sys.stderr)
+                return 1
+            for key, sources in origins.items():
+                print(f"{key}: {' -> '.join(str(source) for source in sources)}")
+            return 0
+    except LayerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
     value = get_value(config, args.path, args.default)
 
     if isinstance(value, bool):
@@ -89,14 +164,16 @@ def cmd_config(args: argparse.Namespace) -> int:
 
 def cmd_validate(args: argparse.Namespace) -> int:
     """Validate configuration file."""
-    is_valid, errors = validate_config(args.config)
+    layers = args.config or ["cosmikase.yaml"]
+    is_valid, errors = validate_config(layers)
+    shown = " + ".join(layers)
 
     if is_valid:
         if not args.quiet:
-            print(f"✓ Configuration is valid: {args.config}")
+            print(f"✓ Configuration is valid: {shown}")
         return 0
     else:
-        print(f"✗ Configuration errors in {args.config}:", file=sys.stderr)
+        print(f"✗ Configuration errors in {shown}:", file=sys.stderr)
         for error in errors:
             print(f"  {error}", file=sys.stderr)
         return 1
@@ -119,6 +196,658 @@ def cmd_themes_dir(args: argparse.Namespace) -> int:
     return 0
 
 
+def _resolve_themes_dir(path: str | None) -> Path | None:
+    """Return an explicit --dir argument or the primary discovered themes directory."""
+    if path:
+        return Path(path).expanduser()
+    dirs = discover_theme_dirs()
+    return dirs[0] if dirs else None
+
+
+def cmd_themes_extract_colors(args: argparse.Namespace) -> int:
+    """Populate theme.yaml colors from each theme's app-specific files."""
+    themes_dir = _resolve_themes_dir(args.dir)
+    if themes_dir is None or not themes_dir.is_dir():
+        print("Error: No theme directories found", file=sys.stderr)
+        return 1
+
+    available = [
+        name
+        for name in list_themes(themes_dir)
+        if not name.startswith(("_", ".")) and (themes_dir / name).is_dir()
+    ]
+    names = args.names or available
+    missing = [name for name in names if name not in available]
+    if missing:
+        print(f"Error: Theme(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    results = extract_all((themes_dir / name for name in names), args.jobs, args.dry_run)
+    failed = 0
+    changed = 0
+    for result in results:
+        if result.error:
+            failed += 1
+            print(f"  ✗ {result.theme}: {result.error}", file=sys.stderr)
+        elif result.changed:
+            changed += 1
+            verb = "would update" if args.dry_run else "updated"
+            print(f"  ✓ {result.theme}: {verb} ({len(result.colors)} colors)")
+        elif not args.quiet:
+            print(f"  - {result.theme}: unchanged")
+
+    print(f"{changed} changed, {len(results) - changed - failed} unchanged, {failed} failed")
+    return 1 if failed else 0
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _theme_roots(paths: list[str]) -> list[Path]:
+    return [Path(p).expanduser() for p in paths] if paths else discover_theme_dirs()
+
+
+def cmd_themes_dedupe(args: argparse.Namespace) -> int:
+    """Move theme images into the blob store and link them back."""
+    roots = _theme_roots(args.dirs)
+    missing = [str(root) for root in roots if not root.is_dir()]
+    if not roots or missing:
+        print(f"Error: Theme directory not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    store = BlobStore(Path(args.store).expanduser() if args.store else None)
+    stats = store.dedupe(roots, jobs=args.jobs)
+    methods = ", ".join(f"{count} {method}" for method, count in sorted(stats.methods.items()))
+    print(f"{stats.files} images, {stats.unique} unique blobs in {store.root}")
+    print(f"Relinked: {methods or 'nothing'}; saved {_format_bytes(stats.bytes_saved)}")
+    return 0
+
+
+def cmd_themes_gc(args: argparse.Namespace) -> int:
+    """Remove blobs that no theme references anymore."""
+    store = BlobStore(Path(args.store).expanduser() if args.store else None)
+    stats = store.gc(_theme_roots(args.dirs), dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"{verb} {stats.removed} of {stats.blobs} blobs "
+        f"({_format_bytes(stats.bytes_freed)}) from {store.root}"
+    )
+    return 0
+
+
+def cmd_themes_sync(args: argparse.Namespace) -> int:
+    """Incrementally sync a theme collection into the installed themes directory."""
+    src = Path(args.src).expanduser()
+    if not src.is_dir():
+        print(f"Error: Source directory not found: {src}", file=sys.stderr)
+        return 1
+    dest = Path(args.dest).expanduser()
+    store = BlobStore(Path(args.store).expanduser() if args.store else None)
+    stats = sync_themes(
+        src, dest, jobs=args.jobs, dry_run=args.dry_run, force=args.force, store=store
+    )
+
+    if stats.up_to_date:
+        print(f"Themes up to date ({stats.themes} themes in {dest})")
+        return 0
+    changed = [name for name in stats.changed if name]
+    verb = "Would update" if args.dry_run else "Updated"
+    extra = " and top-level files" if "" in stats.changed else ""
+    print(f"{verb} {len(changed)} of {stats.themes} themes{extra}: {', '.join(changed) or '-'}")
+    if stats.removed:
+        verb = "Would remove" if args.dry_run else "Removed"
+        print(f"{verb}: {', '.join(name or 'top-level files' for name in stats.removed)}")
+    if not args.dry_run:
+        print(
+            f"Copied {stats.copied} files ({_format_bytes(stats.bytes_copied)}), "
+            f"linked {stats.linked} unchanged and {stats.shared} images from {store.root}"
+        )
+    return 0
+
+
+def cmd_themes_pack(args: argparse.Namespace) -> int:
+    """Pack theme directories into single-file .ctheme archives."""
+    themes_dir = _resolve_themes_dir(args.dir)
+    if themes_dir is None or not themes_dir.is_dir():
+        print("Error: No theme directories found", file=sys.stderr)
+        return 1
+
+    available = [
+        name
+        for name in list_themes(themes_dir)
+        if not name.startswith(".") and (themes_dir / name).is_dir()
+    ]
+    names = args.names or available
+    missing = [name for name in names if name not in available]
+    if missing:
+        print(f"Error: Theme(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    out_dir = Path(args.out).expanduser()
+    for name in names:
+        pack_path = pack_theme(themes_dir / name, out_dir)
+        print(f"  ✓ {name} -> {pack_path} ({_format_bytes(pack_path.stat().st_size)})")
+    return 0
+
+
+def cmd_themes_unpack(args: argparse.Namespace) -> int:
+    """Extract .ctheme archives back into theme directories."""
+    failed = 0
+    for pack in args.packs:
+        pack_path = Path(pack).expanduser()
+        out_dir = Path(args.out).expanduser() if args.out else pack_path.parent
+        try:
+            print(f"  ✓ {pack_path.name} -> {unpack_theme(pack_path, out_dir)}")
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"  ✗ {pack_path.name}: {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_chezmoi_warm(args: argparse.Namespace) -> int:
+    """Pre-render themed chezmoi templates for every theme."""
+    if not shutil.which("chezmoi"):
+        print("Error: chezmoi not found. Please install chezmoi first.", file=sys.stderr)
+        return 1
+    themes_dir = _resolve_themes_dir(args.dir)
+    if themes_dir is None or not themes_dir.is_dir():
+        print("Error: No theme directories found", file=sys.stderr)
+        return 1
+
+    available = [name for name in list_themes(themes_dir) if not name.startswith(("_", "."))]
+    names = args.names or available
+    missing = [name for name in names if name not in available]
+    if missing:
+        print(f"Error: Theme(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    # Same data apply_theme() would write for each theme
+    current = read_chezmoi_config().get("data", {})
+    base = {**CHEZMOI_DEFAULTS, **current}
+    datasets = []
+    for name in names:
+        path = resolve_theme(themes_dir, name)
+        root = materialize(path) if is_pack(path) else themes_dir
+        datasets.append({**base, "theme": name, "themes_dir": str(root)})
+
+    cache = RenderCache()
+    stats = cache.warm(datasets, jobs=args.jobs)
+    for error in stats.errors:
+        print(f"  ✗ {error}", file=sys.stderr)
+    print(
+        f"Rendered {stats.written} outputs for {len(names)} themes "
+        f"({stats.hits} already cached) in {cache.root}"
+    )
+    return 1 if stats.errors else 0
+
+
+def cmd_editor_apply(args: argparse.Namespace) -> int:
+    """Apply a theme's cursor.json to Cursor, VS Code and Antigravity."""
+    themes_dir = _resolve_themes_dir(args.dir)
+    if themes_dir is None or not themes_dir.is_dir():
+        print("Error: No theme directories found", file=sys.stderr)
+        return 1
+    theme_path = resolve_theme(themes_dir, args.name)
+    if not theme_path.exists():
+        print(f"Error: Theme '{args.name}' not found", file=sys.stderr)
+        return 1
+
+    editors = [e for e in EDITORS if not args.only or e.command in args.only]
+    try:
+        parsed = read_cursor_theme(theme_path)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if parsed is None:
+        if not args.quiet:
+            print(f"No cursor.json found for theme '{args.name}', skipping editor configuration")
+        return 0
+    color_theme, extension = parsed
+    results = apply_editor_theme(color_theme, extension, editors, install=not args.no_install)
+
+    for result in results:
+        if result.warning:
+            print(f"Warning: {result.warning}", file=sys.stderr)
+        if args.quiet:
+            continue
+        if result.extension_installed:
+            print(f"  - Installed {extension} in {result.editor}")
+        state = "updated" if result.settings_changed else "already set"
+        print(f"  - {result.editor} settings {state}")
+    if not args.quiet:
+        if results:
+            names = ", ".join(result.editor for result in results)
+            print(f"Editor theme '{color_theme}' applied to: {names}")
+        else:
+            print("No editors configured, skipping")
+    return 0
+
+
+def cmd_editor_install_extensions(args: argparse.Namespace) -> int:
+    """Install the extensions listed in extensions.txt that are missing."""
+    path = Path(args.file).expanduser() if args.file else default_extensions_file()
+    try:
+        wanted = parse_extensions_file(path)
+    except OSError:
+        print(f"Error: Extensions file not found: {path}", file=sys.stderr)
+        return 1
+
+    by_command = {editor.command: editor for editor in EDITORS}
+    if args.editors:
+        names = [name.strip() for name in args.editors.split(",") if name.strip()]
+        unknown = [name for name in names if name not in by_command]
+        if unknown:
+            print(f"Error: Unknown editor(s): {', '.join(unknown)}", file=sys.stderr)
+            return 1
+        editors = [by_command[name] for name in names]
+    else:
+        # Like cosmikase-cursor-extensions: Cursor, else VS Code
+        editors = [next((e for e in EDITORS[:2] if shutil.which(e.command)), EDITORS[0])]
+
+    start = time.monotonic()
+    reports = install_extensions(
+        wanted, editors, jobs=args.jobs, timeout=args.timeout, retries=args.retries
+    )
+    if not reports:
+        print("Error: No editor command found on PATH", file=sys.stderr)
+        return 1
+
+    for report in reports:
+        print(
+            f"{report.editor}: {len(report.installed)} installed, {report.present} already "
+            f"present, {len(report.failed)} failed ({report.seconds:.1f}s)"
+        )
+        for ext in report.installed:
+            print(f"  ✓ {ext}")
+        for ext in report.failed:
+            print(f"  ✗ {ext}")
+    print(f"Done in {time.monotonic() - start:.1f}s ({len(wanted)} extensions in {path})")
+    return 1 if any(report.failed for report in reports) else 0
+
+
+def cmd_terminals_reload(args: argparse.Namespace) -> int:
+    """Signal running terminal emulators to reload their config."""
+    selected = None
+    if args.only:
+        selected = [TERMINALS[name] for name in args.only]
+    results = reload_terminals(selected, proc_root=Path(args.proc), dry_run=args.dry_run)
+    failed = False
+    for result in results:
+        failed = failed or bool(result.failed)
+        if not args.quiet or result.failed:
+            print(f"  - {describe_reload(result, dry_run=args.dry_run)}")
+    return 1 if failed else 0
+
+
+def cmd_cosmic_apply(args: argparse.Namespace) -> int:
+    """Apply a theme to COSMIC in a single config commit."""
+    themes_dir = _resolve_themes_dir(args.dir)
+    if themes_dir is None or not themes_dir.is_dir():
+        print("Error: No theme directories found", file=sys.stderr)
+        return 1
+    theme_path = resolve_theme(themes_dir, args.name)
+    if is_pack(theme_path):
+        theme_path = materialize(theme_path) / args.name
+    if not theme_path.is_dir():
+        print(f"Error: Theme '{args.name}' not found", file=sys.stderr)
+        return 1
+
+    try:
+        result = apply_cosmic_theme(
+            theme_path,
+            colors=not args.no_colors,
+            terminal=not args.no_terminal,
+            wallpaper=not args.no_wallpaper,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.quiet:
+        return 0
+    if result is None:
+        print("COSMIC config directory not found, skipping COSMIC theming")
+    elif result.changed:
+        for rel in result.written:
+            print(f"  - Wrote {rel}")
+        for rel in result.removed:
+            print(f"  - Removed {rel}")
+        changed = len(result.written) + len(result.removed)
+        print(f"COSMIC theme '{args.name}' applied ({changed} keys changed)")
+    else:
+        print(f"COSMIC already uses theme '{args.name}'")
+    return 0
+
+
+def cmd_cosmic_rollback(args: argparse.Namespace) -> int:
+    """Restore the COSMIC keys changed by the last commit."""
+    config = CosmicConfig()
+    if not config.has_snapshot():
+        print("Error: No COSMIC snapshot to roll back to", file=sys.stderr)
+        return 1
+    try:
+        result = config.rollback()
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Restored {len(result.written) + len(result.removed)} COSMIC config keys")
+    return 0
+
+
+def cmd_plan(args: argparse.Namespace) -> int:
+    """Show the package installs needed to satisfy the config."""
+    config = _load_layers(args)
+    if config is None:
+        return 1
+
+    result = plan_packages(config, refresh=args.refresh)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    for name in PLAN_BACKENDS:
+        missing = result[name]
+        if name in result["unavailable"]:
+            print(f"{name}: could not query ({result['unavailable'][name]})")
+        elif missing:
+            print(f"{name}: install {len(missing)}: {' '.join(missing)}")
+        else:
+            print(f"{name}: up to date")
+    if not result["changed"]:
+        print("Nothing to install")
+    return 0
+
+
+def _install_packages(args: argparse.Namespace, config: dict) -> bool:
+    """Install apt and Flatpak packages; returns False if any failed."""
+    only = None
+    if args.missing:
+        result = plan_packages(config)
+        # Sections that couldn't be queried are installed in full
+        only = {
+            name: result[name] for name in PACKAGE_BACKENDS if name not in result["unavailable"]
+        }
+
+    backends = {name: factory() for name, factory in PACKAGE_BACKENDS.items()}
+    if args.dry_run:
+        backends = {name: DryRunBackend(backend) for name, backend in backends.items()}
+
+    ok = True
+    for batch in install_packages(config, backends, only):
+        if args.dry_run:
+            for command in backends[batch.backend].commands:
+                print(f"Would run: {' '.join(command)}")
+        if batch.failed:
+            ok = False
+            print(f"{batch.backend}: failed to install: {' '.join(batch.failed)}", file=sys.stderr)
+        if not batch.transactions:
+            print(f"{batch.backend}: nothing to install")
+        elif not args.dry_run:
+            print(
+                f"{batch.backend}: {len(batch.installed)} installed "
+                f"in {len(batch.transactions)} transaction(s)"
+            )
+    return ok
+
+
+def _install_installers(args: argparse.Namespace, config: dict) -> bool:
+    """Run the installers section as a dependency graph; returns False if any failed."""
+    nodes = build_installer_graph(config)
+    if args.dry_run:
+        for node in nodes.values():
+            if node.installed:
+                print(f"{node.name}: already installed")
+                continue
+            after = [*node.deps, *(f"{lock} lock" for lock in node.locks)]
+            print(f"{node.name}" + (f" (after: {', '.join(after)})" if after else ""))
+            if node.artifact:
+                print(f"  download: {node.artifact}")
+            print(f"  {node.command}")
+        return True
+
+    def on_event(event: dict) -> None:
+        if log_file is not None:
+            log_file.write(json.dumps(event) + "\n")
+            log_file.flush()
+        if args.quiet and event["event"] != "failed":
+            return
+        if event["event"] == "output":
+            print(f"[{event['item']}] {event['line']}")
+        elif event["event"] == "start":
+            print(f"[{event['item']}] Installing...")
+        else:
+            message = f" ({event['message']})" if "message" in event else ""
+            print(f"[{event['item']}] {event['event']}{message}")
+
+    with open(args.log, "a") if args.log else contextlib.nullcontext() as log_file:
+        results = run_installer_graph(nodes, jobs=args.jobs, on_event=on_event)
+
+    chart = installer_waterfall(nodes, results)
+    if chart and not args.quiet:
+        print()
+        print("\n".join(chart))
+    failed = [r.name for r in results.values() if r.status in ("failed", "blocked")]
+    if failed:
+        print(f"Failed installers: {', '.join(failed)}", file=sys.stderr)
+    return not failed
+
+
+def cmd_install(args: argparse.Namespace) -> int:
+    """Install the config's packages and installers."""
+    if not (args.packages or args.installers):
+        print("Error: Nothing to install (pass --packages and/or --installers)", file=sys.stderr)
+        return 1
+    config = _load_layers(args)
+    if config is None:
+        return 1
+
+    ok = True
+    if args.packages:
+        ok = _install_packages(args, config) and ok
+    if args.installers:
+        ok = _install_installers(args, config) and ok
+    return 0 if ok else 1
+
+
+def cmd_check(args: argparse.Namespace) -> int:
+    """Evaluate the installers' check commands."""
+    config = _load_layers(args)
+    if config is None:
+        return 1
+
+    items = [item for item in installer_items(config) if item.get("check")]
+    results = evaluate_checks(
+        items, timeout=args.timeout, cache=CheckCache(ttl=args.ttl), refresh=args.refresh
+    )
+    if args.json:
+        print(json.dumps([result.to_dict() for result in results], indent=2))
+        return 0
+
+    width = max((len(result.name) for result in results), default=0)
+    for result in results:
+        if result.installed:
+            cached = " (cached)" if result.cached else ""
+            print(f"  ✓ {result.name:<{width}}  {result.version or result.path}{cached}")
+        else:
+            reason = result.error or f"{result.check} not found"
+            print(f"  ✗ {result.name:<{width}}  {reason}")
+    installed = sum(result.installed for result in results)
+    print(f"{installed}/{len(results)} installed")
+    return 0
+
+
+def cmd_download(args: argparse.Namespace) -> int:
+    """Fetch URLs through the download cache and print the local paths."""
+    cache = DownloadCache(mirror=Path(args.mirror) if args.mirror else None)
+    failed = False
+    for url, result in zip(
+        args.urls, cache.fetch_all(args.urls, jobs=args.jobs, offline=args.offline), strict=True
+    ):
+        if isinstance(result, DownloadError):
+            failed = True
+            print(f"Error: {result}", file=sys.stderr)
+        else:
+            if args.verbose:
+                print(f"{url}: {result.status}", file=sys.stderr)
+            print(result.path)
+    return 1 if failed else 0
+
+
+def _step_names(values: list[str] | None) -> list[str]:
+    """Names from repeatable, comma-separated ``--only``/``--skip`` values."""
+    return [name for value in values or [] for name in value.split(",") if name]
+
+
+def cmd_update(args: argparse.Namespace) -> int:
+    """Run the config's update steps, non-conflicting steps in parallel."""
+    config = _load_layers(args)
+    if config is None:
+        return 1
+    try:
+        plan = plan_update(config, only=_step_names(args.only), skip=_step_names(args.skip))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if not plan.nodes:
+        print("No update steps to run")
+        return 0
+
+    if args.dry_run:
+        for node in plan.nodes.values():
+            after = [*node.deps, *(f"{lock} lock" for lock in node.locks)]
+            print(f"{node.name}" + (f" (after: {', '.join(after)})" if after else ""))
+            print(f"  {node.command}")
+        for name, reason in plan.skipped.items():
+            print(f"{name}: skipped ({reason})")
+        return 0
+
+    # Steps can't prompt for a password once their output is captured
+    uses_sudo = os.geteuid() != 0 and any("sudo" in node.command for node in plan.nodes.values())
+    if uses_sudo and subprocess.run(["sudo", "-v"]).returncode != 0:
+        print("Error: sudo authentication failed", file=sys.stderr)
+        return 1
+
+    def on_event(event: dict) -> None:
+        if args.quiet and event["event"] != "failed":
+            return
+        if event["event"] == "output":
+            print(f"[{event['item']}] {event['line']}")
+        elif event["event"] == "start":
+            print(f"[{event['item']}] Updating...")
+        else:
+            message = f" ({event['message']})" if "message" in event else ""
+            print(f"[{event['item']}] {event['event']}{message}")
+
+    # Long steps would otherwise outlive sudo's cached credentials
+    with sudo_keepalive() if uses_sudo else contextlib.nullcontext():
+        results = run_installer_graph(
+            plan.nodes,
+            jobs=args.jobs or plan.jobs,
+            on_event=on_event,
+            capacity=plan.capacity,
+        )
+
+    if not args.quiet:
+        chart = installer_waterfall(plan.nodes, results)
+        if chart:
+            print()
+            print("\n".join(chart))
+        for name, reason in plan.skipped.items():
+            print(f"  {name}: skipped ({reason})")
+    failed = [r.name for r in results.values() if r.status in ("failed", "blocked")]
+    if failed:
+        print(f"Failed update steps: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_ghostty_build(args: argparse.Namespace) -> int:
+    """Rebuild Ghostty from source if its inputs changed."""
+    try:
+        result = build_ghostty(
+            source=Path(args.source) if args.source else None,
+            prefix=Path(args.prefix) if args.prefix else None,
+            pull=not args.no_pull,
+            force=args.force,
+            output=(lambda line: None) if args.quiet else print,
+        )
+    except GhosttyBuildError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(result.summary())
+    return 0
+
+
+def cmd_fleet(args: argparse.Namespace) -> int:
+    """Evaluate a directory of host configs and report or query the results."""
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"Error: Not a directory: {directory}", file=sys.stderr)
+        return 1
+    previous = {}
+    if args.since:
+        try:
+            previous = read_report(Path(args.since))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: Cannot read report {args.since}: {e}", file=sys.stderr)
+            return 1
+
+    entries = evaluate_fleet(directory, jobs=args.jobs, previous=previous)
+    report = "".join(json.dumps(entry, sort_keys=True) + "\n" for entry in entries)
+    if args.out:
+        Path(args.out).write_text(report)
+
+    if args.enables:
+        for host in hosts_enabling(entries, args.enables):
+            print(host)
+    elif args.since:
+        changes = changed_hosts(previous, entries)
+        for mark, kind in (("+", "added"), ("-", "removed"), ("~", "changed")):
+            for host in changes[kind]:
+                print(f"{mark} {host}")
+    elif not args.out:
+        sys.stdout.write(report)
+
+    invalid = [entry["host"] for entry in entries if not entry["valid"]]
+    if invalid:
+        print(f"Error: Invalid host config(s): {', '.join(invalid)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    """Find configured items by name, id, description or location."""
+    layers = _config_layers(args)
+    if layers is None:
+        return 1
+    try:
+        index, _ = load_item_index(layers, refresh=args.refresh)
+    except LayerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    query = " ".join(args.query)
+    hits = index.search(query, limit=args.limit, fuzzy=not args.exact)
+    if args.json:
+        print(json.dumps([hit.to_dict() for hit in hits], indent=2))
+        return 0 if hits else 1
+    if not hits:
+        print(f"No items match {query!r}", file=sys.stderr)
+        return 1
+
+    name_width = max(len(hit.item["name"]) for hit in hits)
+    location_width = max(len(hit.location) for hit in hits)
+    for hit in hits:
+        mark = "✓" if hit.item["enabled"] else "✗"
+        line = f"  {mark} {hit.item['name']:<{name_width}}  {hit.location:<{location_width}}"
+        print(f"{line}  {hit.item.get('desc', '')}".rstrip())
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
     """Main entry point for the cosmikase CLI."""
     parser = argparse.ArgumentParser(
@@ -138,14 +867,19 @@ def main(argv: list[str] | None = None) -> int:
     # config command
     config_parser = subparsers.add_parser("config", help="Query configuration")
     config_parser.add_argument("path", help="Dot-separated path (e.g., defaults.theme)")
-    config_parser.add_argument("--config", "-c", default="cosmikase.yaml", help="Config file path")
+    config_parser.add_argument("--config", "-c", action="append", help=CONFIG_HELP)
     config_parser.add_argument("--default", "-d", default="", help="Default if not found")
+    config_parser.add_argument(
+        "--origin", action="store_true", help="Show which layers set the value or items"
+    )
     config_parser.set_defaults(func=cmd_config)
 
     # validate command
     validate_parser = subparsers.add_parser("validate", help="Validate configuration")
     validate_parser.add_argument(
-        "config", nargs="?", default="cosmikase.yaml", help="Config file path"
+        "config",
+        nargs="*",
+        help="Config file path, or layers from base to host (default: cosmikase.yaml)",
     )
     validate_parser.add_argument("--quiet", "-q", action="store_true", help="Only print errors")
     validate_parser.set_defaults(func=cmd_validate)
@@ -155,6 +889,320 @@ def main(argv: list[str] | None = None) -> int:
     themes_parser.add_argument("--all", "-a", action="store_true", help="Show all directories")
     themes_parser.set_defaults(func=cmd_themes_dir)
 
+    # themes command group (operations on the theme collection)
+    themes_group = subparsers.add_parser("themes", help="Manage the theme collection")
+    themes_sub = themes_group.add_subparsers(dest="themes_command", required=True)
+
+    extract_parser = themes_sub.add_parser(
+        "extract-colors", help="Write canonical palettes into theme.yaml"
+    )
+    extract_parser.add_argument("names", nargs="*", help="Themes to process (default: all)")
+    extract_parser.add_argument("--dir", help="Themes directory (default: auto-discover)")
+    extract_parser.add_argument("--jobs", "-j", type=int, help="Parallel workers")
+    extract_parser.add_argument(
+        "--dry-run", "-n", action="store_true", help="Report changes without writing"
+    )
+    extract_parser.add_argument("--quiet", "-q", action="store_true", help="Hide unchanged themes")
+    extract_parser.set_defaults(func=cmd_themes_extract_colors)
+
+    dedupe_parser = themes_sub.add_parser(
+        "dedupe", help="Store theme images once and hardlink/reflink them back"
+    )
+    dedupe_parser.add_argument("dirs", nargs="*", help="Theme directories (default: discovered)")
+    dedupe_parser.add_argument(
+        "--store", help="Blob store (default: ~/.local/share/cosmikase/blobs)"
+    )
+    dedupe_parser.add_argument("--jobs", "-j", type=int, help="Parallel hashing workers")
+    dedupe_parser.set_defaults(func=cmd_themes_dedupe)
+
+    gc_parser = themes_sub.add_parser("gc", help="Remove unreferenced blobs from the store")
+    gc_parser.add_argument("dirs", nargs="*", help="Theme directories still in use")
+    gc_parser.add_argument("--store", help="Blob store (default: ~/.local/share/cosmikase/blobs)")
+    gc_parser.add_argument(
+        "--dry-run", "-n", action="store_true", help="Report what would be removed"
+    )
+    gc_parser.set_defaults(func=cmd_themes_gc)
+
+    sync_parser = themes_sub.add_parser(
+        "sync", help="Incrementally sync a theme collection to the installed directory"
+    )
+    sync_parser.add_argument("src", help="Source themes directory")
+    sync_parser.add_argument("dest", help="Installed themes directory")
+    sync_parser.add_argument("--jobs", "-j", type=int, help="Parallel hashing/copy workers")
+    sync_parser.add_argument(
+        "--store", help="Blob store for images (default: ~/.local/share/cosmikase/blobs)"
+    )
+    sync_parser.add_argument(
+        "--dry-run", "-n", action="store_true", help="Report changed themes without copying"
+    )
+    sync_parser.add_argument(
+        "--force", action="store_true", help="Ignore the stored manifest and copy everything"
+    )
+    sync_parser.set_defaults(func=cmd_themes_sync)
+
+    pack_parser = themes_sub.add_parser("pack", help="Pack themes into single-file archives")
+    pack_parser.add_argument("names", nargs="*", help="Themes to pack (default: all)")
+    pack_parser.add_argument("--dir", help="Themes directory (default: auto-discover)")
+    pack_parser.add_argument("--out", "-o", required=True, help="Directory for .ctheme files")
+    pack_parser.set_defaults(func=cmd_themes_pack)
+
+    unpack_parser = themes_sub.add_parser("unpack", help="Extract .ctheme archives")
+    unpack_parser.add_argument("packs", nargs="+", help=".ctheme files to extract")
+    unpack_parser.add_argument("--out", "-o", help="Target directory (default: next to the pack)")
+    unpack_parser.set_defaults(func=cmd_themes_unpack)
+
+    # chezmoi command group
+    chezmoi_group = subparsers.add_parser("chezmoi", help="chezmoi integration")
+    chezmoi_sub = chezmoi_group.add_subparsers(dest="chezmoi_command", required=True)
+
+    warm_parser = chezmoi_sub.add_parser(
+        "warm", help="Pre-render themed dotfiles for every theme into the render cache"
+    )
+    warm_parser.add_argument("names", nargs="*", help="Themes to render (default: all)")
+    warm_parser.add_argument("--dir", help="Themes directory (default: auto-discover)")
+    warm_parser.add_argument("--jobs", "-j", type=int, help="Parallel chezmoi processes")
+    warm_parser.set_defaults(func=cmd_chezmoi_warm)
+
+    # ghostty command group
+    ghostty_group = subparsers.add_parser("ghostty", help="Ghostty source builds")
+    ghostty_sub = ghostty_group.add_subparsers(dest="ghostty_command", required=True)
+
+    ghostty_build_parser = ghostty_sub.add_parser(
+        "build", help="Pull ~/ghostty-source and rebuild it only if something changed"
+    )
+    ghostty_build_parser.add_argument("--source", help="Checkout (default: ~/ghostty-source)")
+    ghostty_build_parser.add_argument("--prefix", help="Install prefix (default: ~/.local)")
+    ghostty_build_parser.add_argument("--no-pull", action="store_true", help="Skip git pull")
+    ghostty_build_parser.add_argument(
+        "--force", action="store_true", help="Build even if the inputs are unchanged"
+    )
+    ghostty_build_parser.add_argument(
+        "--quiet", "-q", action="store_true", help="Only print the outcome"
+    )
+    ghostty_build_parser.set_defaults(func=cmd_ghostty_build)
+
+    # editor command group
+    editor_group = subparsers.add_parser("editor", help="Cursor, VS Code and Antigravity themes")
+    editor_sub = editor_group.add_subparsers(dest="editor_command", required=True)
+
+    editor_apply_parser = editor_sub.add_parser(
+        "apply", help="Apply a theme's cursor.json to the installed editors"
+    )
+    editor_apply_parser.add_argument("name", help="Theme name")
+    editor_apply_parser.add_argument("--dir", help="Themes directory (default: auto-discover)")
+    editor_apply_parser.add_argument(
+        "--only",
+        action="append",
+        choices=[editor.command for editor in EDITORS],
+        help="Only update this editor (repeatable)",
+    )
+    editor_apply_parser.add_argument(
+        "--no-install", action="store_true", help="Skip extension installation"
+    )
+    editor_apply_parser.add_argument("--quiet", "-q", action="store_true", help="Suppress output")
+    editor_apply_parser.set_defaults(func=cmd_editor_apply)
+
+    install_ext_parser = editor_sub.add_parser(
+        "install-extensions", help="Install missing extensions from extensions.txt"
+    )
+    install_ext_parser.add_argument(
+        "-f", "--file", help="Extensions file (default: ~/.config/Cursor/extensions.txt)"
+    )
+    install_ext_parser.add_argument(
+        "--editors",
+        help="Comma-separated editors: cursor, code, antigravity (default: cursor, else code)",
+    )
+    install_ext_parser.add_argument(
+        "--jobs", "-j", type=int, default=4, help="Concurrent installs per editor (default: 4)"
+    )
+    install_ext_parser.add_argument(
+        "--timeout", type=float, default=120.0, help="Seconds per install attempt (default: 120)"
+    )
+    install_ext_parser.add_argument(
+        "--retries", type=int, default=2, help="Retries per failed install (default: 2)"
+    )
+    install_ext_parser.set_defaults(func=cmd_editor_install_extensions)
+
+    # terminals command group
+    terminals_group = subparsers.add_parser("terminals", help="Terminal emulators")
+    terminals_sub = terminals_group.add_subparsers(dest="terminals_command", required=True)
+
+    reload_parser = terminals_sub.add_parser(
+        "reload", help="Signal running terminals to reload their config"
+    )
+    reload_parser.add_argument(
+        "--only",
+        action="append",
+        choices=sorted(TERMINALS),
+        help="Only this terminal (repeatable)",
+    )
+    reload_parser.add_argument(
+        "--dry-run", action="store_true", help="Show what would be signalled"
+    )
+    reload_parser.add_argument(
+        "--proc", default="/proc", help="Process table to scan (default: /proc)"
+    )
+    reload_parser.add_argument("--quiet", "-q", action="store_true", help="Only report failures")
+    reload_parser.set_defaults(func=cmd_terminals_reload)
+
+    # cosmic command group
+    cosmic_group = subparsers.add_parser("cosmic", help="COSMIC desktop theming")
+    cosmic_sub = cosmic_group.add_subparsers(dest="cosmic_command", required=True)
+
+    cosmic_apply_parser = cosmic_sub.add_parser(
+        "apply", help="Apply a theme's mode, colors, terminal scheme and wallpaper"
+    )
+    cosmic_apply_parser.add_argument("name", help="Theme name")
+    cosmic_apply_parser.add_argument("--dir", help="Themes directory (default: auto-discover)")
+    cosmic_apply_parser.add_argument(
+        "--no-wallpaper", action="store_true", help="Skip wallpaper change"
+    )
+    cosmic_apply_parser.add_argument(
+        "--no-colors", action="store_true", help="Skip color theme application"
+    )
+    cosmic_apply_parser.add_argument(
+        "--no-terminal", action="store_true", help="Skip terminal color scheme"
+    )
+    cosmic_apply_parser.add_argument("--quiet", "-q", action="store_true", help="Suppress output")
+    cosmic_apply_parser.set_defaults(func=cmd_cosmic_apply)
+
+    cosmic_rollback_parser = cosmic_sub.add_parser(
+        "rollback", help="Restore the COSMIC config from before the last apply"
+    )
+    cosmic_rollback_parser.set_defaults(func=cmd_cosmic_rollback)
+
+    # plan command
+    plan_parser = subparsers.add_parser(
+        "plan", help="Show the package installs needed to satisfy the config"
+    )
+    plan_parser.add_argument("--config", "-c", action="append", help=CONFIG_HELP)
+    plan_parser.add_argument("--json", action="store_true", help="Output the plan as JSON")
+    plan_parser.add_argument(
+        "--refresh", action="store_true", help="Ignore the cached installed state"
+    )
+    plan_parser.set_defaults(func=cmd_plan)
+
+    # install command
+    install_parser = subparsers.add_parser("install", help="Install packages from the config")
+    install_parser.add_argument("--config", "-c", action="append", help=CONFIG_HELP)
+    install_parser.add_argument(
+        "--packages",
+        action="store_true",
+        help="Install apt and Flatpak packages, one transaction per backend",
+    )
+    install_parser.add_argument(
+        "--installers",
+        action="store_true",
+        help="Run the installers section, independent installers in parallel",
+    )
+    install_parser.add_argument(
+        "--missing", action="store_true", help="Only install what `plan` reports missing"
+    )
+    install_parser.add_argument(
+        "--jobs", "-j", type=int, default=4, help="Installers to run at once (default: 4)"
+    )
+    install_parser.add_argument("--log", help="Append per-installer events to this JSONL file")
+    install_parser.add_argument("--quiet", "-q", action="store_true", help="Only report failures")
+    install_parser.add_argument(
+        "--dry-run", "-n", action="store_true", help="Print the commands instead of running them"
+    )
+    install_parser.set_defaults(func=cmd_install)
+
+    # check command
+    check_parser = subparsers.add_parser("check", help="Check which installers are installed")
+    check_parser.add_argument("--config", "-c", action="append", help=CONFIG_HELP)
+    check_parser.add_argument("--json", action="store_true", help="Output results as JSON")
+    check_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=CHECK_TIMEOUT,
+        help=f"Seconds allowed per check (default: {CHECK_TIMEOUT:g})",
+    )
+    check_parser.add_argument(
+        "--ttl",
+        type=float,
+        default=CHECK_TTL,
+        help=f"Seconds to reuse cached results (default: {CHECK_TTL})",
+    )
+    check_parser.add_argument("--refresh", action="store_true", help="Ignore cached results")
+    check_parser.set_defaults(func=cmd_check)
+
+    # download command
+    download_parser = subparsers.add_parser(
+        "download", help="Fetch URLs through the shared download cache"
+    )
+    download_parser.add_argument("urls", nargs="+", metavar="URL", help="URLs to fetch")
+    download_parser.add_argument(
+        "--jobs", "-j", type=int, default=4, help="Parallel downloads (default: 4)"
+    )
+    download_parser.add_argument(
+        "--mirror", help=f"Read-only cache to use before the network (default: ${MIRROR_ENV})"
+    )
+    download_parser.add_argument(
+        "--offline", action="store_true", help="Only use the cache and mirror"
+    )
+    download_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Report cache hits and downloads"
+    )
+    download_parser.set_defaults(func=cmd_download)
+
+    # update command
+    update_parser = subparsers.add_parser(
+        "update", help="Update installed software, independent steps in parallel"
+    )
+    update_parser.add_argument("--config", "-c", action="append", help=CONFIG_HELP)
+    update_parser.add_argument(
+        "--only", action="append", metavar="STEPS", help="Only run these steps (comma-separated)"
+    )
+    update_parser.add_argument(
+        "--skip", action="append", metavar="STEPS", help="Skip these steps (comma-separated)"
+    )
+    update_parser.add_argument(
+        "--jobs", "-j", type=int, help="Steps to run at once (default: update.jobs or 4)"
+    )
+    update_parser.add_argument("--quiet", "-q", action="store_true", help="Only report failures")
+    update_parser.add_argument(
+        "--dry-run", "-n", action="store_true", help="Print the steps instead of running them"
+    )
+    update_parser.set_defaults(func=cmd_update)
+
+    # fleet command
+    fleet_parser = subparsers.add_parser(
+        "fleet", help="Evaluate a directory of host configs in parallel"
+    )
+    fleet_parser.add_argument("directory", help="Directory with one YAML config per host")
+    fleet_parser.add_argument(
+        "--jobs", "-j", type=int, help="Worker processes (default: one per CPU)"
+    )
+    fleet_parser.add_argument("--out", "-o", help="Write the JSON-lines report to this file")
+    fleet_parser.add_argument(
+        "--since",
+        metavar="REPORT",
+        help="Reuse this earlier report for unchanged hosts and list the hosts that changed",
+    )
+    fleet_parser.add_argument(
+        "--enables", metavar="NAME", help="List the hosts that enable this package or installer"
+    )
+    fleet_parser.set_defaults(func=cmd_fleet)
+
+    # search command
+    search_parser = subparsers.add_parser(
+        "search", help="Find configured items by name, description or section"
+    )
+    search_parser.add_argument("query", nargs="+", help="Words to match (prefixes are enough)")
+    search_parser.add_argument("--config", "-c", action="append", help=CONFIG_HELP)
+    search_parser.add_argument(
+        "--limit", "-n", type=int, default=20, help="Show at most this many items (default: 20)"
+    )
+    search_parser.add_argument(
+        "--exact", action="store_true", help="Don't fall back to fuzzy matching"
+    )
+    search_parser.add_argument("--json", action="store_true", help="Output as JSON")
+    search_parser.add_argument(
+        "--refresh", action="store_true", help="Rebuild the index instead of using the cached one"
+    )
+    search_parser.set_defaults(func=cmd_search)
+
     args = parser.parse_args(argv)
 
     if not args.command:
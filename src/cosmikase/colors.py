@@ -0,0 +1,358 @@
+"""Color extraction from per-application theme files.
+
+Each theme ships the same palette in several formats (Cursor JSON, COSMIC RON,
+Kitty and Alacritty configs). This module parses those files, reconciles them
+into one canonical palette and stores it in ``theme.yaml`` so that previews and
+other palette consumers only need a single small YAML read.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+# Use tomllib (standard library in 3.11+) or tomli for older versions
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+# Order in which colors are written to theme.yaml
+UI_KEYS = (
+    "background",
+    "foreground",
+    "accent",
+    "sidebar",
+    "terminal",
+    "error",
+    "warning",
+    "success",
+    "cursor",
+    "selection",
+)
+ANSI_NAMES = ("black", "red", "green", "yellow", "blue", "magenta", "cyan", "white")
+ANSI_KEYS = ANSI_NAMES + tuple(f"bright_{name}" for name in ANSI_NAMES)
+CANONICAL_KEYS = UI_KEYS + ANSI_KEYS
+
+# Prefixed #rgb/#rrggbb/#rrggbbaa/0xrrggbb, or bare rrggbb/rrggbbaa (never bare rgb,
+# which would take words like "add" for colors)
+_HEX_RE = re.compile(
+    r"^(?:(?:#|0x)([0-9a-fA-F]{6}|[0-9a-fA-F]{8}|[0-9a-fA-F]{3})|([0-9a-fA-F]{6}|[0-9a-fA-F]{8}))$"
+)
+_RON_COLOR_RE = re.compile(
+    r"^\s{4}(\w+):\s*Some\(\(\s*"
+    r"red:\s*([\d.]+),\s*green:\s*([\d.]+),\s*blue:\s*([\d.]+),\s*alpha:\s*([\d.]+),?\s*\)\)",
+    re.MULTILINE,
+)
+
+# cosmic.ron top-level color keys -> canonical names
+_COSMIC_KEYS = {
+    "bg_color": "background",
+    "text_tint": "foreground",
+    "accent": "accent",
+    "destructive": "error",
+    "warning": "warning",
+    "success": "success",
+}
+
+
+def normalize_hex(value: object) -> str | None:
+    """Normalize a color string to lowercase ``#rrggbb`` (or ``#rrggbbaa``).
+
+    Accepts ``#rgb``, ``#rrggbb``, ``#rrggbbaa``, Alacritty-style ``0xrrggbb``
+    and bare ``rrggbb``/``rrggbbaa``. Bare hex made only of digits is read by
+    YAML as an int (``000000``, ``112233``), which is accepted too.
+    Returns None for anything that isn't a literal color (e.g. ``CellForeground``).
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = _yaml_int_digits(value)
+    if not isinstance(value, str):
+        return None
+    match = _HEX_RE.match(value.strip())
+    if not match:
+        return None
+    digits = (match.group(1) or match.group(2)).lower()
+    if len(digits) == 3:
+        digits = "".join(c * 2 for c in digits)
+    if len(digits) == 8 and digits.endswith("ff"):
+        digits = digits[:6]
+    return f"#{digits}"
+
+
+def _yaml_int_digits(value: int) -> str | None:
+    """The six digits an unquoted all-digit hex color was written with in YAML.
+
+    YAML reads ``112233`` as a decimal int and ``001234`` (a leading zero and
+    only octal digits) as an octal one.
+    """
+    if 100000 <= value <= 999999:
+        return str(value)
+    if 0 <= value < 8**5:
+        return f"0{value:05o}"
+    return None
+
+
+# Shared name -> index tables: every canonical palette uses the same one.
+# Palettes with other name sets past this many get a table of their own.
+_MAX_INDEX_TABLES = 64
+_INDEX_TABLES: dict[tuple[str, ...], dict[str, int]] = {}
+
+
+class Palette(Mapping[str, str]):
+    """Immutable palette of named colors, parsed once.
+
+    Colors are packed as ``0xRRGGBBAA`` in a compact ``array`` and looked up
+    through a name -> index table shared by all palettes with the same names.
+    As a mapping it yields normalized hex strings (formatted on access);
+    ``rgba`` and ``floats`` give the parsed values without any string parsing.
+    Palettes are hashable, so manifests can be used as cache keys.
+    """
+
+    __slots__ = ("_names", "_index", "_values", "_hash")
+
+    def __init__(self, colors: Mapping[str, object] | None = None) -> None:
+        colors = colors or {}
+        names = tuple(str(name) for name in colors)
+        values = array("I")
+        for name, value in colors.items():
+            hex_color = normalize_hex(value)
+            if hex_color is None:
+                raise ValueError(f"Invalid color for '{name}': {value!r}")
+            digits = hex_color[1:]
+            values.append(int(digits if len(digits) == 8 else digits + "ff", 16))
+        self._names = names
+        index = _INDEX_TABLES.get(names)
+        if index is None:
+            index = {n: i for i, n in enumerate(names)}
+            if len(_INDEX_TABLES) < _MAX_INDEX_TABLES:
+                _INDEX_TABLES[names] = index
+        self._index = index
+        self._values = values
+        self._hash: int | None = None
+
+    def __getitem__(self, name: str) -> str:
+        value = self._values[self._index[name]]
+        if value & 0xFF == 0xFF:
+            return f"#{value >> 8:06x}"
+        return f"#{value:08x}"
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Palette):
+            return self._names == other._names and self._values == other._values
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((self._names, self._values.tobytes()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"Palette({dict(self)!r})"
+
+    def rgba(self, name: str) -> tuple[int, int, int, int]:
+        """Color as 0-255 channels."""
+        value = self._values[self._index[name]]
+        return value >> 24, (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+    def floats(self, name: str) -> tuple[float, float, float, float]:
+        """Color as 0.0-1.0 channels (as used by COSMIC RON files)."""
+        red, green, blue, alpha = self.rgba(name)
+        return red / 255, green / 255, blue / 255, alpha / 255
+
+
+def _rgba_to_hex(red: float, green: float, blue: float, alpha: float = 1.0) -> str:
+    channels = [round(max(0.0, min(1.0, c)) * 255) for c in (red, green, blue)]
+    result = "#" + "".join(f"{c:02x}" for c in channels)
+    if alpha < 1.0:
+        result += f"{round(max(0.0, alpha) * 255):02x}"
+    return result
+
+
+def parse_cursor_json(path: Path) -> dict[str, str]:
+    """Read the ``colors`` block of a theme's cursor.json."""
+    with open(path) as f:
+        data = json.load(f)
+    colors: dict[str, str] = {}
+    for key, value in (data.get("colors") or {}).items():
+        hex_color = normalize_hex(value)
+        if hex_color:
+            colors[key] = hex_color
+    return colors
+
+
+def parse_cosmic_ron(path: Path) -> dict[str, str]:
+    """Read the top-level ``Some((red, green, blue, alpha))`` colors of cosmic.ron."""
+    colors: dict[str, str] = {}
+    for match in _RON_COLOR_RE.finditer(path.read_text()):
+        key = _COSMIC_KEYS.get(match.group(1))
+        if key:
+            red, green, blue, alpha = (float(v) for v in match.groups()[1:])
+            colors[key] = _rgba_to_hex(red, green, blue, alpha)
+    return colors
+
+
+def parse_kitty_conf(path: Path) -> dict[str, str]:
+    """Read foreground/background/cursor and color0-15 from kitty.conf."""
+    colors: dict[str, str] = {}
+    for line in path.read_text().splitlines():
+        parts = line.split()
+        if len(parts) < 2 or parts[0].startswith("#"):
+            continue
+        key, value = parts[0], normalize_hex(parts[1])
+        if value is None:
+            continue
+        if key in ("foreground", "background", "cursor"):
+            colors[key] = value
+        elif key == "selection_background":
+            colors["selection"] = value
+        elif key.startswith("color") and key[5:].isdigit() and int(key[5:]) < 16:
+            colors[ANSI_KEYS[int(key[5:])]] = value
+    return colors
+
+
+def parse_alacritty_toml(path: Path) -> dict[str, str]:
+    """Read primary, cursor, selection, normal and bright colors from alacritty.toml."""
+    with open(path, "rb") as f:
+        data = tomllib.load(f).get("colors", {})
+    colors: dict[str, str] = {}
+
+    def put(key: str, value: object) -> None:
+        hex_color = normalize_hex(value)
+        if hex_color:
+            colors[key] = hex_color
+
+    primary = data.get("primary", {})
+    put("background", primary.get("background"))
+    put("foreground", primary.get("foreground"))
+    put("cursor", data.get("cursor", {}).get("cursor"))
+    put("selection", data.get("selection", {}).get("background"))
+    for name in ANSI_NAMES:
+        put(name, data.get("normal", {}).get(name))
+        put(f"bright_{name}", data.get("bright", {}).get(name))
+    return colors
+
+
+# Source files in priority order: earlier sources win for a given key.
+SOURCES = (
+    ("cursor.json", parse_cursor_json),
+    ("cosmic.ron", parse_cosmic_ron),
+    ("alacritty.toml", parse_alacritty_toml),
+    ("kitty.conf", parse_kitty_conf),
+)
+
+
+def extract_palette(theme_path: Path) -> dict[str, str]:
+    """Reconcile all color sources of a theme into one canonical palette.
+
+    Keys appear in ``CANONICAL_KEYS`` order; keys no source defines are omitted.
+    Unreadable or malformed sources are skipped.
+    """
+    merged: dict[str, str] = {}
+    for filename, parser in SOURCES:
+        source = theme_path / filename
+        if not source.is_file():
+            continue
+        try:
+            colors = parser(source)
+        except (OSError, ValueError, tomllib.TOMLDecodeError):
+            continue
+        for key, value in colors.items():
+            merged.setdefault(key, value)
+
+    # cursor.json's "terminal" is the terminal background; fall back to it
+    if "terminal" not in merged and "background" in merged:
+        merged["terminal"] = merged["background"]
+    return {key: merged[key] for key in CANONICAL_KEYS if key in merged}
+
+
+@dataclass
+class ExtractResult:
+    theme: str
+    colors: dict[str, str]
+    changed: bool
+    error: str | None = None
+
+
+def write_palette(theme_path: Path, colors: dict[str, str], dry_run: bool = False) -> bool:
+    """Store ``colors`` in the theme's theme.yaml, keeping all other keys.
+
+    The file is only rewritten (atomically) when the palette actually differs.
+
+    Returns:
+        True if theme.yaml was (or, with dry_run, would be) changed.
+    """
+    yaml_path = theme_path / "theme.yaml"
+    data: dict = {}
+    if yaml_path.exists():
+        with open(yaml_path) as f:
+            data = yaml.safe_load(f) or {}
+    else:
+        data = {
+            "name": theme_path.name.replace("-", " ").title(),
+            "variant": "light" if (theme_path / "light.mode").exists() else "dark",
+        }
+
+    if data.get("colors") == colors:
+        return False
+    if dry_run:
+        return True
+
+    data["colors"] = colors
+    tmp_path = yaml_path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            yaml.dump(data, f, sort_keys=False, indent=2)
+        tmp_path.replace(yaml_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return True
+
+
+def _extract_one(theme_path: Path, dry_run: bool) -> ExtractResult:
+    try:
+        colors = extract_palette(theme_path)
+        if not colors:
+            return ExtractResult(theme_path.name, colors, False, "no color sources found")
+        changed = write_palette(theme_path, colors, dry_run=dry_run)
+        return ExtractResult(theme_path.name, colors, changed)
+    except (OSError, yaml.YAMLError) as e:
+        return ExtractResult(theme_path.name, {}, False, str(e))
+
+
+def extract_all(
+    theme_paths: Iterable[Path],
+    jobs: int | None = None,
+    dry_run: bool = False,
+) -> list[ExtractResult]:
+    """Extract and store palettes for many themes concurrently.
+
+    Args:
+        theme_paths: Theme directories to process.
+        jobs: Maximum worker threads (default: CPU count).
+        dry_run: Report what would change without writing.
+
+    Returns:
+        One result per theme, in input order.
+    """
+    paths = list(theme_paths)
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(paths) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda p: _extract_one(p, dry_run), paths))
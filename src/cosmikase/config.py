@@ -1,21 +1,222 @@
 """Configuration helpers for cosmikase.
 
 Provides YAML config parsing utilities for shell scripts and Python tools.
+
+A config can be layered: ``load_config`` takes one file or a list of files
+(base → role → host), and a file's ``extends`` key names further layers
+(relative to the file) to put before it. Layers are combined with
+``deep_merge``. Parsed layers are memoized by content digest and merged
+results by the chain of digests, so layers shared by several configs are
+parsed once and a shared prefix of layers is merged once.
 """
 
 from __future__ import annotations
 
+import copy
+import hashlib
 import json
+from collections.abc import Iterable, Sequence
 from pathlib import Path
 from typing import Any
 
 import yaml
 
+EXTENDS_KEY = "extends"
+
+# Memo tables: layer digests by (path, mtime, size), parsed layers by
+# digest, merged configs by the digests of their chain of layers
+_DIGESTS: dict[tuple[str, int, int], str] = {}
+_PARSED: dict[str, dict[str, Any]] = {}
+_MERGED: dict[tuple[str, ...], dict[str, Any]] = {}
+
+
+class LayerError(ValueError):
+    """A config layer is missing, unreadable, not a mapping or extends itself."""
+
+
+def read_layer(path: Path) -> tuple[str, dict[str, Any]]:
+    """A layer's content digest and parsed mapping (memoized)."""
+    try:
+        stat = path.stat()
+        stamp = (str(path), stat.st_mtime_ns, stat.st_size)
+        digest = _DIGESTS.get(stamp)
+        if digest is None:
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in _PARSED:
+                parsed = yaml.safe_load(data) or {}
+                if not isinstance(parsed, dict):
+                    raise LayerError(f"{path}: expected a mapping")
+                _PARSED[digest] = parsed
+            _DIGESTS[stamp] = digest
+    except (OSError, yaml.YAMLError) as e:
+        raise LayerError(f"{path}: {e}") from None
+    return digest, _PARSED[digest]
+
+
+def layer_chain(path: Path | str, _visiting: tuple[Path, ...] = ()) -> list[Path]:
+    """Every layer ``path`` is built from, bases first, ending with ``path``."""
+    path = Path(path).resolve()
+    if path in _visiting:
+        raise LayerError(f"{path}: extends itself")
+    _, layer = read_layer(path)
+    extends = layer.get(EXTENDS_KEY) or []
+    if isinstance(extends, str):
+        extends = [extends]
+    chain: list[Path] = []
+    for base in extends:
+        for layer_path in layer_chain(path.parent / base, (*_visiting, path)):
+            if layer_path not in chain:
+                chain.append(layer_path)
+    chain.append(path)
+    return chain
+
+
+def config_layers(paths: Path | str | Sequence[Path | str]) -> list[Path]:
+    """The full chain of layers for one config file or a list of them."""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    chain: list[Path] = []
+    for path in paths:
+        for layer in layer_chain(path):
+            if layer not in chain:
+                chain.append(layer)
+    return chain
+
+
+def merge_chain(chain: Iterable[Path]) -> tuple[str, dict[str, Any]]:
+    """Merged config of ``chain`` and the digest of its inputs.
+
+    Every prefix of the chain is memoized. The result is shared with the
+    memo table and must not be modified.
+    """
+    digests: tuple[str, ...] = ()
+    merged: dict[str, Any] = {}
+    for path in chain:
+        digest, layer = read_layer(path)
+        digests = (*digests, digest)
+        cached = _MERGED.get(digests)
+        if cached is None:
+            overlay = {key: value for key, value in layer.items() if key != EXTENDS_KEY}
+            cached = _MERGED[digests] = deep_merge(merged, overlay)
+        merged = cached
+    return chain_digest(digests), merged
+
+
+def chain_digest(digests: Iterable[str]) -> str:
+    return hashlib.sha256("".join(digests).encode()).hexdigest()
+
+
+def load_config(path: Path | str | Sequence[Path | str]) -> dict[str, Any]:
+    """Load the cosmikase YAML configuration, merging its layers.
 
-def load_config(path: Path | str) -> dict[str, Any]:
-    """Load and parse the cosmikase YAML configuration file."""
-    path = Path(path)
-    return yaml.safe_load(path.read_text())
+    Args:
+        path: Config file, or a list of layer files from base to host. Each
+            file's ``extends`` layers are included before it.
+
+    Raises:
+        LayerError: If a layer can't be read or parsed.
+    """
+    _, merged = merge_chain(config_layers(path))
+    return copy.deepcopy(merged)
+
+
+def provenance(path: Path | str | Sequence[Path | str]) -> dict[str, list[Path]]:
+    """Which layers set each value and item of a layered config.
+
+    Keys are dotted paths, with list items by name or id in brackets
+    (``defaults.theme``, ``apt.core[htop]``, ``npm[@openai/codex]``). Values
+    list the layers that set the entry, in merge order: the first defined
+    it, the last decided its merged value. Layers are followed with the
+    same rules as ``deep_merge``, so a list a layer replaces only keeps
+    the entries of its new items.
+    """
+    index: dict[str, list[Path]] = {}
+
+    def record(prefix: str, value: Any, layer: Path, history: dict[str, list[Path]]) -> None:
+        if isinstance(value, dict) and value:
+            for key, child in value.items():
+                record(f"{prefix}.{key}" if prefix else str(key), child, layer, history)
+            return
+        keys = [item_key(item) for item in value] if isinstance(value, list) else []
+        entries = [f"{prefix}[{key}]" for key in keys] if keys and all(keys) else [prefix]
+        for entry in entries:
+            index[entry] = [*history.get(entry, []), layer]
+
+    def replace(prefix: str, value: Any, layer: Path) -> None:
+        # Entries the new value still has keep the layers that set them before
+        below = (f"{prefix}.", f"{prefix}[")
+        replaced = [entry for entry in index if entry == prefix or entry.startswith(below)]
+        record(prefix, value, layer, {entry: index.pop(entry) for entry in replaced})
+
+    def merge(prefix: str, base: Any, overlay: Any, layer: Path) -> None:
+        if isinstance(base, dict) and isinstance(overlay, dict):
+            for key, value in overlay.items():
+                child = f"{prefix}.{key}" if prefix else str(key)
+                if key in base:
+                    merge(child, base[key], value, layer)
+                else:
+                    replace(child, value, layer)
+        elif _merges_by_key(base, overlay):
+            for item in overlay:
+                index.setdefault(f"{prefix}[{item_key(item)}]", []).append(layer)
+        else:
+            replace(prefix, overlay, layer)
+
+    merged: dict[str, Any] = {}
+    for layer in config_layers(path):
+        _, data = read_layer(layer)
+        data = {key: value for key, value in data.items() if key != EXTENDS_KEY}
+        merge("", merged, data, layer)
+        merged = deep_merge(merged, data)
+    return index
+
+
+def item_key(item: Any) -> str | None:
+    """Key identifying a list item across layers: its name or id."""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return item.get("name") or item.get("id")
+    return None
+
+
+def _merges_by_key(base: Any, overlay: Any) -> bool:
+    """Whether ``deep_merge`` merges these lists by item key rather than replacing ``base``."""
+    return (
+        isinstance(base, list)
+        and isinstance(overlay, list)
+        and bool(overlay)
+        and all(isinstance(item, dict) and item_key(item) for item in overlay)
+        and all(item_key(item) for item in base)
+    )
+
+
+def deep_merge(base: Any, overlay: Any) -> Any:
+    """Merge ``overlay`` onto ``base`` without modifying either.
+
+    Mappings merge recursively. An overlay list of mappings that all have a
+    name or id is merged into a base list of named items by that key: an
+    overlay item updates the base item with the same key (so ``{name: htop,
+    install: false}`` disables it) and new items are appended. Anything else
+    in ``overlay``, including a list of strings or an empty list, replaces the
+    base value. Unchanged values are shared with ``base``, not copied.
+    """
+    if isinstance(base, dict) and isinstance(overlay, dict):
+        merged = dict(base)
+        for key, value in overlay.items():
+            merged[key] = deep_merge(base[key], value) if key in base else value
+        return merged
+    if _merges_by_key(base, overlay):
+        merged_items: dict[str, Any] = {item_key(item): item for item in base}
+        for item in overlay:
+            key = item_key(item)
+            old = merged_items.get(key)
+            merged_items[key] = (
+                deep_merge(old, item) if isinstance(old, dict) and isinstance(item, dict) else item
+            )
+        return list(merged_items.values())
+    return overlay
 
 
 def enabled_items(
@@ -134,8 +335,9 @@ def _main() -> None:
     parser.add_argument(
         "--config",
         "-c",
-        default="cosmikase.yaml",
-        help="Path to config file (default: cosmikase.yaml)",
+        action="append",
+        help="Path to config file; repeat to layer files from base to host "
+        "(default: cosmikase.yaml)",
     )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -158,12 +360,17 @@ def _main() -> None:
     )
 
     args = parser.parse_args()
-    config_path = Path(args.config)
-    if not config_path.exists():
-        print(f"Config file not found: {config_path}", file=sys.stderr)
-        sys.exit(1)
+    layers = [Path(path) for path in args.config or ["cosmikase.yaml"]]
+    for config_path in layers:
+        if not config_path.exists():
+            print(f"Config file not found: {config_path}", file=sys.stderr)
+            sys.exit(1)
 
-    config = load_config(config_path)
+    try:
+        config = load_config(layers)
+    except LayerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
     if args.command == "get":
         value = get_value(config, args.path, args.default)
@@ -0,0 +1,246 @@
+"""Transactional writes to COSMIC's config tree (``~/.config/cosmic``).
+
+cosmic-settings-daemon watches every config key file with inotify and
+reloads on each change. Applying a theme touches several keys (mode, color
+theme, terminal scheme, wallpaper), so they are staged first and committed in
+one batch: every new file is written and fsync'd next to its target, the
+previous contents are snapshotted, and only then are the files renamed into
+place back to back. Keys whose contents are unchanged are not touched at all.
+
+The snapshot of the last commit lets ``rollback`` restore the previous state
+in one more batch, including after a commit that was interrupted halfway.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cosmikase.images import IMAGE_SUFFIXES
+from cosmikase.validate import validate_ron
+
+MODE = "com.system76.CosmicTheme.Mode"
+THEME_DARK = "com.system76.CosmicTheme.Dark"
+THEME_LIGHT = "com.system76.CosmicTheme.Light"
+TERM = "com.system76.CosmicTerm"
+BACKGROUND = "com.system76.CosmicBackground"
+
+_TMP_SUFFIX = ".cosmikase-tmp"
+
+
+def default_config_dir() -> Path:
+    return Path.home() / ".config" / "cosmic"
+
+
+def default_snapshot_path() -> Path:
+    base = os.environ.get("XDG_STATE_HOME") or str(Path.home() / ".local" / "state")
+    return Path(base) / "cosmikase" / "cosmic-snapshot.json"
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class CommitResult:
+    written: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.written or self.removed)
+
+
+class CosmicConfig:
+    """Stages COSMIC config key writes and commits them as one batch."""
+
+    def __init__(self, root: Path | None = None, snapshot_path: Path | None = None) -> None:
+        self.root = root or default_config_dir()
+        self.snapshot_path = snapshot_path or default_snapshot_path()
+        # Relative key path -> new contents, or None to remove the key
+        self._staged: dict[str, str | None] = {}
+
+    @staticmethod
+    def key_path(component: str, key: str, version: int = 1) -> str:
+        return f"{component}/v{version}/{key}"
+
+    def set(self, component: str, key: str, value: str, version: int = 1) -> None:
+        self._staged[self.key_path(component, key, version)] = value
+
+    def remove(self, component: str, key: str, version: int = 1) -> None:
+        self._staged[self.key_path(component, key, version)] = None
+
+    def get(self, component: str, key: str, version: int = 1) -> str | None:
+        return self._read(self.key_path(component, key, version))
+
+    def _read(self, rel: str) -> str | None:
+        try:
+            return (self.root / rel).read_text()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def commit(self) -> CommitResult:
+        """Write every staged key that changed, as one batch of atomic renames."""
+        staged, self._staged = self._staged, {}
+        result = CommitResult()
+        changes: dict[str, str | None] = {}
+        previous: dict[str, str | None] = {}
+        for rel, content in staged.items():
+            current = self._read(rel)
+            if current == content:
+                result.unchanged.append(rel)
+            else:
+                changes[rel] = content
+                previous[rel] = current
+        if not changes:
+            return result
+
+        self._apply(changes, previous)
+        for rel, content in changes.items():
+            (result.written if content is not None else result.removed).append(rel)
+        return result
+
+    def _apply(self, changes: dict[str, str | None], previous: dict[str, str | None]) -> None:
+        # 1. Write and fsync every new file next to its target
+        pending: list[tuple[Path, Path]] = []
+        try:
+            for rel, content in changes.items():
+                if content is None:
+                    continue
+                target = self.root / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = target.with_name(f".{target.name}{_TMP_SUFFIX}")
+                pending.append((tmp_path, target))
+                with open(tmp_path, "w") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            for tmp_path, _ in pending:
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+        # 2. Snapshot what is about to be replaced
+        self._save_snapshot(previous)
+
+        # 3. Swap everything in, back to back
+        for tmp_path, target in pending:
+            os.replace(tmp_path, target)
+        for rel, content in changes.items():
+            if content is None:
+                (self.root / rel).unlink(missing_ok=True)
+        for directory in {(self.root / rel).parent for rel in changes}:
+            if directory.is_dir():
+                _fsync_dir(directory)
+
+    def _save_snapshot(self, previous: dict[str, str | None]) -> None:
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_name(f".{self.snapshot_path.name}.tmp")
+        data = {"root": str(self.root), "files": previous}
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.snapshot_path)
+
+    def has_snapshot(self) -> bool:
+        return self.snapshot_path.is_file()
+
+    def rollback(self) -> CommitResult:
+        """Restore the keys changed by the last commit.
+
+        The rollback is itself a commit, so rolling back twice redoes the change.
+
+        Raises:
+            FileNotFoundError: If there is no snapshot.
+            ValueError: If the snapshot is unreadable or belongs to another config dir.
+        """
+        try:
+            data = json.loads(self.snapshot_path.read_text())
+            files = data["files"]
+        except (KeyError, TypeError, json.JSONDecodeError):
+            raise ValueError(f"Invalid COSMIC snapshot: {self.snapshot_path}") from None
+        if data.get("root") != str(self.root):
+            raise ValueError(f"Snapshot {self.snapshot_path} is for {data.get('root')}")
+        self._staged = dict(files)
+        return self.commit()
+
+
+def find_wallpaper(theme_path: Path) -> Path | None:
+    backgrounds = theme_path / "backgrounds"
+    if not backgrounds.is_dir():
+        return None
+    images = sorted(
+        p for p in backgrounds.iterdir() if p.is_file() and p.name.lower().endswith(IMAGE_SUFFIXES)
+    )
+    return images[0].resolve() if images else None
+
+
+def wallpaper_config(wallpaper: Path) -> str:
+    return f"""(
+    output: "all",
+    source: Path("{wallpaper}"),
+    filter_by_theme: false,
+    rotation_frequency: 3600,
+    filter_method: Lanczos,
+    scaling_mode: Zoom,
+    sampling_method: Alphanumeric,
+)
+"""
+
+
+def stage_theme(
+    config: CosmicConfig,
+    theme_path: Path,
+    colors: bool = True,
+    terminal: bool = True,
+    wallpaper: bool = True,
+) -> None:
+    """Stage the COSMIC keys for ``theme_path`` (mode, colors, terminal, wallpaper).
+
+    Raises:
+        ValueError: If the theme's RON files are invalid.
+    """
+    for name in ("cosmic.ron", "cosmic-term.ron"):
+        path = theme_path / name
+        if path.is_file() and not validate_ron(path):
+            raise ValueError(f"Invalid RON syntax in {path}")
+
+    is_light = (theme_path / "light.mode").is_file()
+    config.set(MODE, "is_dark", "false\n" if is_light else "true\n")
+    if colors and (theme_path / "cosmic.ron").is_file():
+        component = THEME_LIGHT if is_light else THEME_DARK
+        config.set(component, "theme", (theme_path / "cosmic.ron").read_text())
+    if terminal and (theme_path / "cosmic-term.ron").is_file():
+        config.set(TERM, "color_scheme", (theme_path / "cosmic-term.ron").read_text())
+    if wallpaper:
+        image = find_wallpaper(theme_path)
+        if image is not None:
+            config.set(BACKGROUND, "all", wallpaper_config(image))
+            config.remove(BACKGROUND, "source")
+
+
+def apply_cosmic_theme(
+    theme_path: Path,
+    colors: bool = True,
+    terminal: bool = True,
+    wallpaper: bool = True,
+    config: CosmicConfig | None = None,
+) -> CommitResult | None:
+    """Apply a theme to COSMIC in one commit; None if COSMIC isn't configured.
+
+    Raises:
+        ValueError: If the theme's RON files are invalid.
+    """
+    config = config or CosmicConfig()
+    if not config.root.is_dir():
+        return None
+    stage_theme(config, theme_path, colors=colors, terminal=terminal, wallpaper=wallpaper)
+    return config.commit()
@@ -0,0 +1,258 @@
+"""Shared, content-addressed cache for installer and font downloads.
+
+Downloads are stored once by SHA-256 (the same ``<xx>/<sha256>`` layout as
+the wallpaper blob store) under ``~/.cache/cosmikase/downloads``, with a small
+index per URL recording the digest and the server's validators. A cached URL
+is revalidated with ``If-None-Match``/``If-Modified-Since`` rather than
+downloaded again; if the server can't be reached, the cached copy is used.
+Interrupted downloads resume with a ``Range`` request (guarded by
+``If-Range``), and the cache is trimmed to a size cap by evicting the least
+recently used blobs.
+
+A read-only mirror directory with the same layout (for example another
+machine's cache on a shared mount, set with ``COSMIKASE_DOWNLOAD_MIRROR``) is
+consulted before the network, so a whole lab can provision from one warm
+cache. Mirrored copies of URLs without a pinned ``sha256`` ("latest"-style
+URLs) are revalidated with the server like cached ones, with the mirror's
+validators; a changed file is downloaded into the local cache.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import http.client
+import json
+import os
+import urllib.error
+import urllib.request
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from cosmikase.blobstore import BlobStore, file_digest
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+MIRROR_ENV = "COSMIKASE_DOWNLOAD_MIRROR"
+_CHUNK = 1024 * 1024
+_TIMEOUT = 60
+
+
+class DownloadError(Exception):
+    """A URL could not be downloaded and isn't cached."""
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "cosmikase" / "downloads"
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+@dataclass
+class Download:
+    url: str
+    path: Path
+    digest: str
+    status: str  # downloaded, resumed, revalidated, cached, mirror, stale
+
+
+class DownloadCache:
+    """Blobs under ``<root>/blobs``, per-URL index entries under ``<root>/index``."""
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        mirror: Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.root = root or default_cache_dir()
+        if mirror is None and os.environ.get(MIRROR_ENV):
+            mirror = Path(os.environ[MIRROR_ENV])
+        self.mirror = mirror
+        self.max_bytes = max_bytes
+        self.store = BlobStore(self.root / "blobs")
+
+    # --- Index ---------------------------------------------------------------
+
+    def _index_path(self, root: Path, url: str) -> Path:
+        return root / "index" / f"{url_key(url)}.json"
+
+    def _read_entry(self, root: Path, url: str) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(self._index_path(root, url).read_text())
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        blob = BlobStore(root / "blobs").path_for(entry.get("digest", ""))
+        return entry if blob.is_file() else None
+
+    def _write_entry(self, url: str, entry: dict[str, Any]) -> None:
+        path = self._index_path(self.root, url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"url": url, **entry}))
+        tmp_path.replace(path)
+
+    # --- Fetching ------------------------------------------------------------
+
+    def fetch(self, url: str, sha256: str | None = None, offline: bool = False) -> Download:
+        """Return a local copy of ``url``, downloading only what is needed.
+
+        Args:
+            url: URL to fetch.
+            sha256: Expected content digest; a mismatch raises DownloadError.
+            offline: Use the cache or mirror without contacting the server.
+
+        Raises:
+            DownloadError: If the URL isn't cached and can't be downloaded.
+        """
+        cached = self._read_entry(self.root, url)
+        source = self.root
+        if cached is None and self.mirror is not None:
+            mirrored = self._read_entry(self.mirror, url)
+            if mirrored is not None and (sha256 is None or mirrored["digest"] == sha256):
+                if sha256 is not None or offline:
+                    # A pinned digest can't go stale
+                    return self._hit(url, mirrored, "mirror", self.mirror)
+                cached, source = mirrored, self.mirror
+
+        if cached is not None and (offline or cached["digest"] == sha256):
+            return self._hit(url, cached, "cached")
+        if offline:
+            raise DownloadError(f"{url} is not cached")
+
+        try:
+            result = self._download(url, cached, source)
+        except (OSError, http.client.HTTPException) as e:
+            if cached is not None:
+                return self._hit(url, cached, "stale", source)
+            raise DownloadError(f"Could not download {url}: {e}") from None
+
+        if sha256 is not None and result.digest != sha256:
+            raise DownloadError(f"{url}: expected sha256 {sha256}, got {result.digest}")
+        self.prune()
+        return result
+
+    def _hit(
+        self, url: str, entry: dict[str, Any], status: str, root: Path | None = None
+    ) -> Download:
+        if root is not None and root != self.root:
+            # Mirrors are read-only snapshots: use their blobs as they are
+            path = BlobStore(root / "blobs").path_for(entry["digest"])
+            return Download(url, path, entry["digest"], status)
+        path = self.store.path_for(entry["digest"])
+        with contextlib.suppress(OSError):
+            os.utime(path)  # Mark as recently used
+        return Download(url, path, entry["digest"], status)
+
+    def _download(
+        self, url: str, cached: dict[str, Any] | None, source: Path | None = None
+    ) -> Download:
+        """Download ``url``, or revalidate the entry ``cached`` from the ``source`` cache."""
+        headers = {"User-Agent": "cosmikase"}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        partial = self.root / "partial" / url_key(url)
+        partial_meta = partial.with_suffix(".json")
+        offset = 0
+        if cached is None and partial.is_file():
+            try:
+                validator = json.loads(partial_meta.read_text()).get("validator")
+            except (OSError, ValueError):
+                validator = None
+            if validator:
+                offset = partial.stat().st_size
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            response = urllib.request.urlopen(request, timeout=_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached is not None:
+                mirrored = source is not None and source != self.root
+                return self._hit(url, cached, "mirror" if mirrored else "revalidated", source)
+            if e.code == 416 and offset:
+                # The partial file is already complete (or stale): start over
+                partial.unlink(missing_ok=True)
+                partial_meta.unlink(missing_ok=True)
+                return self._download(url, cached, source)
+            raise
+
+        with response:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            resumed = offset > 0 and response.status == 206
+            partial.parent.mkdir(parents=True, exist_ok=True)
+            partial_meta.write_text(json.dumps({"validator": etag or last_modified}))
+            with open(partial, "ab" if resumed else "wb") as f:
+                while chunk := response.read(_CHUNK):
+                    f.write(chunk)
+            if getattr(response, "length", None):
+                # The connection closed early; keep the partial file to resume
+                raise http.client.IncompleteRead(b"", response.length)
+
+        digest = file_digest(partial)
+        self.store.add(partial, digest)
+        partial.unlink(missing_ok=True)
+        partial_meta.unlink(missing_ok=True)
+        self._write_entry(url, {"digest": digest, "etag": etag, "last_modified": last_modified})
+        status = "resumed" if resumed else "downloaded"
+        return Download(url, self.store.path_for(digest), digest, status)
+
+    def fetch_all(
+        self, urls: Iterable[str], jobs: int = 4, offline: bool = False
+    ) -> list[Download | DownloadError]:
+        """Fetch ``urls`` with at most ``jobs`` downloads in flight."""
+        urls = list(urls)
+
+        def fetch(url: str) -> Download | DownloadError:
+            try:
+                return self.fetch(url, offline=offline)
+            except DownloadError as e:
+                return e
+
+        # Each URL is fetched once, even if listed twice
+        unique = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            results = dict(zip(unique, pool.map(fetch, unique), strict=True))
+        return [results[url] for url in urls]
+
+    # --- Eviction ------------------------------------------------------------
+
+    def prune(self, max_bytes: int | None = None) -> int:
+        """Evict least recently used blobs until the cache fits in ``max_bytes``.
+
+        Index entries of evicted blobs are dropped when next read.
+
+        Returns:
+            Number of blobs removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = []
+        total = 0
+        for blob in self.store.blobs():
+            try:
+                stat = blob.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, blob))
+            total += stat.st_size
+        removed = 0
+        for _, size, blob in sorted(entries):
+            if total <= max_bytes:
+                break
+            blob.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
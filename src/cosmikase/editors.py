@@ -0,0 +1,386 @@
+"""Theme and extension management for Cursor, VS Code and Antigravity.
+
+``cursor.json`` is read once per switch. Each editor's installed extensions are
+listed concurrently and cached by the mtime of its extensions directory, so the
+slow ``<editor> --list-extensions`` only runs after an extension changes.
+``settings.json`` (JSON with comments) is patched in place: only the
+``workbench.colorTheme`` value is replaced, and the file isn't written when it
+already has the theme. The editors pick the change up live, no reload needed.
+
+``install_extensions`` installs an extension list (``extensions.txt``) the same
+way: it diffs against the installed set and installs only what is missing,
+with bounded concurrency per editor and all editors in parallel.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from cosmikase.themes import read_theme_file
+
+COLOR_THEME_KEY = "workbench.colorTheme"
+
+
+@dataclass(frozen=True)
+class Editor:
+    name: str
+    command: str
+    config_dir: str  # Relative to $HOME
+    extensions_dir: str  # Relative to $HOME
+
+    def settings_path(self, home: Path) -> Path:
+        return home / self.config_dir / "User" / "settings.json"
+
+
+EDITORS = (
+    Editor("Cursor", "cursor", ".config/Cursor", ".cursor/extensions"),
+    Editor("VS Code", "code", ".config/Code", ".vscode/extensions"),
+    Editor("Antigravity", "antigravity", ".config/Antigravity", ".antigravity/extensions"),
+)
+
+
+@dataclass
+class EditorResult:
+    editor: str
+    settings_changed: bool = False
+    extension_installed: bool = False
+    warning: str | None = None
+
+
+# --- JSONC editing ---------------------------------------------------------
+
+_LITERAL_RE = re.compile(r"[^\s{}\[\],:/\"]+")
+
+
+def _tokens(text: str) -> Iterator[tuple[str, int, int]]:
+    """Yield (kind, start, end) for the JSONC tokens of ``text``, skipping comments.
+
+    ``kind`` is the punctuation character itself, "string" or "literal".
+    """
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end + 1
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end == -1:
+                raise ValueError("Unterminated comment")
+            i = end + 2
+        elif ch == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            if j >= n:
+                raise ValueError("Unterminated string")
+            yield "string", i, j + 1
+            i = j + 1
+        elif ch in "{}[],:":
+            yield ch, i, i + 1
+            i += 1
+        else:
+            match = _LITERAL_RE.match(text, i)
+            if not match:
+                raise ValueError(f"Unexpected character {ch!r} at offset {i}")
+            yield "literal", i, match.end()
+            i = match.end()
+
+
+def _find_member(text: str, key: str) -> tuple[int, tuple[int, int] | None]:
+    """Locate top-level ``key`` in a JSONC object.
+
+    Returns:
+        The offset just after the opening brace, and the (start, end) span of
+        the key's value, or None if the key is absent.
+    """
+    tokens = list(_tokens(text))
+    if not tokens or tokens[0][0] != "{":
+        raise ValueError("settings are not a JSON object")
+    depth = 0
+    expect_key = False
+    for i, (kind, start, end) in enumerate(tokens):
+        if kind in "{[":
+            depth += 1
+            expect_key = kind == "{" and depth == 1
+        elif kind in "}]":
+            depth -= 1
+        elif kind == "," and depth == 1:
+            expect_key = True
+        elif kind == "string" and expect_key:
+            expect_key = False
+            if json.loads(text[start:end]) != key:
+                continue
+            if i + 2 >= len(tokens) or tokens[i + 1][0] != ":":
+                raise ValueError(f"Malformed member {key!r}")
+            # The value runs until the tokens return to the object's depth
+            value_start = tokens[i + 2][1]
+            nested = 0
+            for value_kind, _, value_end in tokens[i + 2 :]:
+                if value_kind in "{[":
+                    nested += 1
+                elif value_kind in "}]":
+                    nested -= 1
+                if nested <= 0:
+                    return tokens[0][2], (value_start, value_end)
+            raise ValueError(f"Malformed member {key!r}")
+    return tokens[0][2], None
+
+
+def set_jsonc_value(text: str, key: str, value: Any) -> str | None:
+    """Set top-level ``key`` in JSONC ``text``, leaving everything else untouched.
+
+    Returns:
+        The new text, or None if ``key`` already has ``value``.
+    """
+    if not text.strip():
+        text = "{}\n"
+    brace_end, span = _find_member(text, key)
+    encoded = json.dumps(value)
+    if span is not None:
+        start, end = span
+        try:
+            if json.loads(text[start:end]) == value:
+                return None
+        except ValueError:
+            pass  # Not plain JSON (e.g. a trailing comma inside); replace it
+        return text[:start] + encoded + text[end:]
+
+    # Insert as the first member, so no trailing comma handling is needed
+    has_members = next(_tokens(text[brace_end:]))[0] != "}"
+    member = f"\n    {json.dumps(key)}: {encoded}"
+    return text[:brace_end] + member + ("," if has_members else "\n") + text[brace_end:]
+
+
+def update_settings(path: Path, key: str, value: Any) -> bool:
+    """Set ``key`` in the JSONC settings file ``path``.
+
+    Returns:
+        True if the file changed.
+    """
+    try:
+        text = path.read_text()
+    except FileNotFoundError:
+        text = ""
+    new_text = set_jsonc_value(text, key, value)
+    if new_text is None:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(new_text)
+    tmp_path.replace(path)
+    return True
+
+
+# --- Extensions ------------------------------------------------------------
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "cosmikase" / "editor-extensions.json"
+
+
+class ExtensionCache:
+    """Installed extensions per editor, valid while the extensions dir mtime holds."""
+
+    def __init__(self, path: Path | None = None, home: Path | None = None) -> None:
+        self.path = path or default_cache_path()
+        self.home = home or Path.home()
+        try:
+            self._entries: dict[str, Any] = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _mtime(self, editor: Editor) -> int | None:
+        try:
+            return (self.home / editor.extensions_dir).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def installed(self, editor: Editor, command: str) -> set[str]:
+        """Lowercased extension ids installed in ``editor``."""
+        mtime = self._mtime(editor)
+        entry = self._entries.get(editor.command)
+        if mtime is not None and entry and entry.get("mtime_ns") == mtime:
+            return set(entry["extensions"])
+
+        result = subprocess.run(
+            [command, "--list-extensions"], capture_output=True, text=True, check=False
+        )
+        extensions = {line.strip().lower() for line in result.stdout.splitlines() if line.strip()}
+        if result.returncode == 0 and mtime is not None:
+            self._entries[editor.command] = {"mtime_ns": mtime, "extensions": sorted(extensions)}
+        return extensions
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            tmp_path.write_text(json.dumps(self._entries, sort_keys=True))
+            tmp_path.replace(self.path)
+        except OSError:
+            pass  # Only a cache
+
+
+def default_extensions_file() -> Path:
+    return Path.home() / ".config" / "Cursor" / "extensions.txt"
+
+
+def parse_extensions_file(path: Path) -> list[str]:
+    """Extension ids listed in ``path``, ignoring comments and blank lines."""
+    extensions = []
+    for line in path.read_text().splitlines():
+        ext = line.split("#", 1)[0].replace(" ", "").strip()
+        if ext and ext.lower() not in {e.lower() for e in extensions}:
+            extensions.append(ext)
+    return extensions
+
+
+@dataclass
+class InstallReport:
+    editor: str
+    present: int = 0
+    installed: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def _install_one(
+    command: str, extension: str, timeout: float, retries: int, backoff: float
+) -> bool:
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * attempt)
+        try:
+            result = subprocess.run(
+                [command, "--install-extension", extension, "--force"],
+                capture_output=True,
+                timeout=timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            continue
+        if result.returncode == 0:
+            return True
+    return False
+
+
+def install_extensions(
+    wanted: Iterable[str],
+    editors: Iterable[Editor],
+    jobs: int = 4,
+    timeout: float = 120.0,
+    retries: int = 2,
+    backoff: float = 2.0,
+    cache: ExtensionCache | None = None,
+) -> list[InstallReport]:
+    """Install the ``wanted`` extensions that each editor is missing.
+
+    The installed set is listed once per editor (see ExtensionCache) and only
+    missing extensions are installed, ``jobs`` at a time per editor. Editors
+    are processed in parallel; editors whose command isn't on PATH are skipped.
+
+    Args:
+        wanted: Extension ids.
+        editors: Editors to install into.
+        jobs: Concurrent installs per editor.
+        timeout: Seconds allowed for a single install attempt.
+        retries: Extra attempts after a failed or timed-out install.
+        backoff: Seconds to wait before a retry (multiplied by the attempt).
+    """
+    wanted = list(wanted)
+    cache = cache or ExtensionCache()
+    available = [
+        (editor, command) for editor in editors if (command := shutil.which(editor.command))
+    ]
+
+    def run(item: tuple[Editor, str]) -> InstallReport:
+        editor, command = item
+        start = time.monotonic()
+        report = InstallReport(editor.name)
+        installed = cache.installed(editor, command)
+        missing = [ext for ext in wanted if ext.lower() not in installed]
+        report.present = len(wanted) - len(missing)
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            outcomes = pool.map(
+                lambda ext: _install_one(command, ext, timeout, retries, backoff), missing
+            )
+            for ext, ok in zip(missing, outcomes, strict=True):
+                (report.installed if ok else report.failed).append(ext)
+        report.seconds = time.monotonic() - start
+        return report
+
+    if not available:
+        return []
+    with ThreadPoolExecutor(max_workers=len(available)) as pool:
+        reports = list(pool.map(run, available))
+    cache.save()
+    return reports
+
+
+# --- Apply -----------------------------------------------------------------
+
+
+def read_cursor_theme(theme_path: Path) -> tuple[str, str | None] | None:
+    """Return (colorTheme, extension id) from a theme's cursor.json, or None without one.
+
+    Raises:
+        ValueError: If cursor.json is invalid or has no colorTheme.
+    """
+    raw = read_theme_file(theme_path, "cursor.json")
+    if raw is None:
+        return None
+    data = json.loads(raw)
+    color_theme = data.get("colorTheme") if isinstance(data, dict) else None
+    if not color_theme:
+        raise ValueError(f"No colorTheme found in {theme_path.name}/cursor.json")
+    return color_theme, data.get("extension") or None
+
+
+def apply_editor_theme(
+    color_theme: str,
+    extension: str | None = None,
+    editors: Iterable[Editor] = EDITORS,
+    install: bool = True,
+    home: Path | None = None,
+    cache: ExtensionCache | None = None,
+) -> list[EditorResult]:
+    """Set ``color_theme`` (installing ``extension``) in every installed editor.
+
+    Editors without a config directory are skipped. Extension checks and
+    installs run concurrently across editors.
+    """
+    home = home or Path.home()
+    present = [editor for editor in editors if (home / editor.config_dir).is_dir()]
+    results = {editor.name: EditorResult(editor.name) for editor in present}
+
+    if install and extension and present:
+        cache = cache or ExtensionCache(home=home)
+        for report in install_extensions([extension], present, retries=0, cache=cache):
+            result = results[report.editor]
+            result.extension_installed = bool(report.installed)
+            if report.failed:
+                result.warning = f"Failed to install {extension} in {report.editor}"
+
+    for editor in present:
+        result = results[editor.name]
+        try:
+            result.settings_changed = update_settings(
+                editor.settings_path(home), COLOR_THEME_KEY, color_theme
+            )
+        except (OSError, ValueError) as e:
+            result.warning = f"Could not update {editor.name} settings: {e}"
+    return list(results.values())
@@ -0,0 +1,202 @@
+"""Evaluate the configs of many hosts at once.
+
+A fleet directory holds one YAML file per host. A host file usually
+``extends`` shared layers (a base config, a role) and only overrides what is
+specific to that machine::
+
+    extends: [../base.yaml, ../roles/developer.yaml]
+    defaults: { theme: nord }
+    apt:
+      core:
+        - { name: htop, install: false }
+
+Layers are merged as ``load_config`` merges them; an extended layer may
+extend others in turn. Parsed layers and merged chains are memoized by
+content digest (see ``cosmikase.config``), so a base shared by hundreds of
+hosts is parsed and merged once per worker process. Hosts are grouped by
+their layer chain before being split across the process pool, so hosts
+sharing a chain land in the same worker.
+
+Each host yields one report entry: validation errors, the enabled packages
+per backend (as ``plan`` computes them), enabled installers, the theme and
+hardware notes. ``inputs`` is the digest of every layer in the host's chain,
+so entries of a previous report are reused for hosts none of whose layers
+changed, and ``digest`` summarizes the evaluated result, so comparing two
+reports lists the hosts an edit changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
+
+from cosmikase.config import (
+    LayerError,
+    chain_digest,
+    get_value,
+    layer_chain,
+    merge_chain,
+    read_layer,
+)
+from cosmikase.installers import installer_items
+from cosmikase.plan import wanted_packages
+from cosmikase.schema import CosmikaseConfig
+
+HOST_SUFFIXES = (".yaml", ".yml")
+
+# Below this many hosts, a process pool costs more than it saves
+_POOL_THRESHOLD = 16
+
+
+def host_files(directory: Path) -> list[Path]:
+    """Host configs in ``directory``, by name."""
+    return sorted(
+        path
+        for path in directory.iterdir()
+        if path.suffix in HOST_SUFFIXES and path.is_file() and not path.name.startswith(".")
+    )
+
+
+def merge_inputs(chain: Iterable[Path]) -> str:
+    """Digest of a chain's layer contents (``inputs`` of its report entry)."""
+    return chain_digest(read_layer(path)[0] for path in chain)
+
+
+def validation_errors(config: dict[str, Any]) -> list[str]:
+    try:
+        CosmikaseConfig.model_validate(config)
+    except ValidationError as e:
+        return [
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in e.errors()
+        ]
+    return []
+
+
+def evaluate_host(path: Path, chain: list[Path] | None = None) -> dict[str, Any]:
+    """Report entry for the host config at ``path``."""
+    entry: dict[str, Any] = {"host": path.stem, "path": str(path)}
+    try:
+        chain = chain or layer_chain(path)
+        inputs, config = merge_chain(chain)
+    except LayerError as e:
+        return {**entry, "valid": False, "errors": [str(e)], "digest": None}
+
+    errors = validation_errors(config)
+    try:
+        wanted = wanted_packages(config)
+        installers = sorted(item["name"] for item in installer_items(config) if "name" in item)
+    except (AttributeError, KeyError, TypeError):
+        # Malformed sections; the validation errors say why
+        wanted, installers = {}, []
+    result = {
+        "valid": not errors,
+        "errors": errors,
+        "theme": get_value(config, "defaults.theme"),
+        "packages": {backend: sorted(names) for backend, names in wanted.items()},
+        "installers": installers,
+        "hardware": {
+            section: value.get("notes")
+            for section, value in config.items()
+            if isinstance(value, dict) and value.get("emit_notes")
+        },
+    }
+    # Package specs (npm versions) count as changes too, not just the names
+    summary = json.dumps({**result, "specs": wanted}, sort_keys=True)
+    return {
+        **entry,
+        "layers": [str(layer) for layer in chain[:-1]],
+        "inputs": inputs,
+        **result,
+        "digest": hashlib.sha256(summary.encode()).hexdigest(),
+    }
+
+
+def _evaluate_batch(batch: list[tuple[str, list[str]]]) -> list[dict[str, Any]]:
+    return [evaluate_host(Path(path), [Path(p) for p in chain]) for path, chain in batch]
+
+
+def read_report(path: Path) -> dict[str, dict[str, Any]]:
+    """Entries of a JSON-lines fleet report, by host."""
+    entries = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["host"]] = entry
+    return entries
+
+
+def evaluate_fleet(
+    directory: Path,
+    jobs: int | None = None,
+    previous: dict[str, dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """Report entries for every host config in ``directory``, by host name.
+
+    Entries of ``previous`` whose ``inputs`` still match are reused as is
+    (with ``"reused": true``); other hosts are evaluated across a process
+    pool of ``jobs`` workers.
+    """
+    previous = previous or {}
+    entries: dict[str, dict[str, Any]] = {}
+    pending: list[tuple[str, list[str]]] = []
+    for path in host_files(directory):
+        try:
+            chain = layer_chain(path)
+            inputs = merge_inputs(chain)
+        except LayerError:
+            entries[path.stem] = evaluate_host(path)
+            continue
+        old = previous.get(path.stem)
+        if old is not None and old.get("inputs") == inputs and old.get("path") == str(path):
+            entries[path.stem] = {**old, "reused": True}
+        else:
+            pending.append((str(path), [str(layer) for layer in chain]))
+
+    # Hosts with the same bases next to each other, so batches share merges
+    pending.sort(key=lambda item: (item[1][:-1], item[0]))
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(pending) < _POOL_THRESHOLD:
+        results = _evaluate_batch(pending)
+    else:
+        size = -(-len(pending) // (jobs * 4))
+        batches = [pending[i : i + size] for i in range(0, len(pending), size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = [entry for batch in pool.map(_evaluate_batch, batches) for entry in batch]
+    for entry in results:
+        entries[entry["host"]] = entry
+    return [entries[name] for name in sorted(entries)]
+
+
+def hosts_enabling(entries: Iterable[dict[str, Any]], name: str) -> list[str]:
+    """Hosts that enable package or installer ``name`` in any backend."""
+    return [
+        entry["host"]
+        for entry in entries
+        if name in entry.get("installers", [])
+        or any(name in names for names in entry.get("packages", {}).values())
+    ]
+
+
+def changed_hosts(
+    old: dict[str, dict[str, Any]], new: Iterable[dict[str, Any]]
+) -> dict[str, list[str]]:
+    """Hosts added, removed or evaluating differently between two reports."""
+    new_by_host = {entry["host"]: entry for entry in new}
+    return {
+        "added": sorted(set(new_by_host) - set(old)),
+        "removed": sorted(set(old) - set(new_by_host)),
+        "changed": sorted(
+            host
+            for host, entry in new_by_host.items()
+            if host in old and old[host].get("digest") != entry.get("digest")
+        ),
+    }
@@ -0,0 +1,249 @@
+"""Incremental Ghostty builds from a source checkout.
+
+``cosmikase ghostty build`` pulls ``~/ghostty-source`` and rebuilds it only
+when the build inputs changed: the checked-out commit, local modifications,
+the zig version and the optimize mode are hashed, and the hash of the last
+successful build is kept in ``~/.local/state/cosmikase/ghostty-build.json``.
+Builds use zig's global cache directory explicitly (``~/.cache/zig``), so
+dependencies fetched and compiled for one build are reused by the next.
+
+After a build, the output tree (``zig-out``) is hashed too. The binary and
+share files are installed into ``~/.local`` only when that hash differs from
+what is installed, each file through a temporary file and an atomic rename,
+so a running Ghostty never sees a half-written binary.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from cosmikase.blobstore import file_digest
+from cosmikase.checks import search_path
+
+OPTIMIZE = "ReleaseFast"
+
+# Where older setups put zig when it isn't on PATH
+ZIG_FALLBACKS = (Path("/usr/local/bin/zig"), Path("/opt/zig-0.13.0/zig"))
+
+
+class GhosttyBuildError(Exception):
+    """A step of the Ghostty build failed."""
+
+
+def default_source_dir() -> Path:
+    return Path.home() / "ghostty-source"
+
+
+def default_state_path() -> Path:
+    base = os.environ.get("XDG_STATE_HOME") or str(Path.home() / ".local" / "state")
+    return Path(base) / "cosmikase" / "ghostty-build.json"
+
+
+def default_zig_cache() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "zig"
+
+
+def find_zig() -> Path | None:
+    found = shutil.which("zig", path=search_path())
+    if found:
+        return Path(found)
+    return next((path for path in ZIG_FALLBACKS if os.access(path, os.X_OK)), None)
+
+
+@dataclass
+class BuildResult:
+    decision: str  # up to date, unchanged, installed
+    commit: str
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        timings = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in self.timings.items())
+        return f"ghostty {self.commit[:12]}: {self.decision}" + (f" ({timings})" if timings else "")
+
+
+def _capture(argv: list[str], cwd: Path) -> str:
+    result = subprocess.run(argv, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise GhosttyBuildError(f"{' '.join(argv)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def _stream(argv: list[str], cwd: Path, output: Callable[[str], None]) -> None:
+    process = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors="replace",
+    )
+    assert process.stdout is not None
+    for line in process.stdout:
+        output(line.rstrip("\n"))
+    if process.wait() != 0:
+        raise GhosttyBuildError(f"{' '.join(argv)} exited with status {process.returncode}")
+
+
+def build_inputs(source: Path, zig: Path) -> dict[str, str]:
+    """What determines the build output: commit, local changes, zig and flags."""
+    diff = _capture(["git", "diff", "HEAD"], source)
+    untracked = _capture(["git", "ls-files", "--others", "--exclude-standard"], source)
+    changes = hashlib.sha256(diff.encode())
+    for name in sorted(untracked.splitlines()):
+        changes.update(name.encode())
+        changes.update(file_digest(source / name).encode())
+    return {
+        "commit": _capture(["git", "rev-parse", "HEAD"], source).strip(),
+        "changes": changes.hexdigest() if diff or untracked else "",
+        "zig": _capture([str(zig), "version"], source).strip(),
+        "optimize": OPTIMIZE,
+    }
+
+
+def json_digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def output_files(out_dir: Path) -> dict[str, str]:
+    """Digest of every installable file below ``out_dir``, by relative path."""
+    files = {}
+    for top in ("bin/ghostty", "share"):
+        path = out_dir / top
+        candidates = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+        for candidate in candidates:
+            files[candidate.relative_to(out_dir).as_posix()] = file_digest(candidate)
+    return files
+
+
+def _install_file(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(f".{dest.name}.cosmikase-tmp")
+    shutil.copy2(src, tmp_path)
+    tmp_path.replace(dest)
+
+
+def install_output(out_dir: Path, prefix: Path, files: dict[str, str]) -> int:
+    """Atomically replace the files under ``prefix`` that differ; returns the count."""
+    changed = 0
+    for relative, digest in files.items():
+        dest = prefix / relative
+        if dest.is_file() and file_digest(dest) == digest:
+            continue
+        _install_file(out_dir / relative, dest)
+        changed += 1
+    if changed and any(name.startswith("share/applications/") for name in files):
+        applications = prefix / "share" / "applications"
+        if shutil.which("update-desktop-database"):
+            subprocess.run(["update-desktop-database", str(applications)], capture_output=True)
+    return changed
+
+
+def _read_state(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(path: Path, state: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp_path.replace(path)
+
+
+def build_ghostty(
+    source: Path | None = None,
+    prefix: Path | None = None,
+    zig: Path | None = None,
+    state_path: Path | None = None,
+    zig_cache: Path | None = None,
+    pull: bool = True,
+    force: bool = False,
+    output: Callable[[str], None] = print,
+) -> BuildResult:
+    """Pull and rebuild Ghostty if its inputs changed, installing a changed output.
+
+    Args:
+        source: Ghostty checkout (default ``~/ghostty-source``).
+        prefix: Install prefix for ``bin/ghostty`` and ``share`` (default ``~/.local``).
+        zig: zig binary (default: found on PATH or in the usual install dirs).
+        state_path: Where the last build's hashes are recorded.
+        zig_cache: zig global cache directory (default ``~/.cache/zig``).
+        pull: Run ``git pull --ff-only`` first.
+        force: Build even if the inputs are unchanged.
+        output: Receives build output lines.
+
+    Raises:
+        GhosttyBuildError: If the checkout or zig is missing, or a step fails.
+    """
+    source = source or default_source_dir()
+    prefix = prefix or Path.home() / ".local"
+    state_path = state_path or default_state_path()
+    if not (source / ".git").exists():
+        raise GhosttyBuildError(f"No Ghostty checkout at {source}")
+    zig = zig or find_zig()
+    if zig is None:
+        raise GhosttyBuildError("zig not found")
+
+    timings: dict[str, float] = {}
+    start = time.monotonic()
+    if pull:
+        _stream(["git", "pull", "--ff-only"], source, output)
+        timings["pull"] = time.monotonic() - start
+
+    inputs = build_inputs(source, zig)
+    state = _read_state(state_path)
+    binary = prefix / "bin" / "ghostty"
+    installed = binary.is_file() and file_digest(binary) == state.get("files", {}).get(
+        "bin/ghostty"
+    )
+    if not force and installed and state.get("inputs") == json_digest(inputs):
+        return BuildResult("up to date", inputs["commit"], timings)
+
+    start = time.monotonic()
+    argv = [
+        str(zig),
+        "build",
+        f"-Doptimize={OPTIMIZE}",
+        "--global-cache-dir",
+        str(zig_cache or default_zig_cache()),
+    ]
+    _stream(argv, source, output)
+    timings["build"] = time.monotonic() - start
+
+    out_dir = source / "zig-out"
+    files = output_files(out_dir)
+    if "bin/ghostty" not in files:
+        raise GhosttyBuildError(f"Build produced no {out_dir / 'bin' / 'ghostty'}")
+    output_hash = json_digest(files)
+
+    decision = "unchanged"
+    if not installed or output_hash != state.get("output"):
+        start = time.monotonic()
+        install_output(out_dir, prefix, files)
+        timings["install"] = time.monotonic() - start
+        decision = "installed"
+
+    _write_state(
+        state_path,
+        {
+            "commit": inputs["commit"],
+            "inputs": json_digest(inputs),
+            "output": output_hash,
+            "files": files,
+            "built": time.time(),
+        },
+    )
+    return BuildResult(decision, inputs["commit"], timings)
@@ -0,0 +1,43 @@
+"""Image file helpers shared by the thumbnail, blob and render caches.
+
+Kept free of any UI or image library imports, so modules that only need to
+recognize or hash image files don't pull in the TUI thumbnail renderer.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+
+_HASH_CHUNK = 1024 * 1024
+# Digests remembered across calls; a theme collection has a few hundred images
+_MEMO_SIZE = 4096
+
+# (path, size, mtime_ns) -> sha256, so unchanged sources are hashed only once
+_digest_memo: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def source_digest(path: Path) -> str:
+    """SHA-256 of a file's contents, memoized by path, size and mtime."""
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _memo_lock:
+        digest = _digest_memo.get(key)
+        if digest is not None:
+            _digest_memo.move_to_end(key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(_HASH_CHUNK):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        with _memo_lock:
+            _digest_memo[key] = digest
+            while len(_digest_memo) > _MEMO_SIZE:
+                _digest_memo.popitem(last=False)
+    return digest
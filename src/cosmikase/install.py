@@ -0,0 +1,140 @@
+"""Install the config's apt and Flatpak packages in batched transactions.
+
+Every enabled apt package goes into a single ``apt-get install`` and every
+Flatpak app into a single ``flatpak install``, so the dpkg lock is taken and
+dependencies are resolved once instead of once per package. If a transaction
+fails, the batch is bisected: each half is retried on its own until the
+failing packages are isolated, and everything else still gets installed.
+
+Backends only turn a package list into a command and run it, so tests (and
+dry runs) can swap in fakes without root.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from cosmikase.plan import wanted_packages
+
+
+class PackageBackend(ABC):
+    """Installs a list of packages in one transaction."""
+
+    name = ""
+
+    @abstractmethod
+    def command(self, packages: list[str]) -> list[str]:
+        """The command installing ``packages``."""
+
+    def install(self, packages: list[str]) -> bool:
+        """Run one transaction; True if it succeeded."""
+        env = {**os.environ, "DEBIAN_FRONTEND": "noninteractive"}
+        return subprocess.run(self.command(packages), env=env, check=False).returncode == 0
+
+
+def _sudo() -> list[str]:
+    return [] if os.geteuid() == 0 else ["sudo"]
+
+
+class AptBackend(PackageBackend):
+    name = "apt"
+
+    def command(self, packages: list[str]) -> list[str]:
+        return [*_sudo(), "apt-get", "install", "-y", "-q", *packages]
+
+
+class FlatpakBackend(PackageBackend):
+    name = "flatpak"
+
+    def __init__(self, remote: str = "flathub") -> None:
+        self.remote = remote
+
+    def command(self, packages: list[str]) -> list[str]:
+        return ["flatpak", "install", "-y", "--noninteractive", self.remote, *packages]
+
+
+class DryRunBackend(PackageBackend):
+    """Records the commands another backend would run, and reports success."""
+
+    def __init__(self, backend: PackageBackend) -> None:
+        self.backend = backend
+        self.name = backend.name
+        self.commands: list[list[str]] = []
+
+    def command(self, packages: list[str]) -> list[str]:
+        return self.backend.command(packages)
+
+    def install(self, packages: list[str]) -> bool:
+        self.commands.append(self.command(packages))
+        return True
+
+
+BACKENDS: dict[str, Callable[[], PackageBackend]] = {
+    "apt": AptBackend,
+    "flatpak": FlatpakBackend,
+}
+
+
+@dataclass
+class BatchResult:
+    backend: str
+    installed: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    transactions: list[list[str]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def install_batch(backend: PackageBackend, packages: list[str]) -> BatchResult:
+    """Install ``packages`` in one transaction, bisecting to isolate failures."""
+    result = BatchResult(backend.name)
+
+    def attempt(batch: list[str]) -> None:
+        result.transactions.append(batch)
+        if backend.install(batch):
+            result.installed.extend(batch)
+        elif len(batch) == 1:
+            result.failed.extend(batch)
+        else:
+            middle = len(batch) // 2
+            attempt(batch[:middle])
+            attempt(batch[middle:])
+
+    if packages:
+        attempt(list(packages))
+    return result
+
+
+def install_packages(
+    config: dict[str, Any],
+    backends: dict[str, PackageBackend] | None = None,
+    only: dict[str, list[str]] | None = None,
+) -> list[BatchResult]:
+    """Install the enabled apt and Flatpak packages of ``config``.
+
+    The package selection matches ``plan``: apt items built from source are
+    left out, and the yubikey group needs ``defaults.yubikey_setup``.
+
+    Args:
+        config: Parsed cosmikase configuration.
+        backends: Backend per section (default: apt-get and flatpak).
+        only: Install just these packages per section (e.g. a plan's output);
+            sections not in ``only`` are installed in full.
+    """
+    if backends is None:
+        backends = {name: factory() for name, factory in BACKENDS.items()}
+    wanted = wanted_packages(config)
+    results = []
+    for name, backend in backends.items():
+        packages = list(wanted.get(name, {}).values())
+        if only is not None and name in only:
+            packages = [package for package in packages if package in only[name]]
+        results.append(install_batch(backend, packages))
+    return results
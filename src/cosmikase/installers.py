@@ -0,0 +1,428 @@
+"""Run the config's ``installers`` section as a dependency graph.
+
+Each enabled installer (``installers.runtimes``, ``ai_tools``, ``security``)
+becomes a node. npm and bun items depend on the nvm and bun runtimes when
+those are being installed too, and everything that goes through dpkg (deb
+items and the apt-repository based custom installers) holds the ``dpkg``
+lock, so those run one at a time. All other nodes run concurrently, up to a
+worker limit.
+
+Every node's output is streamed as structured events (start, output lines,
+finish) and the run ends with a timing waterfall that marks the critical
+path: the chain of dependencies and lock waits that determined the total
+time.
+
+Commands for each ``method`` come from the ``METHODS`` table;
+``register_method`` adds or overrides one. deb and tarball artifacts are
+fetched through the shared download cache (``cosmikase.downloads``).
+"""
+
+from __future__ import annotations
+
+import os
+import shlex
+import subprocess
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from cosmikase.checks import CheckCache, evaluate_checks, search_path
+from cosmikase.config import enabled_items
+from cosmikase.downloads import DownloadCache, DownloadError
+
+GROUPS = ("runtimes", "ai_tools", "security")
+DPKG_LOCK = "dpkg"
+
+# Runtime nodes that package-manager methods depend on
+RUNTIME_FOR_METHOD = {"npm": "nvm", "bun": "bun"}
+
+# Methods whose command installs a downloaded file ($COSMIKASE_ARTIFACT), and
+# the item key holding its URL; the file comes from the download cache
+ARTIFACT_KEYS = {"deb": "deb_url", "tarball": "url"}
+
+# Methods that install through dpkg and must not run concurrently
+DPKG_METHODS = {"deb", "custom_brave", "custom_dangerzone", "custom_antigravity"}
+
+_NVM = 'export NVM_DIR="$HOME/.nvm"; [ -s "$NVM_DIR/nvm.sh" ] && . "$NVM_DIR/nvm.sh"'
+_BUN = 'export BUN_INSTALL="$HOME/.bun"; export PATH="$BUN_INSTALL/bin:$PATH"'
+_SUDO = "$([ $(id -u) -eq 0 ] || echo sudo)"
+
+
+def _script(item: dict[str, Any]) -> str:
+    # Some installers (bun) are bash scripts, and sh is dash on Ubuntu
+    args = f" -s -- {item['args']}" if item.get("args") else ""
+    return f"curl -fsSL {shlex.quote(item['url'])} | bash{args}"
+
+
+def _deb(item: dict[str, Any]) -> str:
+    # apt only treats paths ending in .deb as package files
+    deb = f"$tmp/{item['name']}.deb"
+    return (
+        f'tmp=$(mktemp -d) && ln -s "$COSMIKASE_ARTIFACT" {deb}'
+        f" && {_SUDO} apt-get install -y -q {deb}; status=$?; rm -rf $tmp; exit $status"
+    )
+
+
+# Installer names whose npm package isn't given by ``npm_package``
+NPM_PACKAGES = {"claude-code": "@anthropic-ai/claude-code"}
+
+
+def _npm(item: dict[str, Any]) -> str:
+    package = item.get("npm_package") or NPM_PACKAGES.get(item["name"], item["name"])
+    return f"{_NVM}; npm install -g {shlex.quote(package)}"
+
+
+def _bun(item: dict[str, Any]) -> str:
+    package = item.get("bun_package") or item["name"]
+    return f"{_BUN}; bun add -g {shlex.quote(package)}"
+
+
+def _tarball(item: dict[str, Any]) -> str:
+    # go1.x.tar.gz unpacks to go/, zig to zig-<arch>-<version>/: strip the top level
+    # (Go ends up in /usr/local/go, as with the runtimes role)
+    dest = f"/usr/local/{item['name']}"
+    binary = item.get("check") or item["name"]
+    return (
+        f"{_SUDO} rm -rf {dest} && {_SUDO} mkdir -p {dest}"
+        f' && {_SUDO} tar -C {dest} --strip-components=1 -xf "$COSMIKASE_ARTIFACT"'
+        f" && for bin in {dest}/bin/{binary} {dest}/{binary}; do"
+        f" [ -x $bin ] && {_SUDO} ln -sf $bin /usr/local/bin/{binary} && break; done"
+    )
+
+
+def _nvm(item: dict[str, Any]) -> str:
+    url = "https://raw.githubusercontent.com/nvm-sh/nvm/v0.40.3/install.sh"
+    return f"curl -fsSL {url} | bash && {_NVM} && nvm install --lts"
+
+
+def _apt_repo(package: str, *setup: str) -> str:
+    # Same steps as the tools Ansible role: keyring and source list, then install
+    steps = [f"{_SUDO} mkdir -p /etc/apt/keyrings", *setup]
+    steps += [f"{_SUDO} apt-get update -q", f"{_SUDO} apt-get install -y -q {package}"]
+    return " && ".join(steps)
+
+
+def _brave(item: dict[str, Any]) -> str:
+    base = "https://brave-browser-apt-release.s3.brave.com"
+    return _apt_repo(
+        "brave-browser",
+        f"{_SUDO} curl -fsSL -o /usr/share/keyrings/brave-browser-archive-keyring.gpg"
+        f" {base}/brave-browser-archive-keyring.gpg",
+        f"{_SUDO} curl -fsSL -o /etc/apt/sources.list.d/brave-browser-release.sources"
+        f" {base}/brave-browser.sources",
+    )
+
+
+def _antigravity(item: dict[str, Any]) -> str:
+    keyring = "/etc/apt/keyrings/antigravity-repo-key.gpg"
+    repo = (
+        f"deb [signed-by={keyring}] "
+        "https://us-central1-apt.pkg.dev/projects/antigravity-auto-updater-dev/ "
+        "antigravity-debian main"
+    )
+    return _apt_repo(
+        "antigravity",
+        "curl -fsSL https://us-central1-apt.pkg.dev/doc/repo-signing-key.gpg"
+        f" | {_SUDO} gpg --dearmor --yes -o {keyring}",
+        f"echo {shlex.quote(repo)} | {_SUDO} tee /etc/apt/sources.list.d/antigravity.list",
+    )
+
+
+def _dangerzone(item: dict[str, Any]) -> str:
+    keyring = "/etc/apt/keyrings/fpf-apt-tools-archive-keyring.gpg"
+    repo = f"deb [signed-by={keyring}] https://packages.freedom.press/apt-tools-prod"
+    return _apt_repo(
+        "dangerzone",
+        f"{_SUDO} gpg --keyserver hkps://keys.openpgp.org --no-default-keyring"
+        f" --keyring gnupg-ring:{keyring} --recv-keys DE28AB241FA48260FAC9B8BAA7C9B38522604281",
+        f"{_SUDO} chmod +r {keyring}",
+        f'echo "{repo} $(lsb_release -cs) main"'
+        f" | {_SUDO} tee /etc/apt/sources.list.d/fpf-apt-tools.list",
+    )
+
+
+METHODS: dict[str, Callable[[dict[str, Any]], str]] = {}
+
+
+def register_method(method: str, command: Callable[[dict[str, Any]], str]) -> None:
+    """Add (or replace) the shell command builder for an installer ``method``."""
+    METHODS[method] = command
+
+
+for _method, _command in (
+    ("script", _script),
+    ("deb", _deb),
+    ("npm", _npm),
+    ("bun", _bun),
+    ("tarball", _tarball),
+    ("custom_nvm", _nvm),
+    ("custom_brave", _brave),
+    ("custom_antigravity", _antigravity),
+    ("custom_dangerzone", _dangerzone),
+):
+    register_method(_method, _command)
+
+
+@dataclass(frozen=True)
+class Installer:
+    name: str
+    method: str
+    command: str
+    deps: tuple[str, ...] = ()
+    locks: tuple[str, ...] = ()
+    installed: bool = False
+    artifact: str | None = None  # URL to download before running the command
+
+
+def installer_items(config: dict[str, Any]) -> list[dict[str, Any]]:
+    """Enabled items of every installers group, in config order."""
+    return [item for group in GROUPS for item in enabled_items(config, "installers", group)]
+
+
+def build_graph(
+    config: dict[str, Any],
+    home: Path | None = None,
+    check: bool = True,
+    check_cache: CheckCache | None = None,
+) -> dict[str, Installer]:
+    """Nodes for every enabled installer, keyed by name.
+
+    ``manual`` items and methods without a registered command are left out.
+    With ``check``, the items' checks are evaluated (concurrently, see
+    ``evaluate_checks``) and passing items are marked installed.
+    """
+    items = [item for item in installer_items(config) if item.get("method") in METHODS]
+    installed = set()
+    if check:
+        results = evaluate_checks(items, cache=check_cache, home=home)
+        installed = {result.name for result in results if result.installed}
+    names = {item["name"] for item in items}
+    nodes: dict[str, Installer] = {}
+    for item in items:
+        method = item["method"]
+        runtime = RUNTIME_FOR_METHOD.get(method)
+        nodes[item["name"]] = Installer(
+            name=item["name"],
+            method=method,
+            command=METHODS[method](item),
+            deps=(runtime,) if runtime in names and runtime != item["name"] else (),
+            locks=(DPKG_LOCK,) if method in DPKG_METHODS else (),
+            artifact=item.get(ARTIFACT_KEYS.get(method, "")),
+            installed=item["name"] in installed,
+        )
+    return nodes
+
+
+@dataclass
+class NodeResult:
+    name: str
+    status: str = "pending"  # ok, failed, installed, blocked
+    start: float = 0.0  # Seconds since the run started
+    end: float = 0.0
+    message: str = ""
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+Event = dict[str, Any]
+Runner = Callable[[Installer, Callable[[str], None]], bool]
+
+
+def run_command(node: Installer, output: Callable[[str], None]) -> bool:
+    """Run ``node.command`` with bash, passing each output line to ``output``.
+
+    A node's artifact is fetched through the download cache first and passed
+    to the command as ``$COSMIKASE_ARTIFACT``.
+    """
+    env = {**os.environ, "PATH": search_path(), "DEBIAN_FRONTEND": "noninteractive"}
+    if node.artifact:
+        try:
+            download = DownloadCache().fetch(node.artifact)
+        except DownloadError as e:
+            output(str(e))
+            return False
+        output(f"{node.artifact}: {download.status} ({download.path})")
+        env["COSMIKASE_ARTIFACT"] = str(download.path)
+    process = subprocess.Popen(
+        ["bash", "-c", node.command],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors="replace",
+        env=env,
+    )
+    assert process.stdout is not None
+    for line in process.stdout:
+        output(line.rstrip("\n"))
+    return process.wait() == 0
+
+
+def run_graph(
+    nodes: dict[str, Installer],
+    jobs: int = 4,
+    runner: Runner = run_command,
+    on_event: Callable[[Event], None] | None = None,
+    capacity: dict[str, int] | None = None,
+) -> dict[str, NodeResult]:
+    """Run every node once its dependencies succeeded and its locks are free.
+
+    A lock is held by one node at a time unless ``capacity`` allows more.
+    Nodes whose dependency failed are ``blocked`` and not run. Events are
+    dicts with ``time``, ``item`` and ``event`` (start, output, ok, failed,
+    installed, blocked), plus ``line`` for output.
+    """
+    for node in nodes.values():
+        missing = [dep for dep in node.deps if dep not in nodes]
+        if missing:
+            raise ValueError(f"{node.name} depends on unknown installer(s): {', '.join(missing)}")
+
+    started = time.monotonic()
+    emit_lock = threading.Lock()
+    results = {name: NodeResult(name) for name in nodes}
+    capacity = capacity or {}
+    held: Counter[str] = Counter()
+    running: dict[Future[bool], str] = {}
+
+    def now() -> float:
+        return time.monotonic() - started
+
+    def emit(name: str, event: str, **extra: Any) -> None:
+        if on_event is not None:
+            with emit_lock:
+                on_event({"time": round(now(), 3), "item": name, "event": event, **extra})
+
+    def finish(name: str, status: str, message: str = "") -> None:
+        result = results[name]
+        result.end = now()
+        if result.status != "running":
+            result.start = result.end
+        result.status = status
+        result.message = message
+        emit(name, status, **({"message": message} if message else {}))
+
+    def execute(node: Installer) -> bool:
+        try:
+            return runner(node, lambda line: emit(node.name, "output", line=line))
+        except OSError as e:
+            emit(node.name, "output", line=str(e))
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while True:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, node in nodes.items():
+                    if results[name].status != "pending":
+                        continue
+                    dep_status = [results[dep].status for dep in node.deps]
+                    if any(status in ("failed", "blocked") for status in dep_status):
+                        failed = [dep for dep in node.deps if results[dep].status != "ok"]
+                        finish(name, "blocked", f"{', '.join(failed)} failed")
+                        progressed = True
+                    elif all(status in ("ok", "installed") for status in dep_status):
+                        if node.installed:
+                            finish(name, "installed")
+                            progressed = True
+                        elif len(running) < max(1, jobs) and all(
+                            held[lock] < capacity.get(lock, 1) for lock in node.locks
+                        ):
+                            held.update(node.locks)
+                            results[name].status = "running"
+                            results[name].start = now()
+                            emit(name, "start", command=node.command)
+                            running[pool.submit(execute, node)] = name
+                            progressed = True
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                held.subtract(nodes[name].locks)
+                finish(name, "ok" if future.result() else "failed")
+
+    pending = {name for name, result in results.items() if result.status == "pending"}
+    for name in pending:
+        results[name].status = "blocked"
+        results[name].message = _stuck_reason(nodes, pending, name, capacity)
+    return results
+
+
+def _stuck_reason(
+    nodes: dict[str, Installer], pending: set[str], name: str, capacity: dict[str, int]
+) -> str:
+    """Why a node never ran: a lock without capacity, a cycle, or a stuck dependency."""
+    closed = [lock for lock in nodes[name].locks if capacity.get(lock, 1) < 1]
+    if closed:
+        return f"no capacity for lock {', '.join(closed)}"
+    # On a cycle if the node can reach itself through pending dependencies
+    seen: set[str] = set()
+    stack = [dep for dep in nodes[name].deps if dep in pending]
+    while stack:
+        dep = stack.pop()
+        if dep == name:
+            return "dependency cycle"
+        if dep not in seen:
+            seen.add(dep)
+            stack.extend(d for d in nodes[dep].deps if d in pending)
+    waiting = [dep for dep in nodes[name].deps if dep in pending]
+    return f"{', '.join(waiting)} never ran"
+
+
+def critical_path(nodes: dict[str, Installer], results: dict[str, NodeResult]) -> list[str]:
+    """The chain of nodes that determined the run's total time, first to last.
+
+    Starting from the node that finished last, each step goes back to the
+    dependency or lock holder that finished last before the node started.
+    """
+    ran = [r for r in results.values() if r.status in ("ok", "failed")]
+    if not ran:
+        return []
+    current = max(ran, key=lambda r: r.end)
+    path = [current.name]
+    while True:
+        node = nodes[current.name]
+        gates = [
+            results[other]
+            for other, other_node in nodes.items()
+            if other != current.name
+            and (other in node.deps or set(node.locks) & set(other_node.locks))
+            and results[other].status in ("ok", "failed")
+            and results[other].end <= current.start + 0.05
+        ]
+        if not gates:
+            break
+        current = max(gates, key=lambda r: r.end)
+        path.append(current.name)
+    return path[::-1]
+
+
+def waterfall(
+    nodes: dict[str, Installer], results: dict[str, NodeResult], width: int = 40
+) -> list[str]:
+    """Text timing chart: one bar per installer, critical path marked with ``*``."""
+    ran = sorted(
+        (r for r in results.values() if r.status in ("ok", "failed")), key=lambda r: r.start
+    )
+    if not ran:
+        return []
+    total = max(r.end for r in ran) or 1e-9
+    critical = set(critical_path(nodes, results))
+    label = max(len(r.name) for r in ran)
+    lines = []
+    for r in ran:
+        offset = min(width - 1, int(r.start / total * width))
+        length = max(1, round(r.seconds / total * width))
+        bar = " " * offset + ("#" if r.status == "ok" else "x") * min(length, width - offset)
+        mark = "*" if r.name in critical else " "
+        lines.append(f"{mark} {r.name:<{label}} |{bar:<{width}}| {r.seconds:6.1f}s")
+    lines.append(f"  {'total':<{label}}  {'':<{width}}  {total:6.1f}s")
+    return lines
@@ -0,0 +1,266 @@
+"""Diff cosmikase.yaml packages against what is already installed.
+
+Each package backend answers "what is installed?" with one bulk query (the
+dpkg status file, ``flatpak list``, ``npm ls -g``, ``uv tool list``), and the
+backends are queried in parallel. Answers are cached keyed by the mtimes of
+the backend's package database, so an unchanged machine doesn't even run the
+queries. The result is the minimal set of installs, as JSON for Ansible.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from cosmikase.config import enabled_items, enabled_top_level, get_value
+
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+
+
+class BackendUnavailable(Exception):
+    """A backend's tool is missing or its query failed."""
+
+
+@dataclass(frozen=True)
+class Backend:
+    name: str
+    query: Callable[[], set[str]]
+    databases: Callable[[], list[Path]]  # Paths whose mtimes key the cache
+
+
+def parse_dpkg_status(text: str) -> set[str]:
+    """Names of packages in state "install ok installed" in a dpkg status file."""
+    installed = set()
+    for stanza in text.split("\n\n"):
+        package = status = None
+        for line in stanza.splitlines():
+            if line.startswith("Package:"):
+                package = line.split(":", 1)[1].strip()
+            elif line.startswith("Status:"):
+                status = line.split(":", 1)[1].split()
+        if package and status and status[-1] == "installed":
+            installed.add(package)
+    return installed
+
+
+def _run(cmd: list[str]) -> str:
+    if not shutil.which(cmd[0]):
+        raise BackendUnavailable(f"{cmd[0]} not found")
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise BackendUnavailable(f"{' '.join(cmd)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def _query_apt() -> set[str]:
+    try:
+        return parse_dpkg_status(DPKG_STATUS.read_text(errors="replace"))
+    except OSError as e:
+        raise BackendUnavailable(f"Cannot read {DPKG_STATUS}: {e}") from None
+
+
+def _query_flatpak() -> set[str]:
+    output = _run(["flatpak", "list", "--app", "--columns=application"])
+    return {line.strip() for line in output.splitlines() if line.strip()}
+
+
+def _query_npm() -> set[str]:
+    # npm ls exits 1 for problems like extraneous packages, but still prints the tree
+    if not shutil.which("npm"):
+        raise BackendUnavailable("npm not found")
+    result = subprocess.run(
+        ["npm", "ls", "-g", "--json", "--depth=0"], capture_output=True, text=True, check=False
+    )
+    try:
+        return set(json.loads(result.stdout or "{}").get("dependencies", {}))
+    except (ValueError, AttributeError):
+        raise BackendUnavailable(f"npm ls failed: {result.stderr.strip()}") from None
+
+
+def parse_uv_tool_list(output: str) -> set[str]:
+    # "ruff v0.4.1" lines, each followed by "- ruff" lines for its executables
+    return {line.split()[0] for line in output.splitlines() if line.strip() and line[0] not in " -"}
+
+
+def _query_uv() -> set[str]:
+    return parse_uv_tool_list(_run(["uv", "tool", "list"]))
+
+
+def _flatpak_databases() -> list[Path]:
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return [Path("/var/lib/flatpak/app"), Path(base) / "flatpak" / "app"]
+
+
+def _npm_databases() -> list[Path]:
+    npm = shutil.which("npm")
+    if not npm:
+        return []
+    # <prefix>/bin/npm links to <prefix>/lib/node_modules/npm/bin/npm-cli.js
+    resolved = Path(npm).resolve()
+    root = next(
+        (parent for parent in resolved.parents if parent.name == "node_modules"),
+        Path(npm).parent.parent / "lib" / "node_modules",
+    )
+    # Installing into an existing scope (@openai/...) only changes the scope's mtime
+    try:
+        scopes = sorted(path for path in root.iterdir() if path.name.startswith("@"))
+    except OSError:
+        scopes = []
+    return [root, *scopes]
+
+
+def _uv_databases() -> list[Path]:
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return [Path(os.environ.get("UV_TOOL_DIR") or Path(base) / "uv" / "tools")]
+
+
+BACKENDS: dict[str, Backend] = {
+    "apt": Backend("apt", _query_apt, lambda: [DPKG_STATUS]),
+    "flatpak": Backend("flatpak", _query_flatpak, _flatpak_databases),
+    "npm": Backend("npm", _query_npm, _npm_databases),
+    "uv_tools": Backend("uv_tools", _query_uv, _uv_databases),
+}
+
+
+def wanted_packages(config: dict[str, Any]) -> dict[str, dict[str, str]]:
+    """Enabled packages per backend, as {name: install spec}.
+
+    Mirrors the packages role: apt items built from source (ghostty) are left
+    out, and the yubikey group only counts when ``defaults.yubikey_setup``.
+    """
+    apt: dict[str, str] = {}
+    for group in config.get("apt") or {}:
+        if group == "yubikey" and not get_value(config, "defaults.yubikey_setup", False):
+            continue
+        for item in enabled_items(config, "apt", group):
+            if item.get("name") and not item.get("source"):
+                apt[item["name"]] = item["name"]
+
+    flatpak: dict[str, str] = {}
+    for group in config.get("flatpak") or {}:
+        for item in enabled_items(config, "flatpak", group):
+            if item.get("id"):
+                flatpak[item["id"]] = item["id"]
+
+    npm = {
+        item["name"]: f"{item['name']}@{item.get('version', 'latest')}"
+        for item in enabled_top_level(config, "npm")
+        if item.get("name")
+    }
+    uv_tools = {
+        item["name"]: item["name"]
+        for item in enabled_top_level(config, "uv_tools")
+        if item.get("name")
+    }
+    return {"apt": apt, "flatpak": flatpak, "npm": npm, "uv_tools": uv_tools}
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "cosmikase" / "installed-state.json"
+
+
+def _signature(paths: list[Path]) -> list[int | None] | None:
+    mtimes: list[int | None] = []
+    for path in paths:
+        try:
+            mtimes.append(path.stat().st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    # Nothing to key on: always query
+    return mtimes if any(m is not None for m in mtimes) else None
+
+
+@dataclass
+class InstalledState:
+    installed: dict[str, set[str]] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    cached: list[str] = field(default_factory=list)
+
+
+def collect_installed(
+    backends: list[Backend],
+    cache_path: Path | None = None,
+    refresh: bool = False,
+) -> InstalledState:
+    """Query every backend's installed set in parallel, reusing cached answers."""
+    cache_path = cache_path or default_cache_path()
+    try:
+        cache = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cache = {}
+
+    state = InstalledState()
+    pending: list[tuple[Backend, list[int | None] | None]] = []
+    for backend in backends:
+        signature = _signature(backend.databases())
+        entry = cache.get(backend.name)
+        if not refresh and signature is not None and entry and entry.get("key") == signature:
+            state.installed[backend.name] = set(entry["installed"])
+            state.cached.append(backend.name)
+        else:
+            pending.append((backend, signature))
+
+    def query(item: tuple[Backend, Any]) -> set[str] | str:
+        try:
+            return item[0].query()
+        except BackendUnavailable as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        for (backend, signature), result in zip(pending, pool.map(query, pending), strict=True):
+            if isinstance(result, str):
+                state.errors[backend.name] = result
+                cache.pop(backend.name, None)
+                continue
+            state.installed[backend.name] = result
+            if signature is not None:
+                cache[backend.name] = {"key": signature, "installed": sorted(result)}
+
+    if pending:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(f".{cache_path.name}.tmp")
+            tmp_path.write_text(json.dumps(cache))
+            tmp_path.replace(cache_path)
+        except OSError:
+            pass  # Only a cache
+    return state
+
+
+def plan(
+    config: dict[str, Any],
+    backends: dict[str, Backend] | None = None,
+    cache_path: Path | None = None,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """Return the installs needed to satisfy ``config``.
+
+    The result maps each backend to the install specs it is missing, plus
+    ``changed`` (anything to do) and ``unavailable`` (backends that couldn't be
+    queried, with the reason; callers should fall back to installing those
+    sections in full).
+    """
+    backends = backends or BACKENDS
+    wanted = wanted_packages(config)
+    active = [backends[name] for name, packages in wanted.items() if packages and name in backends]
+    state = collect_installed(active, cache_path, refresh)
+
+    result: dict[str, Any] = {}
+    for name, packages in wanted.items():
+        installed = state.installed.get(name)
+        if installed is None and packages:
+            result[name] = list(packages.values())
+        else:
+            result[name] = [spec for pkg, spec in packages.items() if pkg not in (installed or ())]
+    result["changed"] = any(result[name] for name in wanted)
+    result["unavailable"] = state.errors
+    result["cached"] = state.cached
+    return result
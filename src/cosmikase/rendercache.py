@@ -0,0 +1,328 @@
+"""Render cache for theme-dependent chezmoi templates.
+
+Switching themes re-renders the same handful of templates (terminal configs,
+btop, zellij, ...) for a small set of inputs. Rendered outputs are cached under
+``~/.cache/cosmikase/render`` keyed by the template content, the ``[data]``
+values the template references, and the contents of the theme's files (for
+templates that ``include`` them). Theme-dependent templates are found by
+scanning the source directory for templates referencing ``.theme`` or
+``.themes_dir``. On a theme switch, cached outputs are written straight to
+their targets and ``chezmoi apply`` ignores those targets (through
+``.chezmoiignore``), so it only renders cache misses and applies everything else.
+Cached outputs get the mode chezmoi would give them from the source attributes
+(``private_``, ``readonly_``, ``executable_``), and only targets chezmoi
+manages as files are cached after an apply.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from cosmikase.chezmoi import read_config
+from cosmikase.images import IMAGE_SUFFIXES, source_digest
+from cosmikase.themes import _find_repo_root
+
+# Data keys that make a template theme-dependent
+THEME_KEYS = frozenset({"theme", "themes_dir"})
+# Data key .chezmoiignore reads the targets already written from the cache from
+IGNORE_KEY = "cosmikase_cached"
+
+# chezmoi source-state attribute prefixes that don't appear in target names
+_ATTRIBUTE_PREFIXES = ("private_", "readonly_", "empty_", "executable_", "exact_")
+# Source names whose output isn't a plain file's content
+_NOT_FILES = ("run_", "modify_", "create_", "remove_", "symlink_", "encrypted_")
+_DATA_REF_RE = re.compile(r"\.([A-Za-z_]\w*)")
+_TEMPLATE_RE = re.compile(r'template\s+"([^"]+)"')
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "cosmikase" / "render"
+
+
+def default_source_dir() -> Path:
+    """chezmoi's source directory: ``sourceDir`` from chezmoi.toml, else chezmoi's default."""
+    configured = read_config().get("sourceDir")
+    if configured:
+        return Path(configured).expanduser()
+    default = Path.home() / ".local" / "share" / "chezmoi"
+    if default.is_dir():
+        return default
+    repo_root = _find_repo_root()
+    return repo_root / "chezmoi" if repo_root else default
+
+
+def target_path(template: str) -> Path:
+    """Target path (relative to $HOME) of a chezmoi source path."""
+    parts = []
+    for part in Path(template).parts:
+        while part.startswith(_ATTRIBUTE_PREFIXES):
+            part = part.split("_", 1)[1]
+        if part.startswith("dot_"):
+            part = "." + part.removeprefix("dot_")
+        parts.append(part)
+    parts[-1] = parts[-1].removesuffix(".tmpl")
+    return Path(*parts)
+
+
+def target_mode(template: str, umask: int) -> int:
+    """Mode chezmoi gives the target of a source file, from its attribute prefixes."""
+    name = Path(template).name
+    attributes = set()
+    while name.startswith(_ATTRIBUTE_PREFIXES):
+        attribute, name = name.split("_", 1)
+        attributes.add(attribute)
+    mode = 0o777 if "executable" in attributes else 0o666
+    if "private" in attributes:
+        mode &= 0o700
+    if "readonly" in attributes:
+        mode &= ~0o222
+    return mode & ~umask
+
+
+def _umask() -> int:
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def data_refs(source_dir: Path, template: str) -> set[str]:
+    """Data keys a template references, including in the templates it includes."""
+    refs: set[str] = set()
+    pending, seen = [source_dir / template], set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        try:
+            text = path.read_text(errors="replace")
+        except OSError:
+            continue
+        refs.update(_DATA_REF_RE.findall(text))
+        pending.extend(
+            source_dir / ".chezmoitemplates" / name for name in _TEMPLATE_RE.findall(text)
+        )
+    return refs
+
+
+def themed_templates(source_dir: Path) -> list[str]:
+    """Source paths of the file templates whose output depends on the theme."""
+    found = []
+    for path in sorted(source_dir.rglob("*.tmpl")):
+        template = path.relative_to(source_dir).as_posix()
+        if any(part.startswith(".") for part in path.relative_to(source_dir).parts):
+            continue  # chezmoi's own files (.chezmoi.toml.tmpl, .chezmoitemplates)
+        if path.name.startswith(_NOT_FILES):
+            continue
+        if data_refs(source_dir, template) & THEME_KEYS:
+            found.append(template)
+    return found
+
+
+def theme_signature(theme_path: Path) -> str:
+    """Hash of a theme's top-level files (images excluded) that templates may include."""
+    hasher = hashlib.sha256()
+    if theme_path.is_dir():
+        for path in sorted(theme_path.iterdir()):
+            if path.is_file() and not path.name.lower().endswith(IMAGE_SUFFIXES):
+                hasher.update(f"{path.name}\0{source_digest(path)}\n".encode())
+    return hasher.hexdigest()
+
+
+@dataclass
+class RenderStats:
+    hits: int = 0
+    misses: int = 0
+    written: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+class RenderCache:
+    """Rendered template outputs, stored as ``<root>/<xx>/<sha256>``."""
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        source_dir: Path | None = None,
+        home: Path | None = None,
+        templates: Iterable[str] | None = None,
+    ) -> None:
+        self.root = root or default_cache_dir()
+        self.source_dir = source_dir or default_source_dir()
+        self.home = home or Path.home()
+        if templates is None:
+            self.templates = themed_templates(self.source_dir)
+        else:
+            self.templates = [t for t in templates if (self.source_dir / t).is_file()]
+
+    def key(self, template: str, data: Mapping[str, Any]) -> str:
+        source = (self.source_dir / template).read_bytes()
+        referenced = data_refs(self.source_dir, template)
+        values = {name: data[name] for name in sorted(referenced & data.keys())}
+        theme_path = Path(str(data.get("themes_dir", ""))).expanduser() / str(data.get("theme", ""))
+
+        hasher = hashlib.sha256()
+        hasher.update(f"{template}\0{self.home}\0{self.source_dir}\0".encode())
+        hasher.update(hashlib.sha256(source).digest())
+        hasher.update(json.dumps(values, sort_keys=True, default=str).encode())
+        hasher.update(theme_signature(theme_path).encode())
+        return hasher.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def lookup(self, template: str, data: Mapping[str, Any]) -> bytes | None:
+        try:
+            return self._path(self.key(template, data)).read_bytes()
+        except OSError:
+            return None
+
+    def store(self, template: str, data: Mapping[str, Any], content: bytes) -> None:
+        path = self._path(self.key(template, data))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(content)
+        tmp_path.replace(path)
+
+    def write_hits(self, data: Mapping[str, Any]) -> tuple[RenderStats, list[str]]:
+        """Write every cached output to its target.
+
+        Returns:
+            Stats and the templates that missed the cache.
+        """
+        stats = RenderStats()
+        misses = []
+        umask = _umask()
+        for template in self.templates:
+            content = self.lookup(template, data)
+            if content is None:
+                stats.misses += 1
+                misses.append(template)
+                continue
+            stats.hits += 1
+            target = self.home / target_path(template)
+            mode = target_mode(template, umask)
+            try:
+                if target.read_bytes() == content and target.stat().st_mode & 0o777 == mode:
+                    continue
+            except OSError:
+                pass
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f".{target.name}.cosmikase-tmp")
+            tmp_path.write_bytes(content)
+            tmp_path.chmod(mode)
+            tmp_path.replace(target)
+            stats.written += 1
+        return stats, misses
+
+    def ignore_args(self, templates: Iterable[str]) -> list[str]:
+        """``chezmoi apply`` arguments that leave the targets of ``templates`` alone.
+
+        The source directory's ``.chezmoiignore`` ignores the targets listed
+        under ``IGNORE_KEY``; without that stanza chezmoi just renders them again.
+        """
+        targets = [target_path(template).as_posix() for template in templates]
+        return ["--override-data", json.dumps({IGNORE_KEY: targets})]
+
+    def managed_files(self) -> set[str] | None:
+        """Targets of the files chezmoi manages, or None if chezmoi failed.
+
+        Targets chezmoi ignores (``.chezmoiignore``) are not managed.
+        """
+        try:
+            result = subprocess.run(
+                [
+                    "chezmoi",
+                    "--source",
+                    str(self.source_dir),
+                    "--destination",
+                    str(self.home),
+                    "managed",
+                    "--include",
+                    "files",
+                    "--path-style",
+                    "relative",
+                ],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+            )
+        except OSError:
+            return None
+        if result.returncode != 0:
+            return None
+        return set(result.stdout.splitlines())
+
+    def store_targets(self, data: Mapping[str, Any], templates: Iterable[str]) -> None:
+        """Cache the current target contents (after ``chezmoi apply`` rendered them).
+
+        Only targets chezmoi manages are cached: an ignored target wasn't
+        rendered, and its contents are whatever an older apply left there.
+        """
+        managed = self.managed_files()
+        if managed is None:
+            return
+        for template in templates:
+            if target_path(template).as_posix() not in managed:
+                continue
+            try:
+                content = (self.home / target_path(template)).read_bytes()
+            except OSError:
+                continue
+            self.store(template, data, content)
+
+    def render(self, template: str, data: Mapping[str, Any]) -> bytes:
+        """Render ``template`` with ``data`` through ``chezmoi execute-template``."""
+        result = subprocess.run(
+            [
+                "chezmoi",
+                "--source",
+                str(self.source_dir),
+                "--override-data",
+                json.dumps(dict(data), default=str),
+                "execute-template",
+            ],
+            input=(self.source_dir / template).read_bytes(),
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode(errors="replace").strip())
+        return result.stdout
+
+    def warm(self, datasets: Iterable[Mapping[str, Any]], jobs: int | None = None) -> RenderStats:
+        """Render every template for every data set not cached yet, in parallel."""
+        stats = RenderStats()
+        pending = []
+        for data in datasets:
+            for template in self.templates:
+                if self.lookup(template, data) is None:
+                    pending.append((template, data))
+                else:
+                    stats.hits += 1
+
+        def render_one(job: tuple[str, Mapping[str, Any]]) -> str | None:
+            template, data = job
+            try:
+                self.store(template, data, self.render(template, data))
+            except (OSError, RuntimeError) as e:
+                return f"{data.get('theme')}: {template}: {e}"
+            return None
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for error in pool.map(render_one, pending):
+                stats.misses += 1
+                if error:
+                    stats.errors.append(error)
+                else:
+                    stats.written += 1
+        return stats
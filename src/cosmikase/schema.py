@@ -6,12 +6,14 @@ enabling validation and providing better error messages.
 
 from __future__ import annotations
 
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Any, Literal
 
-import yaml
 from pydantic import BaseModel, Field, field_validator
 
+from cosmikase.config import load_config
+
 
 class PackageItem(BaseModel):
     """APT package configuration."""
@@ -64,6 +66,7 @@ class InstallerItem(BaseModel):
     bun_package: str | None = None
     args: str | None = None
     check: str | None = None
+    version_args: list[str] | None = None
     note: str | None = None
     install: bool = True
 
@@ -141,6 +144,25 @@ class InstallersConfig(BaseModel):
     security: list[InstallerItem] = Field(default_factory=list)
 
 
+class UpdateStepItem(BaseModel):
+    """Update step configuration (``cosmikase update``)."""
+
+    name: str
+    desc: str | None = None
+    command: str
+    requires: str | None = None
+    locks: list[str] = Field(default_factory=list)
+    after: list[str] = Field(default_factory=list)
+
+
+class UpdateConfig(BaseModel):
+    """Update steps and the capacity of their locks."""
+
+    jobs: int = 4
+    locks: dict[str, int] = Field(default_factory=dict)
+    steps: list[UpdateStepItem] = Field(default_factory=list)
+
+
 class ThemesConfig(BaseModel):
     """Themes configuration."""
 
@@ -171,6 +193,7 @@ class CosmikaseConfig(BaseModel):
     uv_tools: list[UvToolItem | str] = Field(default_factory=list)
     themes: ThemesConfig = Field(default_factory=ThemesConfig)
     scripts: list[Any] = Field(default_factory=list)
+    update: UpdateConfig = Field(default_factory=UpdateConfig)
     hp_zbook_ultra: HardwareConfig | None = None
 
     @field_validator("npm", "uv_tools", mode="before")
@@ -188,30 +211,29 @@ class CosmikaseConfig(BaseModel):
         return result
 
 
-def load_and_validate(path: Path | str) -> CosmikaseConfig:
+def load_and_validate(path: Path | str | Sequence[Path | str]) -> CosmikaseConfig:
     """Load and validate a cosmikase.yaml configuration file.
 
+    Layered configs are validated as merged by ``load_config``.
+
     Args:
-        path: Path to the configuration file.
+        path: Path to the configuration file, or a list of layer files.
 
     Returns:
         Validated CosmikaseConfig object.
 
     Raises:
         pydantic.ValidationError: If the configuration is invalid.
-        FileNotFoundError: If the file doesn't exist.
+        LayerError: If a layer doesn't exist or can't be parsed.
     """
-    path = Path(path)
-    with open(path) as f:
-        data = yaml.safe_load(f)
-    return CosmikaseConfig.model_validate(data)
+    return CosmikaseConfig.model_validate(load_config(path))
 
 
-def validate_config(path: Path | str) -> tuple[bool, list[str]]:
+def validate_config(path: Path | str | Sequence[Path | str]) -> tuple[bool, list[str]]:
     """Validate a configuration file and return errors if any.
 
     Args:
-        path: Path to the configuration file.
+        path: Path to the configuration file, or a list of layer files.
 
     Returns:
         Tuple of (is_valid, list_of_error_messages)
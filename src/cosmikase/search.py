@@ -0,0 +1,123 @@
+"""Incremental fuzzy search over short text records.
+
+``FuzzyIndex`` keeps a posting set per character so a query only has to verify
+the records that contain all of its characters. Results for recent queries are
+remembered, so typing one more character refines the previous result set
+instead of rescanning every record.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+# Score bonuses for fuzzy matches
+_SUBSTRING_BONUS = 100
+_PREFIX_BONUS = 50
+_WORD_START_BONUS = 10
+_SEPARATORS = " -_./:@"
+
+
+def fuzzy_score(query: str, text: str) -> int | None:
+    """Score ``text`` against ``query`` (both lowercase), or None if it doesn't match.
+
+    A match requires the query characters to appear in order. Contiguous
+    substring and prefix matches rank highest; characters landing on word
+    starts score more than scattered ones, and gaps cost points.
+    """
+    if not query:
+        return 0
+    pos = text.find(query)
+    if pos >= 0:
+        score = _SUBSTRING_BONUS - pos
+        if pos == 0 or text[pos - 1] in _SEPARATORS:
+            score += _PREFIX_BONUS
+        return score
+
+    score = 0
+    last = -1
+    for char in query:
+        found = text.find(char, last + 1)
+        if found < 0:
+            return None
+        if found == 0 or text[found - 1] in _SEPARATORS:
+            score += _WORD_START_BONUS
+        score -= found - last - 1
+        last = found
+    return score
+
+
+class FuzzyIndex(Generic[K]):
+    """Inverted character index with incremental fuzzy refinement."""
+
+    # Number of previous queries whose results are kept for refinement
+    HISTORY = 32
+
+    def __init__(self) -> None:
+        self._texts: dict[K, str] = {}
+        self._chars: dict[str, set[K]] = {}
+        self._history: list[tuple[str, list[K]]] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._texts
+
+    def add(self, key: K, fields: Iterable[str | None]) -> None:
+        """Index ``key`` under the given text fields (None values are ignored)."""
+        if key in self._texts:
+            self.remove(key)
+        text = " ".join(f.lower() for f in fields if f)
+        self._texts[key] = text
+        for char in set(text):
+            self._chars.setdefault(char, set()).add(key)
+        self._history.clear()
+
+    def remove(self, key: K) -> None:
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for char in set(text):
+            self._chars[char].discard(key)
+        self._history.clear()
+
+    def _candidates(self, query: str) -> set[K]:
+        """Keys whose text contains every character of ``query``."""
+        postings = [self._chars.get(char, set()) for char in set(query)]
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, limit: int | None = None) -> list[K]:
+        """Return keys matching ``query``, best first.
+
+        If a previous query is a prefix of this one, only its matches are
+        re-scored: any record matching the longer query matched the shorter one.
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(self._texts)[:limit]
+
+        while self._history and not query.startswith(self._history[-1][0]):
+            self._history.pop()
+        if self._history and self._history[-1][0] == query:
+            matches = self._history[-1][1]
+        else:
+            pool: Iterable[K] = self._history[-1][1] if self._history else self._candidates(query)
+            scored = []
+            for key in pool:
+                score = fuzzy_score(query, self._texts[key])
+                if score is not None:
+                    scored.append((score, self._texts[key], key))
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            matches = [key for _, _, key in scored]
+            self._history.append((query, matches))
+            del self._history[: -self.HISTORY]
+        return matches[:limit] if limit is not None else list(matches)
@@ -0,0 +1,400 @@
+"""Incremental sync of a theme collection into the installed themes directory.
+
+The source is described by a Merkle-style manifest: a SHA-256 per file, a root
+hash per theme (over its sorted file hashes) and a root hash for the whole
+collection. The manifest is stored in the destination and remembers each source
+file's size and mtime, as well as the size and mtime of every installed file,
+so syncing an up-to-date machine is a stat walk of both sides plus a comparison
+of root hashes; no file contents are read. Installed files that were edited or
+deleted no longer match their recorded stats, and their theme is repaired.
+
+Changed themes are rebuilt in a staging directory next to the installed copy.
+Unchanged files are hardlinked from the installed copy, and changed ones are
+copied in parallel with ``copy_file_range``. The staging directory is then
+swapped into place atomically, so applications never see a half-synced theme.
+With a ``BlobStore``, changed images are stored once by content and hardlinked
+into every theme that uses them instead of being copied per theme.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import errno
+import functools
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cosmikase.blobstore import BlobStore, file_digest
+from cosmikase.images import IMAGE_SUFFIXES
+
+MANIFEST_NAME = ".cosmikase-sync.json"
+MANIFEST_VERSION = 2
+
+# Files directly inside the collection (README.md, ...) form this pseudo-theme
+TOP_LEVEL = ""
+
+# renameat2(2) constants (linux/fcntl.h)
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    size: int
+    mtime_ns: int
+    mode: int
+    digest: str
+
+
+@dataclass
+class ThemeTree:
+    files: dict[str, FileEntry] = field(default_factory=dict)
+
+    @property
+    def root(self) -> str:
+        hasher = hashlib.sha256()
+        for rel in sorted(self.files):
+            hasher.update(f"{rel}\0{self.files[rel].mode:o}\0{self.files[rel].digest}\n".encode())
+        return hasher.hexdigest()
+
+
+# Relative path -> (size, mtime_ns) of an installed file
+InstalledFiles = dict[str, tuple[int, int]]
+
+
+@dataclass
+class Manifest:
+    themes: dict[str, ThemeTree] = field(default_factory=dict)
+    # Theme name -> its files as installed in the destination
+    installed: dict[str, InstalledFiles] = field(default_factory=dict)
+
+    @property
+    def root(self) -> str:
+        hasher = hashlib.sha256()
+        for name in sorted(self.themes):
+            hasher.update(f"{name}\0{self.themes[name].root}\n".encode())
+        return hasher.hexdigest()
+
+    def to_json(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "root": self.root,
+            "themes": {
+                name: {rel: [e.size, e.mtime_ns, e.mode, e.digest] for rel, e in tree.files.items()}
+                for name, tree in self.themes.items()
+            },
+            "installed": {
+                name: {rel: list(stat) for rel, stat in files.items()}
+                for name, files in self.installed.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> Manifest:
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported sync manifest version: {data.get('version')}")
+        return cls(
+            {
+                name: ThemeTree({rel: FileEntry(*entry) for rel, entry in files.items()})
+                for name, files in data["themes"].items()
+            },
+            {
+                name: {rel: (size, mtime_ns) for rel, (size, mtime_ns) in files.items()}
+                for name, files in data["installed"].items()
+            },
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> Manifest | None:
+        """Load a manifest, or None if it is missing or unreadable."""
+        try:
+            return cls.from_json(json.loads(path.read_text()))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.to_json(), separators=(",", ":")))
+        tmp_path.replace(path)
+
+
+@dataclass
+class SyncStats:
+    themes: int = 0
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    copied: int = 0
+    linked: int = 0
+    shared: int = 0  # Images linked from the blob store
+    bytes_copied: int = 0
+
+    @property
+    def up_to_date(self) -> bool:
+        return not self.changed and not self.removed
+
+
+def _walk(root: Path, recursive: bool = True) -> list[tuple[str, os.stat_result]]:
+    """Return (relative path, stat) for regular files below ``root``."""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if not recursive:
+            dirnames.clear()
+            filenames = [n for n in filenames if not n.startswith(".")]
+        base = Path(dirpath)
+        for name in filenames:
+            path = base / name
+            stat = path.stat()
+            files.append((path.relative_to(root).as_posix(), stat))
+    return files
+
+
+def scan_source(src: Path, previous: Manifest | None = None, jobs: int | None = None) -> Manifest:
+    """Build the manifest of ``src``.
+
+    Files whose size and mtime match ``previous`` reuse its digest; only new or
+    modified files are hashed, in parallel.
+    """
+    manifest = Manifest()
+    pending: list[tuple[ThemeTree, str, os.stat_result, Path]] = []
+    names = sorted(
+        entry.name for entry in os.scandir(src) if entry.is_dir() and not entry.name.startswith(".")
+    )
+    groups = [(TOP_LEVEL, src, False)] + [(name, src / name, True) for name in names]
+
+    for name, root, recursive in groups:
+        tree = ThemeTree()
+        known = previous.themes.get(name) if previous else None
+        for rel, stat in _walk(root, recursive):
+            old = known.files.get(rel) if known else None
+            mode = stat.st_mode & 0o777
+            if old and (old.size, old.mtime_ns, old.mode) == (stat.st_size, stat.st_mtime_ns, mode):
+                tree.files[rel] = old
+            else:
+                pending.append((tree, rel, stat, root / rel))
+        manifest.themes[name] = tree
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        digests = list(pool.map(file_digest, [path for *_, path in pending]))
+    for (tree, rel, stat, _), digest in zip(pending, digests, strict=True):
+        tree.files[rel] = FileEntry(stat.st_size, stat.st_mtime_ns, stat.st_mode & 0o777, digest)
+    if not manifest.themes.get(TOP_LEVEL, ThemeTree()).files:
+        manifest.themes.pop(TOP_LEVEL, None)
+    return manifest
+
+
+def scan_installed(dest: Path, name: str, known: Iterable[str] = ()) -> InstalledFiles:
+    """Size and mtime of the installed files of theme ``name``.
+
+    Top-level files share the destination with user files, so only the
+    ``known`` ones are looked at.
+    """
+    if name != TOP_LEVEL:
+        return {rel: (stat.st_size, stat.st_mtime_ns) for rel, stat in _walk(dest / name)}
+    installed = {}
+    for rel in known:
+        try:
+            stat = (dest / rel).stat()
+        except FileNotFoundError:
+            continue
+        installed[rel] = (stat.st_size, stat.st_mtime_ns)
+    return installed
+
+
+def copy_file(src: Path, dest: Path) -> None:
+    """Copy file contents in the kernel (``copy_file_range``, else ``sendfile``)."""
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    # shutil.copyfile uses sendfile on Linux
+    shutil.copyfile(src, dest)
+
+
+@functools.cache
+def _renameat2():
+    try:
+        return ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+
+
+def _exchange(a: Path, b: Path) -> bool:
+    """Atomically swap two paths with renameat2(RENAME_EXCHANGE), if supported."""
+    renameat2 = _renameat2()
+    if renameat2 is None:
+        return False
+    return renameat2(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE) == 0
+
+
+def swap_in(staging: Path, target: Path) -> None:
+    """Replace ``target`` with ``staging``."""
+    if not target.exists():
+        staging.rename(target)
+        return
+    if _exchange(staging, target):
+        shutil.rmtree(staging)
+        return
+    # No RENAME_EXCHANGE (old kernel or filesystem): move the old copy aside first
+    old = target.with_name(f".{target.name}.sync-old")
+    shutil.rmtree(old, ignore_errors=True)
+    target.rename(old)
+    staging.rename(target)
+    shutil.rmtree(old)
+
+
+def sync_themes(
+    src: Path,
+    dest: Path,
+    jobs: int | None = None,
+    dry_run: bool = False,
+    force: bool = False,
+    store: BlobStore | None = None,
+) -> SyncStats:
+    """Make ``dest`` an up-to-date copy of the theme collection in ``src``.
+
+    Only themes whose root hash changed are rebuilt. Themes that disappeared
+    from ``src`` are removed from ``dest`` if an earlier sync installed them;
+    other directories in ``dest`` (user themes) are left alone.
+
+    Args:
+        src: Source themes directory (the repository's ``themes/``).
+        dest: Installed themes directory.
+        jobs: Parallel hashing and copy workers.
+        dry_run: Only report which themes would change.
+        force: Ignore the stored manifest and rehash/copy everything.
+        store: Blob store to link changed images from (they are copied otherwise).
+    """
+    manifest_path = dest / MANIFEST_NAME
+    previous = None if force else Manifest.load(manifest_path)
+    source = scan_source(src, previous, jobs)
+    stats = SyncStats(themes=len(source.themes.keys() - {TOP_LEVEL}))
+
+    old_themes = previous.themes if previous else {}
+    recorded = previous.installed if previous else {}
+    installed: dict[str, InstalledFiles] = {}
+    for name, tree in source.themes.items():
+        old = old_themes.get(name)
+        installed[name] = scan_installed(dest, name, tree.files)
+        missing = name != TOP_LEVEL and not (dest / name).is_dir()
+        # Installed files edited or deleted since the last sync are repaired
+        modified = installed[name] != recorded.get(name)
+        if old is None or old.root != tree.root or missing or modified:
+            stats.changed.append(name)
+    stats.removed = sorted(old_themes.keys() - source.themes.keys())
+    if stats.up_to_date or dry_run:
+        return stats
+
+    dest.mkdir(parents=True, exist_ok=True)
+    links: list[tuple[Path, Path, Path]] = []
+    copies: list[tuple[Path, Path, FileEntry]] = []
+    images: list[tuple[Path, Path, FileEntry]] = []
+    swaps: list[tuple[Path, Path]] = []
+    for name in stats.changed:
+        tree = source.themes[name]
+        old = old_themes.get(name)
+        # Installed files that still match the manifest can be linked or kept
+        intact = {
+            rel for rel, stat in installed[name].items() if recorded.get(name, {}).get(rel) == stat
+        }
+        if name == TOP_LEVEL:
+            # Top-level files are few and small: replace them one by one
+            for rel, entry in tree.files.items():
+                if old is None or old.files.get(rel) != entry or rel not in intact:
+                    tmp = dest / f".{rel}.sync-tmp"
+                    copies.append((src / rel, tmp, entry))
+                    swaps.append((tmp, dest / rel))
+            continue
+
+        staging = dest / f".{name}.sync-new"
+        shutil.rmtree(staging, ignore_errors=True)
+        # Created up front: a theme without files still replaces its old copy
+        staging.mkdir()
+        for rel, entry in tree.files.items():
+            target = staging / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            known = old.files.get(rel) if old else None
+            unchanged = known and known.digest == entry.digest and known.mode == entry.mode
+            if unchanged and rel in intact:
+                links.append((dest / name / rel, target, src / name / rel))
+            elif store is not None and rel.lower().endswith(IMAGE_SUFFIXES):
+                images.append((src / name / rel, target, entry))
+            else:
+                copies.append((src / name / rel, target, entry))
+        swaps.append((staging, dest / name))
+
+    def link(job: tuple[Path, Path, Path]) -> None:
+        installed, target, source_path = job
+        try:
+            os.link(installed, target)
+        except OSError:
+            # The installed copy went missing: copy it from the source instead
+            copy_file(source_path, target)
+            shutil.copymode(source_path, target)
+
+    def copy(job: tuple[Path, Path, FileEntry]) -> None:
+        source_path, target, entry = job
+        copy_file(source_path, target)
+        os.chmod(target, entry.mode)
+
+    def share(job: tuple[Path, Path, FileEntry]) -> None:
+        assert store is not None
+        _, target, entry = job
+        # Hardlinks share the mode too, so only link blobs with the same one
+        if store.path_for(entry.digest).stat().st_mode & 0o777 == entry.mode:
+            store.link(entry.digest, target)
+        else:
+            copy(job)
+
+    if store is not None:
+        # Each unique image is stored once, before linking it into every theme
+        for source_path, _, entry in images:
+            if entry.digest not in store:
+                store.add(source_path, entry.digest)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(link, links))
+        list(pool.map(copy, copies))
+        list(pool.map(share, images))
+    stats.linked = len(links)
+    stats.shared = len(images)
+    stats.copied = len(copies)
+    stats.bytes_copied = sum(entry.size for *_, entry in copies)
+
+    for staging, target in swaps:
+        if staging.is_dir():
+            swap_in(staging, target)
+        else:
+            staging.replace(target)
+
+    for name in stats.removed:
+        if name == TOP_LEVEL:
+            continue
+        shutil.rmtree(dest / name, ignore_errors=True)
+    # Top-level files removed from the source
+    old_top = old_themes.get(TOP_LEVEL)
+    new_top = source.themes.get(TOP_LEVEL, ThemeTree())
+    for rel in old_top.files.keys() - new_top.files.keys() if old_top else ():
+        with contextlib.suppress(FileNotFoundError):
+            (dest / rel).unlink()
+
+    for name in stats.changed:
+        installed[name] = scan_installed(dest, name, source.themes[name].files)
+    source.installed = installed
+    source.save(manifest_path)
+    return stats
@@ -0,0 +1,146 @@
+"""Reload running terminal emulators after a theme change.
+
+The process table is scanned once (``/proc/<pid>/comm``) and matched against
+every known terminal in that single pass; the current user's matching
+processes are then signalled directly with ``os.kill``. This replaces one
+``pgrep`` and one ``pkill`` fork per terminal type.
+
+Terminals are described in the ``TERMINALS`` table; ``register_terminal``
+adds more.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+PROC_ROOT = Path("/proc")
+
+
+@dataclass(frozen=True)
+class Terminal:
+    name: str
+    processes: tuple[str, ...]  # Process names as in /proc/<pid>/comm
+    reload_signal: signal.Signals | None = None  # None: reloads itself via inotify
+
+
+TERMINALS: dict[str, Terminal] = {}
+
+
+def register_terminal(terminal: Terminal) -> None:
+    """Add (or replace) a terminal in the reload table."""
+    TERMINALS[terminal.name] = terminal
+
+
+for _terminal in (
+    Terminal("kitty", ("kitty",), signal.SIGUSR1),
+    Terminal("ghostty", ("ghostty",), signal.SIGUSR1),
+    Terminal("alacritty", ("alacritty",)),
+    Terminal("cosmic-term", ("cosmic-term",)),
+):
+    register_terminal(_terminal)
+
+
+@dataclass
+class ReloadResult:
+    terminal: Terminal
+    pids: list[int] = field(default_factory=list)
+    signalled: int = 0
+    failed: int = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self.pids)
+
+
+def scan_processes(
+    names: Iterable[str], proc_root: Path = PROC_ROOT, uid: int | None = None
+) -> dict[str, list[int]]:
+    """Return the pids of ``uid``'s processes whose name is in ``names``.
+
+    Process names are matched exactly, like ``pgrep -x``. The kernel truncates
+    ``comm`` to 15 characters, so longer names are compared truncated.
+    """
+    uid = os.getuid() if uid is None else uid
+    wanted = {name[:15]: name for name in names}
+    found: dict[str, list[int]] = {}
+    try:
+        entries = os.scandir(proc_root)
+    except OSError:
+        return found
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                if entry.stat().st_uid != uid:
+                    continue
+                with open(os.path.join(entry.path, "comm"), "rb") as f:
+                    comm = f.read().decode(errors="replace").rstrip("\n")
+            except OSError:
+                continue  # Exited while scanning
+            name = wanted.get(comm)
+            if name is not None:
+                found.setdefault(name, []).append(int(entry.name))
+    for pids in found.values():
+        pids.sort()
+    return found
+
+
+def reload_terminals(
+    terminals: Iterable[Terminal] | None = None,
+    proc_root: Path = PROC_ROOT,
+    uid: int | None = None,
+    dry_run: bool = False,
+) -> list[ReloadResult]:
+    """Signal every running instance of ``terminals`` (default: all registered).
+
+    Args:
+        terminals: Terminals to reload.
+        proc_root: Process table to scan (a fake tree in tests).
+        uid: Only processes owned by this user (default: the current user).
+        dry_run: Find processes but don't signal them.
+    """
+    terminals = list(TERMINALS.values() if terminals is None else terminals)
+    found = scan_processes(
+        {process for terminal in terminals for process in terminal.processes}, proc_root, uid
+    )
+    results = []
+    for terminal in terminals:
+        result = ReloadResult(terminal)
+        for process in terminal.processes:
+            result.pids.extend(found.get(process, []))
+        if terminal.reload_signal is not None and not dry_run:
+            for pid in result.pids:
+                try:
+                    os.kill(pid, terminal.reload_signal)
+                except ProcessLookupError:
+                    continue
+                except PermissionError:
+                    result.failed += 1
+                    continue
+                result.signalled += 1
+        results.append(result)
+    return results
+
+
+def describe(result: ReloadResult, dry_run: bool = False) -> str:
+    """One-line summary of a reload result."""
+    name = result.terminal.name
+    count = len(result.pids)
+
+    def plural(n: int) -> str:
+        return f"{n} process" if n == 1 else f"{n} processes"
+
+    if not result.running:
+        return f"{name} not running"
+    if result.terminal.reload_signal is None:
+        return f"{name} running ({plural(count)}, auto-reloads via inotify)"
+    if dry_run:
+        return f"Would reload {name} ({plural(count)})"
+    if result.failed:
+        return f"Failed to reload {name} ({result.failed} of {plural(count)})"
+    return f"Reloaded {name} ({plural(result.signalled)})"
@@ -3,51 +3,181 @@
 from __future__ import annotations
 
 import contextlib
-import subprocess
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+from rich.color import Color
 from rich.style import Style
 from rich.text import Text
-from textual import on
+from textual import on, work
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Horizontal
 from textual.reactive import reactive
-from textual.widgets import Footer, Header, OptionList, Static
+from textual.timer import Timer
+from textual.widgets import Footer, Header, Input, OptionList, Static
 from textual.widgets.option_list import Option
-from textual.worker import Worker, WorkerState, work
+from textual.worker import Worker, WorkerState, get_current_worker
+
+from cosmikase.apply import ApplyCancelled, ApplyError, ApplyProgress, apply_theme
+from cosmikase.pack import is_pack, open_pack
+from cosmikase.search import FuzzyIndex
+from cosmikase.themes import discover_theme_dirs, list_themes, load_manifest, resolve_theme
+from cosmikase.thumbnails import (
+    Thumbnail,
+    find_preview_image,
+    get_thumbnail,
+    pick_preview_member,
+    render_halfblocks,
+)
+
+# Above this many removals, rebuilding the option list is cheaper than
+# removing options one by one (each removal re-lays out the whole list).
+MAX_INCREMENTAL_REMOVALS = 8
+
+# Size of the wallpaper preview in character cells (each cell shows two pixels)
+THUMB_COLUMNS = 48
+THUMB_ROWS = 12
+
+
+def preview_thumbnail(theme_path: Path, wallpaper: str | None) -> Thumbnail | None:
+    """Thumbnail for a theme directory or pack (pack members are read from the mmap)."""
+    size = (THUMB_COLUMNS, THUMB_ROWS * 2)
+    if is_pack(theme_path):
+        pack = open_pack(theme_path)
+        name = pick_preview_member(pack.names(), wallpaper)
+        member = pack.member(name) if name else None
+        if member is None:
+            return None
+        return get_thumbnail(pack.view(member.name), *size, digest=member.digest)
+    image = find_preview_image(theme_path, wallpaper)
+    return get_thumbnail(image, *size) if image else None
+
+
+def render_preview(theme_path: Path) -> Text:
+    """Render the preview text (name, variant, color swatches) for a theme."""
+    try:
+        manifest = load_manifest(theme_path)
+    except Exception as e:
+        return Text(f"Error loading preview: {e}")
+
+    text = Text()
+    text.append(f"Theme: {manifest.name}\n", style="bold")
+    text.append(f"Variant: {manifest.variant}\n\n")
+
+    thumb = preview_thumbnail(theme_path, manifest.wallpaper)
+    if thumb is not None:
+        text.append_text(render_halfblocks(thumb))
+        text.append("\n")
+
+    if manifest.colors:
+        text.append("Colors:\n")
+        for name, hex_color in manifest.colors.items():
+            red, green, blue, _ = manifest.colors.rgba(name)
+            text.append("██ ", style=Style(color=Color.from_rgb(red, green, blue)))
+            text.append(f"{name}: {hex_color}\n")
+    else:
+        text.append("No colors defined in manifest.\n")
+
+    if manifest.cursor_theme:
+        text.append(f"\nCursor: {manifest.cursor_theme}\n")
+    if manifest.wallpaper:
+        text.append(f"Wallpaper: {manifest.wallpaper}\n")
+    return text
+
+
+class PreviewCache:
+    """Thread-safe bounded LRU cache of rendered previews keyed by theme path."""
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self._items: OrderedDict[Path, Text] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Path) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key: Path) -> Text | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Path, value: Text) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def load(self, key: Path) -> Text:
+        """Return the cached preview for ``key``, rendering it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = render_preview(key)
+            self.put(key, value)
+        return value
+
+
+def sync_options(option_list: OptionList, names: list[str]) -> None:
+    """Make ``option_list`` show ``names`` with as few widget updates as possible.
+
+    Appends when the new list extends the current one, removes options when it
+    is a short subsequence of it, and only otherwise rebuilds the list. The
+    highlighted theme stays highlighted if it is still listed.
+    """
+    current = [str(option_list.get_option_at_index(i).id) for i in range(option_list.option_count)]
+    if current == names:
+        return
+
+    highlighted = option_list.highlighted
+    highlighted_id = current[highlighted] if highlighted is not None else None
+
+    if names[: len(current)] == current:
+        option_list.add_options(Option(name, id=name) for name in names[len(current) :])
+    else:
+        wanted = set(names)
+        removals = [name for name in current if name not in wanted]
+        is_subsequence = [name for name in current if name in wanted] == names
+        if is_subsequence and len(removals) <= MAX_INCREMENTAL_REMOVALS:
+            for name in removals:
+                option_list.remove_option(name)
+        else:
+            option_list.clear_options()
+            option_list.add_options(Option(name, id=name) for name in names)
 
-from cosmikase.themes import discover_theme_dirs, find_theme_cli, list_themes, load_manifest
+    if highlighted_id in names:
+        option_list.highlighted = names.index(highlighted_id)
+    elif names:
+        option_list.highlighted = 0
 
 
 class ThemePreview(Static):
     """Shows color swatches for selected theme."""
 
+    def __init__(self, cache: PreviewCache | None = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache or PreviewCache()
+        self.theme_path: Path | None = None
+
     def update_preview(self, theme_path: Path) -> None:
-        try:
-            manifest = load_manifest(theme_path)
-            text = Text()
-            text.append(f"Theme: {manifest.name}\n", style="bold")
-            text.append(f"Variant: {manifest.variant}\n\n")
-
-            if manifest.colors:
-                text.append("Colors:\n")
-                for name, hex_color in manifest.colors.items():
-                    # Ensure hex_color is valid for Rich
-                    clean_color = hex_color if hex_color.startswith("#") else f"#{hex_color}"
-                    text.append("██ ", style=Style(color=clean_color))
-                    text.append(f"{name}: {hex_color}\n")
-            else:
-                text.append("No colors defined in manifest.\n")
-
-            if manifest.cursor_theme:
-                text.append(f"\nCursor: {manifest.cursor_theme}\n")
-            if manifest.wallpaper:
-                text.append(f"Wallpaper: {manifest.wallpaper}\n")
-
-            self.update(text)
-        except Exception as e:
-            self.update(f"Error loading preview: {e}")
+        """Render synchronously (via the cache) and show the preview."""
+        self.show_text(theme_path, self.cache.load(theme_path))
+
+    def show_text(self, theme_path: Path, text: Text) -> None:
+        self.theme_path = theme_path
+        self.update(text)
 
 
 class ThemeTui(App):
@@ -73,6 +203,10 @@ class ThemeTui(App):
         margin-bottom: 1;
     }
 
+    #search {
+        margin-bottom: 1;
+    }
+
     #main-content {
         height: 100%;
     }
@@ -100,16 +234,29 @@ class ThemeTui(App):
     """
 
     BINDINGS = [
+        Binding("/", "focus_search", "Search"),
+        Binding("escape", "clear_search", "Clear search", show=False),
         Binding("r", "refresh", "Refresh list"),
+        Binding("ctrl+x", "cancel_apply", "Cancel apply"),
         Binding("q", "quit", "Quit"),
     ]
 
     status = reactive("Select a theme and press Enter to apply.")
 
+    # Delay before loading an uncached preview while the highlight is moving
+    PREVIEW_DEBOUNCE = 0.08
+    # Number of themes on each side of the highlight to render ahead of time
+    PREFETCH_RADIUS = 2
+
     def __init__(self) -> None:
         super().__init__()
         self.theme_dirs: list[Path] = discover_theme_dirs()
         self.active_dir: Path | None = self.theme_dirs[0] if self.theme_dirs else None
+        self.preview_cache = PreviewCache()
+        self.theme_names: list[str] = []
+        self.search_index: FuzzyIndex[str] = FuzzyIndex()
+        self._preview_timer: Timer | None = None
+        self._pending_preview: tuple[Path, int] | None = None
 
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
@@ -120,11 +267,12 @@ class ThemeTui(App):
                 else "No theme directory found. Set THEMES_DIR or run 'make install'."
             )
             yield Static(path_text, id="path")
+            yield Input(placeholder="Search themes by name, variant or tag", id="search")
 
             with Horizontal(id="main-content"):
                 self.option_list = OptionList()
                 yield self.option_list
-                self.preview = ThemePreview()
+                self.preview = ThemePreview(self.preview_cache)
                 yield self.preview
 
             yield Static("Select a theme and press Enter to apply.", id="status")
@@ -139,15 +287,59 @@ class ThemeTui(App):
             self.query_one("#status", Static).update(status)
 
     def _reload_options(self) -> None:
-        self.option_list.clear_options()
-        names = list_themes(self.active_dir)
-        for name in names:
-            self.option_list.add_option(Option(name, id=name))
-        if not names:
+        self.theme_names = list_themes(self.active_dir)
+        # Names are searchable immediately; variants and tags arrive from a worker
+        self.search_index = FuzzyIndex()
+        for name in self.theme_names:
+            self.search_index.add(name, [name])
+        self._apply_filter()
+        if not self.theme_names:
             self.status = "No themes available. Run 'make install' to populate themes."
         else:
-            # Select first option by default
-            self.option_list.action_first()
+            self._index_manifests(self.active_dir, list(self.theme_names))
+
+    def _apply_filter(self) -> None:
+        query = self.query_one("#search", Input).value
+        names = self.search_index.search(query) if query.strip() else self.theme_names
+        sync_options(self.option_list, names)
+
+    @work(exclusive=True, thread=True, group="index")
+    def _index_manifests(self, themes_dir: Path | None, names: list[str]) -> None:
+        """Build a search index including manifest names, variants and tags."""
+        if themes_dir is None:
+            return
+        worker = get_current_worker()
+        index: FuzzyIndex[str] = FuzzyIndex()
+        for name in names:
+            if worker.is_cancelled:
+                return
+            try:
+                manifest = load_manifest(resolve_theme(themes_dir, name))
+                index.add(name, [name, manifest.name, manifest.variant, *manifest.tags])
+            except Exception:
+                index.add(name, [name])
+        self.call_from_thread(self._set_search_index, themes_dir, index)
+
+    def _set_search_index(self, themes_dir: Path, index: FuzzyIndex[str]) -> None:
+        if themes_dir == self.active_dir:
+            self.search_index = index
+            self._apply_filter()
+
+    @on(Input.Changed, "#search")
+    def handle_search_changed(self, event: Input.Changed) -> None:
+        self._apply_filter()
+
+    @on(Input.Submitted, "#search")
+    def handle_search_submitted(self, event: Input.Submitted) -> None:
+        self.option_list.focus()
+
+    def action_focus_search(self) -> None:
+        self.query_one("#search", Input).focus()
+
+    def action_clear_search(self) -> None:
+        search = self.query_one("#search", Input)
+        search.value = ""
+        self.option_list.focus()
 
     def action_refresh(self) -> None:
         self.theme_dirs = discover_theme_dirs()
@@ -159,34 +351,109 @@ class ThemeTui(App):
         )
         self.query_one("#path", Static).update(path_text)
         self.status = "Theme list refreshed."
+        self.preview_cache.clear()
         self._reload_options()
 
-    @work(exclusive=True, thread=True)
+    @work(exclusive=True, thread=True, group="apply")
     def _apply_theme_task(self, theme: str) -> str:
-        """Apply theme in a background thread."""
-        cli = find_theme_cli()
-        if not cli:
-            return "ERROR: cosmikase-theme not found."
-
-        result = subprocess.run([cli, theme], capture_output=True, text=True)
-        if result.returncode == 0:
-            return f"SUCCESS: Applied '{theme}'."
-        else:
-            detail = result.stderr.strip() or result.stdout.strip() or str(result.returncode)
-            return f"ERROR: Failed to apply '{theme}': {detail}"
+        """Apply theme in a background thread, streaming stage progress."""
+        worker = get_current_worker()
+
+        def report(progress: ApplyProgress) -> None:
+            self.call_from_thread(setattr, self, "status", f"{theme}: {progress}")
+
+        try:
+            warnings = apply_theme(
+                theme,
+                self.active_dir,
+                on_progress=report,
+                cancelled=lambda: worker.is_cancelled,
+            )
+        except ApplyCancelled:
+            return f"CANCELLED: '{theme}' was not fully applied."
+        except ApplyError as e:
+            return f"ERROR: Failed to apply '{theme}': {e}"
+        if warnings:
+            return f"SUCCESS: Applied '{theme}' with warnings: {'; '.join(warnings)}"
+        return f"SUCCESS: Applied '{theme}'."
+
+    def action_cancel_apply(self) -> None:
+        for worker in self.workers:
+            if worker.group == "apply" and not worker.is_finished:
+                worker.cancel()
+                self.status = "Cancelling theme apply..."
 
     def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
         """Handle worker state changes to update status."""
+        if event.worker.group != "apply":
+            return
         if event.state == WorkerState.SUCCESS:
             self.status = str(event.worker.result)
+        elif event.state == WorkerState.CANCELLED:
+            self.status = "Theme apply cancelled."
         elif event.state == WorkerState.ERROR:
             self.status = f"CRITICAL ERROR: {event.worker.error}"
 
     @on(OptionList.OptionHighlighted)
     def handle_option_highlighted(self, event: OptionList.OptionHighlighted) -> None:
-        if self.active_dir and event.option:
-            theme_path = self.active_dir / event.option.prompt
-            self.preview.update_preview(theme_path)
+        if not (self.active_dir and event.option):
+            return
+        theme_path = resolve_theme(self.active_dir, str(event.option.prompt))
+        if self._preview_timer is not None:
+            self._preview_timer.stop()
+            self._preview_timer = None
+
+        cached = self.preview_cache.get(theme_path)
+        if cached is not None:
+            self.preview.show_text(theme_path, cached)
+            self._pending_preview = None
+            self._load_preview(
+                theme_path, self._neighbor_paths(event.option_index), prefetch_only=True
+            )
+            return
+
+        # Debounce: only load once the highlight rests for a moment
+        self._pending_preview = (theme_path, event.option_index)
+        self._preview_timer = self.set_timer(self.PREVIEW_DEBOUNCE, self._flush_preview)
+
+    def _flush_preview(self) -> None:
+        self._preview_timer = None
+        if self._pending_preview is not None:
+            theme_path, index = self._pending_preview
+            self._pending_preview = None
+            self._load_preview(theme_path, self._neighbor_paths(index))
+
+    def _neighbor_paths(self, index: int) -> list[Path]:
+        """Theme paths around ``index``, nearest first."""
+        if self.active_dir is None:
+            return []
+        paths: list[Path] = []
+        for offset in range(1, self.PREFETCH_RADIUS + 1):
+            for neighbor in (index + offset, index - offset):
+                if 0 <= neighbor < self.option_list.option_count:
+                    option = self.option_list.get_option_at_index(neighbor)
+                    paths.append(resolve_theme(self.active_dir, str(option.prompt)))
+        return paths
+
+    @work(exclusive=True, thread=True, group="preview")
+    def _load_preview(
+        self, theme_path: Path, neighbors: list[Path], prefetch_only: bool = False
+    ) -> None:
+        """Render a preview off the UI thread, then warm the cache for its neighbors.
+
+        Starting a new load cancels the previous one (exclusive group), so a stale
+        result is never shown and prefetching stops as soon as the highlight moves.
+        """
+        worker = get_current_worker()
+        if not prefetch_only:
+            text = self.preview_cache.load(theme_path)
+            if worker.is_cancelled:
+                return
+            self.call_from_thread(self.preview.show_text, theme_path, text)
+        for path in neighbors:
+            if worker.is_cancelled:
+                return
+            self.preview_cache.load(path)
 
     @on(OptionList.OptionSelected)
     def handle_option_selected(self, event: OptionList.OptionSelected) -> None:
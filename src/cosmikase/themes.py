@@ -12,15 +12,21 @@ from typing import Literal
 
 import yaml
 
+from cosmikase.colors import Palette
+from cosmikase.pack import PACK_SUFFIX, is_pack, open_pack
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class ThemeManifest:
+    """Parsed theme.yaml. Immutable and hashable, so it can key caches."""
+
     name: str
     variant: Literal["dark", "light"]
-    colors: dict[str, str]
+    colors: Palette
     cursor_theme: str | None = None
     cursor_extension: str | None = None
     wallpaper: str | None = None
+    tags: tuple[str, ...] = ()
 
 
 def _unique_dirs(candidates: Iterable[Path]) -> list[Path]:
@@ -65,9 +71,33 @@ def discover_theme_dirs() -> list[Path]:
 
 
 def list_themes(base: Path | None) -> list[str]:
+    """List theme directories and packed (``.ctheme``) themes in ``base``."""
     if base is None or not base.is_dir():
         return []
-    return sorted(entry.name for entry in base.iterdir() if entry.is_dir())
+    names = set()
+    for entry in os.scandir(base):
+        if entry.is_dir():
+            names.add(entry.name)
+        elif entry.name.endswith(PACK_SUFFIX) and entry.is_file():
+            names.add(entry.name.removesuffix(PACK_SUFFIX))
+    return sorted(names)
+
+
+def resolve_theme(base: Path, name: str) -> Path:
+    """Return the theme directory, or the pack file if only a packed theme exists."""
+    directory = base / name
+    pack = base / f"{name}{PACK_SUFFIX}"
+    if not directory.is_dir() and pack.is_file():
+        return pack
+    return directory
+
+
+def read_theme_file(theme_path: Path, rel: str) -> bytes | None:
+    """Read a file from a theme directory or pack; None if it doesn't exist."""
+    if is_pack(theme_path):
+        return open_pack(theme_path).read(rel)
+    path = theme_path / rel
+    return path.read_bytes() if path.is_file() else None
 
 
 def find_theme_cli() -> str | None:
@@ -90,40 +120,43 @@ def find_theme_cli() -> str | None:
 
 
 def load_manifest(theme_path: Path) -> ThemeManifest:
-    """Load theme manifest from theme.yaml or fallback to legacy files."""
-    yaml_path = theme_path / "theme.yaml"
-    if yaml_path.exists():
-        with open(yaml_path) as f:
-            data = yaml.safe_load(f)
-            return ThemeManifest(
-                name=data.get("name", theme_path.name),
-                variant=data.get("variant", "dark"),
-                colors=data.get("colors", {}),
-                cursor_theme=data.get("cursor", {}).get("theme"),
-                cursor_extension=data.get("cursor", {}).get("extension"),
-                wallpaper=data.get("wallpaper"),
-            )
+    """Load theme manifest from theme.yaml or fallback to legacy files.
+
+    ``theme_path`` may be a theme directory or a packed ``.ctheme`` file.
+    """
+    default_name = theme_path.name.removesuffix(PACK_SUFFIX)
+    yaml_data = read_theme_file(theme_path, "theme.yaml")
+    if yaml_data is not None:
+        data = yaml.safe_load(yaml_data)
+        return ThemeManifest(
+            name=data.get("name", default_name),
+            variant=data.get("variant", "dark"),
+            colors=Palette(data.get("colors")),
+            cursor_theme=data.get("cursor", {}).get("theme"),
+            cursor_extension=data.get("cursor", {}).get("extension"),
+            wallpaper=data.get("wallpaper"),
+            tags=tuple(data.get("tags") or ()),
+        )
 
     # Fallback to legacy
-    is_light = (theme_path / "light.mode").exists()
+    is_light = read_theme_file(theme_path, "light.mode") is not None
 
     # Try to load cursor.json if it exists
-    cursor_json = theme_path / "cursor.json"
+    cursor_json = read_theme_file(theme_path, "cursor.json")
     cursor_theme = None
     cursor_extension = None
-    if cursor_json.exists():
+    if cursor_json is not None:
         try:
-            with open(cursor_json) as f:
-                cdata = json.load(f)
-                cursor_theme = cdata.get("colorTheme")
-                cursor_extension = cdata.get("extension")
+            cdata = json.loads(cursor_json)
+            cursor_theme = cdata.get("colorTheme")
+            cursor_extension = cdata.get("extension")
         except Exception:
             pass
 
     return ThemeManifest(
-        name=theme_path.name,
+        name=default_name,
         variant="light" if is_light else "dark",
-        colors={},
+        colors=Palette(),
         cursor_theme=cursor_theme,
         cursor_extension=cursor_extension,
     )
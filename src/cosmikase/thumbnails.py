@@ -0,0 +1,220 @@
+"""Content-addressed thumbnail cache for theme previews and wallpapers.
+
+Thumbnails are downscaled once and stored as binary PPM files under
+``~/.cache/cosmikase/thumbs``, keyed by the SHA-256 of the source image and the
+target size. Reading a cached thumbnail needs no image library; generating one
+requires Pillow (``pip install cosmikase[preview]``). The cache is capped in size
+and evicts least recently used entries.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from rich.style import Style
+from rich.text import Text
+
+from cosmikase.images import IMAGE_SUFFIXES, source_digest
+
+try:
+    from PIL import Image
+except ImportError:  # Optional dependency
+    Image = None
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Pruning frees this much more than needed, so it runs once per batch of writes
+_PRUNE_TO = 0.8
+
+# cache dir -> its size in bytes as of the last prune plus what was written since
+_cache_sizes: dict[Path, int] = {}
+_sizes_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Thumbnail:
+    width: int
+    height: int
+    pixels: bytes  # Packed RGB, row-major
+
+    def pixel(self, x: int, y: int) -> tuple[int, int, int]:
+        offset = (y * self.width + x) * 3
+        r, g, b = self.pixels[offset : offset + 3]
+        return r, g, b
+
+    def to_ppm(self) -> bytes:
+        return f"P6\n{self.width} {self.height}\n255\n".encode() + self.pixels
+
+    @classmethod
+    def from_ppm(cls, data: bytes) -> Thumbnail:
+        # Only the exact header written by to_ppm() is accepted
+        parts = data.split(b"\n", 3)
+        if len(parts) != 4 or parts[0] != b"P6" or parts[2] != b"255":
+            raise ValueError("Not a binary PPM thumbnail")
+        width, height = (int(v) for v in parts[1].split())
+        pixels = parts[3]
+        if len(pixels) != width * height * 3:
+            raise ValueError("Truncated PPM thumbnail")
+        return cls(width, height, pixels)
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "cosmikase" / "thumbs"
+
+
+def find_preview_image(theme_path: Path, wallpaper: str | None = None) -> Path | None:
+    """Pick the image to preview: preview.png, the manifest wallpaper, or the first background."""
+    candidates = [theme_path / "preview.png"]
+    if wallpaper:
+        candidates.append(theme_path / wallpaper)
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    backgrounds = theme_path / "backgrounds"
+    if backgrounds.is_dir():
+        for image in sorted(backgrounds.iterdir()):
+            if image.suffix.lower() in IMAGE_SUFFIXES:
+                return image
+    return None
+
+
+def pick_preview_member(names: Iterable[str], wallpaper: str | None = None) -> str | None:
+    """Same choice as find_preview_image, over the member names of a packed theme."""
+    names = set(names)
+    for candidate in ("preview.png", wallpaper):
+        if candidate and candidate in names:
+            return candidate
+    backgrounds = sorted(
+        name
+        for name in names
+        if name.startswith("backgrounds/")
+        and "/" not in name.removeprefix("backgrounds/")
+        and name.lower().endswith(IMAGE_SUFFIXES)
+    )
+    return backgrounds[0] if backgrounds else None
+
+
+def _decode(source: Path | bytes | memoryview, width: int, height: int) -> Thumbnail:
+    assert Image is not None
+    with Image.open(source if isinstance(source, Path) else io.BytesIO(source)) as img:
+        # Let JPEG decode at reduced scale instead of full resolution
+        img.draft("RGB", (width, height))
+        img = img.convert("RGB")
+        img.thumbnail((width, height))
+        return Thumbnail(img.width, img.height, img.tobytes())
+
+
+def prune(cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES, target: int | None = None) -> int:
+    """Evict least recently used thumbnails once the cache exceeds ``max_bytes``.
+
+    Entries are evicted until the cache fits in ``target`` (``max_bytes`` by
+    default).
+
+    Returns:
+        Number of files removed.
+    """
+    entries = []
+    total = 0
+    for path in cache_dir.glob("*/*.ppm"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total += stat.st_size
+    removed = 0
+    if total > max_bytes:
+        limit = max_bytes if target is None else target
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+    with _sizes_lock:
+        _cache_sizes[cache_dir] = total
+    return removed
+
+
+def _note_write(cache_dir: Path, size: int, max_bytes: int) -> None:
+    """Count a new cache entry, pruning on the first write and past ``max_bytes``."""
+    with _sizes_lock:
+        total = _cache_sizes.get(cache_dir)
+        if total is not None:
+            total += size
+            _cache_sizes[cache_dir] = total
+    if total is None or total > max_bytes:
+        prune(cache_dir, max_bytes, int(max_bytes * _PRUNE_TO))
+
+
+def get_thumbnail(
+    source: Path | bytes | memoryview,
+    width: int,
+    height: int,
+    cache_dir: Path | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    digest: str | None = None,
+) -> Thumbnail | None:
+    """Return a thumbnail fitting ``width`` x ``height`` pixels, decoding at most once.
+
+    ``source`` is an image file or, for packed themes, the image bytes along
+    with their ``digest`` (SHA-256 hex).
+
+    Returns None if the source can't be read, or it isn't cached and Pillow is
+    not installed.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    if digest is None:
+        if not isinstance(source, Path):
+            raise TypeError("digest is required for in-memory sources")
+        try:
+            digest = source_digest(source)
+        except OSError:
+            return None
+    cached = cache_dir / digest[:2] / f"{digest}-{width}x{height}.ppm"
+
+    try:
+        thumb = Thumbnail.from_ppm(cached.read_bytes())
+        os.utime(cached)  # Mark as recently used
+        return thumb
+    except (OSError, ValueError):
+        pass
+
+    if Image is None:
+        return None
+    try:
+        thumb = _decode(source, width, height)
+    except Exception:
+        # Pillow raises more than OSError for bad images (DecompressionBombError)
+        return None
+
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cached.with_name(f".{cached.name}.{os.getpid()}.{threading.get_ident()}")
+        data = thumb.to_ppm()
+        tmp_path.write_bytes(data)
+        tmp_path.replace(cached)
+        _note_write(cache_dir, len(data), max_bytes)
+    except OSError:
+        pass  # The cache is best-effort
+    return thumb
+
+
+def render_halfblocks(thumb: Thumbnail) -> Text:
+    """Render a thumbnail as rows of "▀" cells (two pixels per character cell)."""
+    text = Text()
+    for y in range(0, thumb.height, 2):
+        for x in range(thumb.width):
+            top = "#{:02x}{:02x}{:02x}".format(*thumb.pixel(x, y))
+            if y + 1 < thumb.height:
+                bottom = "#{:02x}{:02x}{:02x}".format(*thumb.pixel(x, y + 1))
+                text.append("▀", style=Style(color=top, bgcolor=bottom))
+            else:
+                text.append("▀", style=Style(color=top))
+        text.append("\n")
+    return text
@@ -0,0 +1,164 @@
+"""Run the config's ``update`` steps concurrently.
+
+Each step in the ``update.steps`` section is a shell command plus the
+resources it contends for::
+
+    update:
+      jobs: 4
+      locks: { network: 2 }
+      steps:
+        - { name: apt, requires: apt-get, locks: [dpkg, network], command: "..." }
+        - { name: ghostty, requires: zig, locks: [build], after: [apt], command: "..." }
+
+Steps holding the same lock don't run at the same time (``update.locks``
+lets a lock be held by more than one step, e.g. two network-heavy
+downloads); everything else runs concurrently. ``after`` orders a step
+behind others. A step whose ``requires`` binary isn't on PATH is skipped, as
+is anything ``--only``/``--skip`` leaves out; ``after`` entries naming
+skipped steps are dropped.
+
+Steps run through the installers' graph runner, so output, failure blocking
+and the timing waterfall work the same way as ``install --installers``.
+They can't prompt for a sudo password, so sudo is authenticated up front and
+kept fresh (``sudo_keepalive``) for as long as the steps run.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import shutil
+import subprocess
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from cosmikase.checks import search_path
+from cosmikase.installers import Installer
+
+DEFAULT_JOBS = 4
+# sudo's cached credentials expire after 15 minutes by default
+SUDO_REFRESH = 60.0
+
+
+@dataclass(frozen=True)
+class UpdateStep:
+    name: str
+    command: str
+    requires: str | None = None
+    locks: tuple[str, ...] = ()
+    after: tuple[str, ...] = ()
+    desc: str | None = None
+
+
+@dataclass
+class UpdatePlan:
+    nodes: dict[str, Installer]
+    skipped: dict[str, str] = field(default_factory=dict)  # name -> reason
+    capacity: dict[str, int] = field(default_factory=dict)
+    jobs: int = DEFAULT_JOBS
+
+
+def load_steps(config: dict[str, Any]) -> list[UpdateStep]:
+    """Steps from the config's ``update.steps`` section, in order.
+
+    Raises:
+        ValueError: If a step lacks a name or command, or a name repeats.
+    """
+    section = config.get("update") or {}
+    steps = []
+    seen = set()
+    for item in section.get("steps") or []:
+        name = item.get("name")
+        if not name or not item.get("command"):
+            raise ValueError(f"Update step needs a name and a command: {item}")
+        if name in seen:
+            raise ValueError(f"Duplicate update step: {name}")
+        seen.add(name)
+        steps.append(
+            UpdateStep(
+                name=name,
+                command=item["command"],
+                requires=item.get("requires"),
+                locks=tuple(item.get("locks") or ()),
+                after=tuple(item.get("after") or ()),
+                desc=item.get("desc"),
+            )
+        )
+    return steps
+
+
+def plan_update(
+    config: dict[str, Any],
+    only: Iterable[str] = (),
+    skip: Iterable[str] = (),
+    home: Path | None = None,
+) -> UpdatePlan:
+    """Graph nodes for the steps to run, and the reasons the others are skipped.
+
+    Raises:
+        ValueError: If the steps are invalid or ``only``/``skip``/``after``
+            name a step that doesn't exist.
+    """
+    steps = load_steps(config)
+    names = [step.name for step in steps]
+    only, skip = set(only), set(skip)
+    unknown = sorted((only | skip | {dep for step in steps for dep in step.after}) - set(names))
+    if unknown:
+        raise ValueError(f"Unknown update step(s): {', '.join(unknown)}")
+
+    path = search_path(home)
+    skipped: dict[str, str] = {}
+    for step in steps:
+        if (only and step.name not in only) or step.name in skip:
+            skipped[step.name] = "not selected"
+        elif step.requires and shutil.which(step.requires, path=path) is None:
+            skipped[step.name] = f"{step.requires} not found"
+
+    nodes = {
+        step.name: Installer(
+            name=step.name,
+            method="update",
+            command=step.command,
+            deps=tuple(dep for dep in step.after if dep not in skipped),
+            locks=step.locks,
+        )
+        for step in steps
+        if step.name not in skipped
+    }
+    section = config.get("update") or {}
+    return UpdatePlan(
+        nodes=nodes,
+        skipped=skipped,
+        capacity={lock: int(count) for lock, count in (section.get("locks") or {}).items()},
+        jobs=int(section.get("jobs") or DEFAULT_JOBS),
+    )
+
+
+@contextlib.contextmanager
+def sudo_keepalive(interval: float = SUDO_REFRESH) -> Iterator[None]:
+    """Refresh sudo's cached credentials every ``interval`` seconds until the block exits.
+
+    ``sudo -n -v`` never prompts: if the credentials are already gone, steps
+    needing sudo fail as they would have anyway.
+    """
+    stop = threading.Event()
+
+    def refresh() -> None:
+        while not stop.wait(interval):
+            subprocess.run(
+                ["sudo", "-n", "-v"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+
+    thread = threading.Thread(target=refresh, name="sudo-keepalive", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
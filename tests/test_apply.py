@@ -0,0 +1,143 @@
+"""Tests for cosmikase.apply module."""
+
+import threading
+import time
+
+import pytest
+
+from cosmikase.apply import (
+    ApplyCancelled,
+    ApplyError,
+    ApplyOptions,
+    apply_theme,
+    save_theme_history,
+)
+
+
+@pytest.fixture
+def fake_bin(tmp_path, monkeypatch):
+    """Put a fake chezmoi on PATH and stub out terminal reloads."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+
+    def make(name, body="exit 0"):
+        script = bin_dir / name
+        script.write_text(f'#!/bin/sh\necho "{name} $*" >> "{log}"\n{body}\n')
+        script.chmod(0o755)
+
+    make("chezmoi")
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.delenv("XDG_STATE_HOME", raising=False)
+
+    def reload_terminals():
+        with open(log, "a") as f:
+            f.write("reload_terminals\n")
+        return []
+
+    # Never signal the real terminals of whoever runs the tests
+    monkeypatch.setattr("cosmikase.apply.reload_terminals", reload_terminals)
+    return make, log
+
+
+def test_history_roundtrip(mock_home):
+    for theme in ["nord", "nord", "catppuccin"]:
+        save_theme_history(theme)
+    history = (mock_home / ".config" / "cosmikase" / "theme-history").read_text()
+    assert history.splitlines() == ["nord", "catppuccin"]
+
+
+def test_history_is_capped(mock_home):
+    for i in range(30):
+        save_theme_history(f"theme-{i}")
+    history = (mock_home / ".config" / "cosmikase" / "theme-history").read_text()
+    assert history.splitlines()[0] == "theme-10"
+
+
+def test_apply_theme_runs_all_stages(mock_home, tmp_themes_dir, fake_bin):
+    _, log = fake_bin
+    events = []
+
+    warnings = apply_theme("nord", tmp_themes_dir, on_progress=events.append)
+
+    assert warnings == []
+    assert [e.stage for e in events] == [
+        "history",
+        "chezmoi-data",
+        "chezmoi-apply",
+        "cursor",
+        "cosmic",
+        "terminals",
+    ]
+    assert str(events[0]) == "[1/6] Saving theme history..."
+    assert 'theme = "nord"' in (mock_home / ".config" / "chezmoi" / "chezmoi.toml").read_text()
+    calls = log.read_text().splitlines()
+    assert calls[0] == "chezmoi apply --force"
+    assert calls[-1] == "reload_terminals"
+
+
+def test_apply_theme_respects_options(mock_home, tmp_themes_dir, fake_bin):
+    _, log = fake_bin
+    events = []
+    options = ApplyOptions(chezmoi=False, cursor=False, cosmic=False)
+
+    apply_theme("nord", tmp_themes_dir, options, on_progress=events.append)
+
+    assert [e.stage for e in events] == ["history", "terminals"]
+    assert log.read_text().splitlines() == ["reload_terminals"]
+
+
+def test_apply_theme_sets_editor_theme(mock_home, tmp_themes_dir, fake_bin):
+    (tmp_themes_dir / "nord" / "cursor.json").write_text('{"colorTheme": "Nord"}')
+    (mock_home / ".config" / "Code").mkdir(parents=True)
+    options = ApplyOptions(chezmoi=False, cosmic=False, terminals=False)
+
+    assert apply_theme("nord", tmp_themes_dir, options) == []
+    settings = mock_home / ".config" / "Code" / "User" / "settings.json"
+    assert '"workbench.colorTheme": "Nord"' in settings.read_text()
+
+
+def test_apply_theme_sets_cosmic_theme(mock_home, tmp_themes_dir, fake_bin):
+    (tmp_themes_dir / "nord" / "cosmic.ron").write_text("(accent: (red: 0.5))\n")
+    cosmic = mock_home / ".config" / "cosmic"
+    cosmic.mkdir(parents=True)
+    options = ApplyOptions(chezmoi=False, cursor=False, terminals=False)
+
+    assert apply_theme("nord", tmp_themes_dir, options) == []
+    theme = cosmic / "com.system76.CosmicTheme.Dark" / "v1" / "theme"
+    assert theme.read_text() == "(accent: (red: 0.5))\n"
+
+
+def test_stage_failure_is_a_warning(mock_home, tmp_themes_dir, fake_bin):
+    (tmp_themes_dir / "nord" / "cosmic.ron").write_text("(accent: (red: 0.5)\n")
+    (mock_home / ".config" / "cosmic").mkdir(parents=True)
+
+    warnings = apply_theme("nord", tmp_themes_dir)
+    assert warnings == [
+        f"COSMIC theme failed: Invalid RON syntax in {tmp_themes_dir}/nord/cosmic.ron"
+    ]
+
+
+def test_chezmoi_failure_is_fatal(mock_home, tmp_themes_dir, fake_bin):
+    make, _ = fake_bin
+    make("chezmoi", "echo bad template >&2; exit 1")
+
+    with pytest.raises(ApplyError, match="bad template"):
+        apply_theme("nord", tmp_themes_dir)
+
+
+def test_missing_theme(mock_home, tmp_themes_dir):
+    with pytest.raises(ApplyError, match="not found"):
+        apply_theme("missing", tmp_themes_dir)
+
+
+def test_cancel_during_subprocess(mock_home, tmp_themes_dir, fake_bin):
+    make, _ = fake_bin
+    make("chezmoi", "sleep 10")
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    start = time.monotonic()
+    with pytest.raises(ApplyCancelled):
+        apply_theme("nord", tmp_themes_dir, cancelled=cancel.is_set)
+    assert time.monotonic() - start < 5
@@ -0,0 +1,87 @@
+"""Tests for cosmikase.blobstore module."""
+
+import os
+
+from cosmikase.blobstore import BlobStore, file_digest, iter_images
+from cosmikase.cli import main
+
+
+def _themes(tmp_path):
+    themes = tmp_path / "themes"
+    for theme in ("nord", "gruvbox"):
+        (themes / theme / "backgrounds").mkdir(parents=True)
+        (themes / theme / "backgrounds" / "shared.png").write_bytes(b"same-image" * 100)
+        (themes / theme / "theme.yaml").write_text("name: x\n")
+    (themes / "nord" / "preview.png").write_bytes(b"nord-preview")
+    return themes
+
+
+def test_iter_images_skips_non_images(tmp_path):
+    themes = _themes(tmp_path)
+    names = sorted(p.name for p in iter_images(themes))
+    assert names == ["preview.png", "shared.png", "shared.png"]
+
+
+def test_dedupe_links_identical_images(tmp_path):
+    themes = _themes(tmp_path)
+    store = BlobStore(tmp_path / "blobs")
+
+    stats = store.dedupe([themes])
+
+    assert stats.files == 3
+    assert stats.unique == 2
+    assert stats.bytes_saved == 1000
+    nord = themes / "nord" / "backgrounds" / "shared.png"
+    gruvbox = themes / "gruvbox" / "backgrounds" / "shared.png"
+    assert os.path.samefile(nord, gruvbox)
+    assert os.path.samefile(nord, store.path_for(file_digest(nord)))
+    assert nord.read_bytes() == b"same-image" * 100
+    # Linking a file into the store leaves it writable
+    assert nord.stat().st_mode & 0o200
+
+    # Running again is a no-op
+    again = store.dedupe([themes])
+    assert again.methods == {}
+    assert again.bytes_saved == 0
+
+
+def test_gc_removes_only_unreferenced_blobs(tmp_path):
+    themes = _themes(tmp_path)
+    store = BlobStore(tmp_path / "blobs")
+    store.dedupe([themes])
+    preview_digest = file_digest(themes / "nord" / "preview.png")
+
+    (themes / "nord" / "preview.png").unlink()
+    stats = store.gc(dry_run=True)
+    assert (stats.blobs, stats.removed) == (2, 1)
+    assert preview_digest in store
+
+    stats = store.gc()
+    assert stats.removed == 1
+    assert stats.bytes_freed == len(b"nord-preview")
+    assert preview_digest not in store
+    assert file_digest(themes / "nord" / "backgrounds" / "shared.png") in store
+
+
+def test_gc_keeps_blobs_referenced_by_copies(tmp_path):
+    themes = _themes(tmp_path)
+    store = BlobStore(tmp_path / "blobs")
+    digest = store.add(themes / "nord" / "preview.png")
+    # Simulate a copy/reflink: same content but a separate inode
+    copy = themes / "nord" / "preview.png"
+    copy.unlink()
+    copy.write_bytes(b"nord-preview")
+
+    assert store.gc([themes]).removed == 0
+    assert digest in store
+    assert store.gc([]).removed == 1
+
+
+def test_cli_dedupe_and_gc(tmp_path, capsys):
+    themes = _themes(tmp_path)
+    store = tmp_path / "blobs"
+
+    assert main(["themes", "dedupe", str(themes), "--store", str(store)]) == 0
+    assert "3 images, 2 unique blobs" in capsys.readouterr().out
+    assert main(["themes", "gc", str(themes), "--store", str(store), "--dry-run"]) == 0
+    assert "Would remove 0 of 2 blobs" in capsys.readouterr().out
@@ -0,0 +1,131 @@
+"""Tests for cosmikase.checks module."""
+
+import json
+import os
+import time
+
+import pytest
+import yaml
+
+from cosmikase.checks import CheckCache, evaluate_checks
+from cosmikase.cli import main
+
+
+@pytest.fixture
+def fake_tools(tmp_path, monkeypatch):
+    """Fake binaries: `fast` and `slow` print versions, `broken` fails, all log calls."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+    scripts = {
+        "fast": "echo fast 1.0",
+        "slow": "sleep 0.4; echo slow 2.0",
+        "hang": "sleep 5",
+        "broken": "echo oops; exit 2",
+        # Like go and zig: only `version` works
+        "go": '[ "$1" = version ] && echo go1.24.4 || exit 2',
+    }
+    for name, body in scripts.items():
+        script = bin_dir / name
+        script.write_text(f'#!/bin/sh\necho {name} >> "{log}"\n{body}\n')
+        script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    return log
+
+
+def items(*checks):
+    return [{"name": f"{check}-tool", "check": check} for check in checks]
+
+
+def test_evaluate_checks(tmp_path, fake_tools):
+    cache = CheckCache(tmp_path / "checks.json")
+    results = evaluate_checks(items("fast", "broken", "missing"), cache=cache, home=tmp_path)
+
+    fast, broken, missing = results
+    assert (fast.installed, fast.version) == (True, "fast 1.0")
+    assert fast.path == str(tmp_path / "bin" / "fast")
+    assert (broken.installed, broken.error) == (False, "exit status 2: oops")
+    assert (missing.installed, missing.path) == (False, None)
+
+
+def test_version_args(tmp_path, fake_tools):
+    cache = CheckCache(tmp_path / "checks.json")
+    go, custom = evaluate_checks(
+        [*items("go"), {"name": "custom", "check": "go", "version_args": ["version"]}],
+        cache=cache,
+        home=tmp_path,
+        refresh=True,
+    )
+    assert (go.installed, go.version) == (True, "go1.24.4")
+    assert (custom.installed, custom.version) == (True, "go1.24.4")
+
+
+def test_checks_run_concurrently_with_timeouts(tmp_path, fake_tools):
+    cache = CheckCache(tmp_path / "checks.json")
+
+    start = time.monotonic()
+    results = evaluate_checks(items("slow", "slow", "hang"), timeout=1, cache=cache, home=tmp_path)
+
+    assert time.monotonic() - start < 2
+    assert [r.installed for r in results] == [True, True, False]
+    assert results[2].error == "timed out after 1s"
+
+
+def test_results_are_cached_by_path_and_mtime(tmp_path, fake_tools):
+    cache_path = tmp_path / "checks.json"
+    evaluate_checks(items("fast", "hang"), timeout=0.2, cache=CheckCache(cache_path), home=tmp_path)
+
+    results = evaluate_checks(items("fast"), cache=CheckCache(cache_path), home=tmp_path)
+    assert results[0].cached and results[0].version == "fast 1.0"
+    assert fake_tools.read_text().splitlines().count("fast") == 1
+    # Timeouts are not cached
+    assert str(tmp_path / "bin" / "hang") not in json.loads(cache_path.read_text())
+
+    # A new binary (mtime change) or an expired TTL re-runs the check
+    binary = tmp_path / "bin" / "fast"
+    os.utime(binary, ns=(0, binary.stat().st_mtime_ns + 1_000_000_000))
+    evaluate_checks(items("fast"), cache=CheckCache(cache_path), home=tmp_path)
+    evaluate_checks(items("fast"), cache=CheckCache(cache_path, ttl=0), home=tmp_path)
+    assert fake_tools.read_text().splitlines().count("fast") == 3
+
+
+def test_nvm_is_checked_through_nvm_sh(tmp_path):
+    (tmp_path / ".nvm").mkdir()
+    (tmp_path / ".nvm" / "nvm.sh").write_text("nvm() { echo 0.40.3; }\n")
+    item = {"name": "nvm", "method": "custom_nvm", "check": "nvm"}
+
+    results = evaluate_checks([item], cache=CheckCache(tmp_path / "checks.json"), home=tmp_path)
+    assert (results[0].installed, results[0].version) == (True, "0.40.3")
+
+
+def test_cli_check(tmp_path, fake_tools, monkeypatch, capsys):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    config_file = tmp_path / "cosmikase.yaml"
+    config = {
+        "installers": {
+            "runtimes": [
+                {"name": "fast-tool", "method": "script", "check": "fast"},
+                {"name": "manual-tool", "method": "manual"},
+            ],
+            "ai_tools": [{"name": "broken-tool", "method": "npm", "check": "broken"}],
+        }
+    }
+    config_file.write_text(yaml.dump(config))
+
+    assert main(["check", "-c", str(config_file), "--json"]) == 0
+    results = json.loads(capsys.readouterr().out)
+    assert [(r["name"], r["installed"]) for r in results] == [
+        ("fast-tool", True),
+        ("broken-tool", False),
+    ]
+
+    assert main(["check", "-c", str(config_file)]) == 0
+    out = capsys.readouterr().out
+    assert "✓ fast-tool    fast 1.0 (cached)" in out
+    assert "1/2 installed" in out
+
+    host = tmp_path / "host.yaml"
+    host.write_text(yaml.dump({"extends": "missing.yaml"}))
+    assert main(["check", "-c", str(host)]) == 1
+    assert "missing.yaml" in capsys.readouterr().err
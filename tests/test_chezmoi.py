@@ -2,7 +2,9 @@
 
 from pathlib import Path
 
-from cosmikase.chezmoi import update_chezmoi_data
+import pytest
+
+from cosmikase.chezmoi import tomllib, update_chezmoi_data
 
 
 class TestUpdateChezmoiData:
@@ -137,3 +139,86 @@ font_family = "Custom Font"
         assert "font_size = 9" in content
         assert "padding = 14" in content
 
+    def test_preserves_comments_and_formatting(self, tmp_path, monkeypatch):
+        """Only the changed values are rewritten; everything else stays byte-identical."""
+        config_path = tmp_path / ".config" / "chezmoi" / "chezmoi.toml"
+        config_path.parent.mkdir(parents=True)
+        original = (
+            'sourceDir = "/src"  # repo checkout\n'
+            "\n"
+            "[data]\n"
+            '    theme = "nord"   # current theme\n'
+            "    themes_dir = '/themes'\n"
+            "    font_size = 11\n"
+            "\n"
+            "# Git settings\n"
+            "[git]\n"
+            "autoCommit = false\n"
+        )
+        config_path.write_text(original)
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+
+        assert update_chezmoi_data("tokyo-night", "/themes") is True
+
+        assert config_path.read_text() == (
+            'sourceDir = "/src"  # repo checkout\n'
+            "\n"
+            "[data]\n"
+            '    theme = "tokyo-night"   # current theme\n'
+            "    themes_dir = '/themes'\n"
+            "    font_size = 11\n"
+            '    font_family = "JetBrainsMono Nerd Font"\n'
+            "    padding = 14\n"
+            "\n"
+            "# Git settings\n"
+            "[git]\n"
+            "autoCommit = false\n"
+        )
+
+    def test_unchanged_config_is_not_written(self, tmp_path, monkeypatch):
+        """Switching to the current theme doesn't touch the file."""
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+        assert update_chezmoi_data("nord", "/themes") is True
+        config_path = tmp_path / ".config" / "chezmoi" / "chezmoi.toml"
+        mtime = config_path.stat().st_mtime_ns
+
+        monkeypatch.setattr("cosmikase.chezmoi._write_atomic", pytest.fail)
+        assert update_chezmoi_data("nord", "/themes") is True
+        assert config_path.stat().st_mtime_ns == mtime
+
+    def test_appends_missing_data_table(self, tmp_path, monkeypatch):
+        """A config without [data] gets the table appended."""
+        config_path = tmp_path / ".config" / "chezmoi" / "chezmoi.toml"
+        config_path.parent.mkdir(parents=True)
+        config_path.write_text('# my config\nsourceDir = "/src"\n')
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+
+        assert update_chezmoi_data("nord", "/themes") is True
+        content = config_path.read_text()
+        assert content.startswith('# my config\nsourceDir = "/src"\n\n[data]\ntheme = "nord"\n')
+
+    def test_escapes_values(self, tmp_path, monkeypatch):
+        """Values needing escapes are written as valid TOML strings."""
+        config_path = tmp_path / ".config" / "chezmoi" / "chezmoi.toml"
+        config_path.parent.mkdir(parents=True)
+        config_path.write_text('[data]\ntheme = "a \\" b"\n')
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+
+        assert update_chezmoi_data('we"ird', "C:\\themes") is True
+        with open(config_path, "rb") as f:
+            data = tomllib.load(f)["data"]
+        assert data["theme"] == 'we"ird'
+        assert data["themes_dir"] == "C:\\themes"
+
+    def test_falls_back_to_rewrite_for_inline_tables(self, tmp_path, monkeypatch):
+        """Layouts the splicer can't edit are rewritten in full."""
+        config_path = tmp_path / ".config" / "chezmoi" / "chezmoi.toml"
+        config_path.parent.mkdir(parents=True)
+        config_path.write_text('data = { theme = "old", custom = 1 }\n')
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+
+        assert update_chezmoi_data("nord", "/themes") is True
+        with open(config_path, "rb") as f:
+            data = tomllib.load(f)["data"]
+        assert data["theme"] == "nord"
+        assert data["custom"] == 1
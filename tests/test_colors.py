@@ -0,0 +1,197 @@
+"""Tests for cosmikase.colors module."""
+
+import json
+
+import pytest
+import yaml
+
+from cosmikase.cli import main
+from cosmikase.colors import Palette, extract_all, extract_palette, normalize_hex, write_palette
+
+KITTY_CONF = """\
+# sample
+foreground    #ECEFF4
+background    #2e3440
+cursor        #81A1C1
+color0        #242933
+color9        #bf616a
+"""
+
+ALACRITTY_TOML = """\
+[colors.primary]
+background = "0x2e3440"
+foreground = "#eceff4"
+
+[colors.selection]
+text = "CellForeground"
+background = "#434c5e"
+
+[colors.normal]
+black = "#3b4252"
+red = "#bf616a"
+"""
+
+COSMIC_RON = """\
+(
+    palette: Dark((
+        name: "Test",
+    )),
+    bg_color: Some((
+        red: 0.18039216,
+        green: 0.20392157,
+        blue: 0.25098039,
+        alpha: 1.0,
+    )),
+    success: Some((
+        red: 0.63921569,
+        green: 0.74509804,
+        blue: 0.54901961,
+        alpha: 1.0,
+    )),
+)
+"""
+
+
+def _make_theme(path):
+    path.mkdir()
+    (path / "cursor.json").write_text(
+        json.dumps({"colors": {"background": "#2E3440", "accent": "#88c0d0"}})
+    )
+    (path / "kitty.conf").write_text(KITTY_CONF)
+    (path / "alacritty.toml").write_text(ALACRITTY_TOML)
+    (path / "cosmic.ron").write_text(COSMIC_RON)
+    (path / "theme.yaml").write_text("name: Test\nvariant: dark\ncolors: {}\nwallpaper: bg.png\n")
+    return path
+
+
+def test_normalize_hex():
+    assert normalize_hex("#ABCDEF") == "#abcdef"
+    assert normalize_hex("0x112233") == "#112233"
+    assert normalize_hex("#abc") == "#aabbcc"
+    assert normalize_hex("#112233ff") == "#112233"
+    assert normalize_hex("#11223380") == "#11223380"
+    assert normalize_hex("CellForeground") is None
+    assert normalize_hex(None) is None
+    # Bare hex, as the manifests' YAML may hold it (never bare 3 digits)
+    assert normalize_hex("1E1E2E") == "#1e1e2e"
+    assert normalize_hex("1e1e2e80") == "#1e1e2e80"
+    assert normalize_hex("add") is None
+    assert normalize_hex(True) is None
+
+
+def test_normalize_hex_unquoted_yaml_digits():
+    colors = yaml.safe_load("a: 000000\nb: 112233\nc: 001234\nd: 0a0b0c\n")
+    assert isinstance(colors["a"], int)
+    assert dict(Palette(colors)) == {
+        "a": "#000000",
+        "b": "#112233",
+        "c": "#001234",
+        "d": "#0a0b0c",
+    }
+    assert normalize_hex(12345678) is None
+
+
+def test_extract_palette_reconciles_sources(tmp_path):
+    theme = _make_theme(tmp_path / "test")
+    colors = extract_palette(theme)
+
+    # cursor.json wins for UI colors
+    assert colors["background"] == "#2e3440"
+    assert colors["accent"] == "#88c0d0"
+    # cosmic.ron fills in what cursor.json lacks
+    assert colors["success"] == "#a3be8c"
+    # alacritty wins over kitty for ANSI colors, kitty fills the gaps
+    assert colors["black"] == "#3b4252"
+    assert colors["bright_red"] == "#bf616a"
+    assert colors["foreground"] == "#eceff4"
+    assert colors["cursor"] == "#81a1c1"
+    assert colors["selection"] == "#434c5e"
+    assert colors["terminal"] == colors["background"]
+    # Canonical ordering
+    assert list(colors)[:3] == ["background", "foreground", "accent"]
+
+
+def test_extract_palette_skips_malformed_sources(tmp_path):
+    theme = tmp_path / "broken"
+    theme.mkdir()
+    (theme / "cursor.json").write_text("{not json")
+    (theme / "kitty.conf").write_text(KITTY_CONF)
+
+    colors = extract_palette(theme)
+    assert colors["background"] == "#2e3440"
+
+
+def test_write_palette_preserves_keys_and_is_incremental(tmp_path):
+    theme = _make_theme(tmp_path / "test")
+    colors = extract_palette(theme)
+
+    assert write_palette(theme, colors) is True
+    data = yaml.safe_load((theme / "theme.yaml").read_text())
+    assert data["colors"] == colors
+    assert data["wallpaper"] == "bg.png"
+    assert list(data) == ["name", "variant", "colors", "wallpaper"]
+
+    mtime = (theme / "theme.yaml").stat().st_mtime_ns
+    assert write_palette(theme, colors) is False
+    assert (theme / "theme.yaml").stat().st_mtime_ns == mtime
+
+
+def test_write_palette_dry_run(tmp_path):
+    theme = _make_theme(tmp_path / "test")
+    original = (theme / "theme.yaml").read_text()
+
+    assert write_palette(theme, {"background": "#000000"}, dry_run=True) is True
+    assert (theme / "theme.yaml").read_text() == original
+
+
+def test_extract_all(tmp_path):
+    paths = [_make_theme(tmp_path / name) for name in ("a", "b", "c")]
+    empty = tmp_path / "empty"
+    empty.mkdir()
+
+    results = extract_all([*paths, empty], jobs=2)
+    assert [r.theme for r in results] == ["a", "b", "c", "empty"]
+    assert all(r.changed for r in results[:3])
+    assert results[3].error == "no color sources found"
+
+
+def test_cli_extract_colors(tmp_path, capsys):
+    themes_dir = tmp_path / "themes"
+    themes_dir.mkdir()
+    _make_theme(themes_dir / "nord")
+
+    assert main(["themes", "extract-colors", "--dir", str(themes_dir)]) == 0
+    assert "1 changed" in capsys.readouterr().out
+    assert main(["themes", "extract-colors", "--dir", str(themes_dir), "nord"]) == 0
+    assert "0 changed, 1 unchanged" in capsys.readouterr().out
+    assert main(["themes", "extract-colors", "--dir", str(themes_dir), "missing"]) == 1
+
+
+def test_palette_views():
+    palette = Palette({"background": "#2E3440", "accent": "#abc", "overlay": "0x00000080"})
+    assert palette["background"] == "#2e3440"
+    assert palette["accent"] == "#aabbcc"
+    assert palette["overlay"] == "#00000080"
+    assert list(palette) == ["background", "accent", "overlay"]
+    assert dict(palette.items())["accent"] == "#aabbcc"
+    assert palette.rgba("background") == (0x2E, 0x34, 0x40, 255)
+    assert palette.floats("overlay") == (0.0, 0.0, 0.0, 128 / 255)
+    with pytest.raises(KeyError):
+        palette["missing"]
+
+
+def test_palette_equality_and_hashing():
+    first = Palette({"background": "#000000", "foreground": "#FFFFFF"})
+    second = Palette({"background": "#000", "foreground": "#ffffff"})
+    assert first == second
+    assert hash(first) == hash(second)
+    assert first == {"background": "#000000", "foreground": "#ffffff"}
+    assert first != Palette({"foreground": "#ffffff", "background": "#000000"})
+    assert len({first, second}) == 1
+    # Palettes with the same names share one index table
+    assert first._index is second._index
+
+
+def test_palette_rejects_invalid_colors():
+    with pytest.raises(ValueError, match="background"):
+        Palette({"background": "not-a-color"})
@@ -2,7 +2,21 @@
 import pytest
 import yaml
 
-from cosmikase.config import enabled_items, enabled_top_level, get_value, load_config, package_names
+from cosmikase import config as config_module
+from cosmikase.cli import main
+from cosmikase.config import (
+    LayerError,
+    config_layers,
+    deep_merge,
+    enabled_items,
+    enabled_top_level,
+    get_value,
+    item_key,
+    load_config,
+    merge_chain,
+    package_names,
+    provenance,
+)
 
 
 @pytest.fixture
@@ -65,3 +79,142 @@ def test_package_names(sample_config_dict):
     names = package_names(sample_config_dict, "apt", "core")
     assert names == ["fzf", "zoxide"]
 
+def test_deep_merge(sample_config_dict):
+    overlay = {
+        "defaults": {"theme": "gruvbox"},
+        "apt": {"core": [{"name": "fzf", "install": False}, {"name": "htop"}]},
+        "uv_tools": [{"name": "mypy", "install": True}],
+        "themes": {"available": ["nord"]},
+    }
+    merged = deep_merge(sample_config_dict, overlay)
+
+    assert merged["defaults"] == {"theme": "gruvbox", "install": True, "ghostty": True}
+    names = [i["name"] for i in merged["apt"]["core"]]
+    assert names == ["fzf", "steam-installer", "zoxide", "htop"]
+    assert merged["apt"]["core"][0] == {"name": "fzf", "install": False}
+    assert [i["name"] for i in enabled_top_level(merged, "uv_tools")] == ["ruff", "mypy", "ty"]
+    # The inputs are left untouched
+    assert sample_config_dict["defaults"]["theme"] == "nord"
+    assert sample_config_dict["apt"]["core"][0]["install"] is True
+    # Lists without names are replaced
+    assert deep_merge({"a": [1, 2]}, {"a": [3]}) == {"a": [3]}
+
+
+def test_deep_merge_replaces_scalar_and_empty_lists():
+    base = {"available": ["nord", "gruvbox"], "core": [{"name": "git"}, {"name": "htop"}]}
+
+    assert deep_merge(base, {"available": ["nord"]})["available"] == ["nord"]
+    assert deep_merge(base, {"core": []})["core"] == []
+    assert deep_merge(base, {"core": [{"name": "fd"}]})["core"] == [
+        {"name": "git"}, {"name": "htop"}, {"name": "fd"}
+    ]
+
+
+@pytest.fixture
+def layers(tmp_path):
+    base = {"defaults": {"theme": "nord"}, "apt": {"core": [{"name": "git"}, {"name": "htop"}]}}
+    role = {"apt": {"core": [{"name": "ripgrep"}]}, "npm": ["@openai/codex"]}
+    host = {
+        "extends": "roles/dev.yaml",
+        "defaults": {"theme": "gruvbox"},
+        "apt": {"core": [{"name": "htop", "install": False}]},
+    }
+    (tmp_path / "roles").mkdir()
+    (tmp_path / "base.yaml").write_text(yaml.dump(base))
+    (tmp_path / "roles" / "dev.yaml").write_text(yaml.dump({"extends": "../base.yaml", **role}))
+    (tmp_path / "host.yaml").write_text(yaml.dump(host))
+    return tmp_path
+
+
+def test_load_layered_config(layers):
+    config = load_config(layers / "host.yaml")
+
+    assert "extends" not in config
+    assert get_value(config, "defaults.theme") == "gruvbox"
+    assert package_names(config, "apt", "core") == ["git", "ripgrep"]
+    assert enabled_top_level(config, "npm") == [{"name": "@openai/codex"}]
+    # An explicit list of layers gives the same view
+    chain = [layers / "base.yaml", layers / "roles" / "dev.yaml", layers / "host.yaml"]
+    assert load_config(chain) == config
+
+
+def test_layers_are_merged_once(layers, monkeypatch):
+    merged = {}
+    monkeypatch.setattr(config_module, "_MERGED", merged)
+
+    load_config(layers / "roles" / "dev.yaml")
+    config = load_config(layers / "host.yaml")
+    # base and base+dev are shared; only the host layer is merged again
+    assert len(merged) == 3
+    # Callers get their own copy of the memoized result
+    config["defaults"]["theme"] = "changed"
+    assert get_value(load_config(layers / "host.yaml"), "defaults.theme") == "gruvbox"
+
+
+def test_provenance(layers):
+    index = provenance(layers / "host.yaml")
+    base, role, host = layers / "base.yaml", layers / "roles" / "dev.yaml", layers / "host.yaml"
+
+    assert index["defaults.theme"] == [base, host]
+    assert index["apt.core[git]"] == [base]
+    assert index["apt.core[htop]"] == [base, host]
+    assert index["apt.core[ripgrep]"] == [role]
+    assert index["npm[@openai/codex]"] == [role]
+
+
+def _entries(value, prefix=""):
+    """Provenance keys of a merged config."""
+    if isinstance(value, dict) and value:
+        return {e for k, v in value.items() for e in _entries(v, f"{prefix}.{k}" if prefix else k)}
+    keys = [item_key(item) for item in value] if isinstance(value, list) else []
+    return {f"{prefix}[{key}]" for key in keys} if keys and all(keys) else {prefix}
+
+
+def test_provenance_follows_replaced_lists(tmp_path):
+    base = tmp_path / "base.yaml"
+    base.write_text(yaml.dump({
+        "themes": {"available": ["a", "b", "c"]},
+        "apt": {"core": ["htop", "ripgrep"], "gui": [{"name": "code"}]},
+        "defaults": {"theme": "nord"},
+    }))
+    host = tmp_path / "host.yaml"
+    host.write_text(yaml.dump({
+        "extends": "base.yaml",
+        "themes": {"available": ["a"]},
+        "apt": {"core": [], "gui": [{"name": "code", "install": False}, {"name": "gimp"}]},
+        "defaults": "minimal",
+    }))
+
+    index = provenance(host)
+    _, merged = merge_chain(config_layers(host))
+    assert set(index) == _entries(merged)
+    assert index["themes.available[a]"] == [base, host]
+    assert index["apt.core"] == [host]
+    assert index["apt.gui[code]"] == [base, host]
+    assert index["apt.gui[gimp]"] == [host]
+    assert index["defaults"] == [host]
+
+
+def test_layer_errors(tmp_path):
+    (tmp_path / "loop.yaml").write_text("extends: loop.yaml\n")
+    (tmp_path / "list.yaml").write_text("- not a mapping\n")
+    with pytest.raises(LayerError, match="extends itself"):
+        load_config(tmp_path / "loop.yaml")
+    with pytest.raises(LayerError, match="expected a mapping"):
+        load_config(tmp_path / "list.yaml")
+
+
+def test_cli_layered_config(layers, capsys):
+    host = str(layers / "host.yaml")
+    assert main(["config", "defaults.theme", "-c", host]) == 0
+    assert capsys.readouterr().out.strip() == "gruvbox"
+
+    assert main(["config", "apt.core", "-c", host, "--origin"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == f"apt.core[git]: {layers / 'base.yaml'}"
+    assert f"apt.core[htop]: {layers / 'base.yaml'} -> {host}" in out
+
+    assert main(["validate", str(layers / "base.yaml"), host, "-q"]) == 0
+    (layers / "bad.yaml").write_text("extends: host.yaml\ndefaults: {install: maybe}\n")
+    assert main(["validate", str(layers / "bad.yaml")]) == 1
+    assert "install" in capsys.readouterr().err
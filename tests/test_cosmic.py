@@ -0,0 +1,149 @@
+"""Tests for cosmikase.cosmic module."""
+
+import os
+
+import pytest
+
+from cosmikase.cli import main
+from cosmikase.cosmic import BACKGROUND, MODE, TERM, THEME_DARK, CosmicConfig, apply_cosmic_theme
+
+
+@pytest.fixture
+def cosmic_dir(mock_home, monkeypatch):
+    monkeypatch.delenv("XDG_STATE_HOME", raising=False)
+    path = mock_home / ".config" / "cosmic"
+    path.mkdir(parents=True)
+    return path
+
+
+@pytest.fixture
+def nord(tmp_themes_dir):
+    theme = tmp_themes_dir / "nord"
+    (theme / "cosmic.ron").write_text('(name: "Nord")\n')
+    (theme / "cosmic-term.ron").write_text('(name: "Nord", foreground: "#eceff4")\n')
+    (theme / "backgrounds" / "2-nord.png").write_bytes(b"png")
+    (theme / "backgrounds" / "1-nord.png").write_bytes(b"png")
+    return theme
+
+
+def test_commit_writes_only_changed_keys(cosmic_dir):
+    config = CosmicConfig()
+    config.set(MODE, "is_dark", "true\n")
+    config.set(TERM, "color_scheme", "()\n")
+    result = config.commit()
+    assert result.written == [
+        "com.system76.CosmicTheme.Mode/v1/is_dark",
+        "com.system76.CosmicTerm/v1/color_scheme",
+    ]
+    mtime = (cosmic_dir / result.written[0]).stat().st_mtime_ns
+
+    config.set(MODE, "is_dark", "true\n")
+    config.set(TERM, "color_scheme", "(x)\n")
+    result = config.commit()
+    assert result.written == ["com.system76.CosmicTerm/v1/color_scheme"]
+    assert result.unchanged == ["com.system76.CosmicTheme.Mode/v1/is_dark"]
+    assert (cosmic_dir / result.unchanged[0]).stat().st_mtime_ns == mtime
+    assert not list(cosmic_dir.rglob("*.cosmikase-tmp"))
+
+
+def test_rollback_restores_previous_state(cosmic_dir):
+    config = CosmicConfig()
+    config.set(MODE, "is_dark", "true\n")
+    config.set(BACKGROUND, "source", "old\n")
+    config.commit()
+
+    config.set(MODE, "is_dark", "false\n")
+    config.set(TERM, "color_scheme", "()\n")
+    config.remove(BACKGROUND, "source")
+    config.commit()
+    assert config.get(BACKGROUND, "source") is None
+
+    result = config.rollback()
+    assert config.get(MODE, "is_dark") == "true\n"
+    assert config.get(BACKGROUND, "source") == "old\n"
+    assert config.get(TERM, "color_scheme") is None
+    assert sorted(result.removed) == ["com.system76.CosmicTerm/v1/color_scheme"]
+
+    # Rolling back the rollback redoes the change
+    config.rollback()
+    assert config.get(MODE, "is_dark") == "false\n"
+
+
+def test_failed_staging_leaves_config_untouched(cosmic_dir, monkeypatch):
+    config = CosmicConfig()
+    config.set(MODE, "is_dark", "true\n")
+    config.commit()
+
+    config.set(MODE, "is_dark", "false\n")
+    config.set(TERM, "color_scheme", "()\n")
+    real_fsync = os.fsync
+    calls = []
+
+    def fsync(fd):
+        calls.append(fd)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        real_fsync(fd)
+
+    monkeypatch.setattr("cosmikase.cosmic.os.fsync", fsync)
+    with pytest.raises(OSError, match="disk full"):
+        config.commit()
+    assert config.get(MODE, "is_dark") == "true\n"
+    assert config.get(TERM, "color_scheme") is None
+    assert not list(cosmic_dir.rglob("*.cosmikase-tmp"))
+
+
+def test_rollback_rejects_other_root(cosmic_dir, tmp_path):
+    config = CosmicConfig()
+    config.set(MODE, "is_dark", "true\n")
+    config.commit()
+
+    with pytest.raises(ValueError, match="is for"):
+        CosmicConfig(root=tmp_path / "other").rollback()
+
+
+def test_apply_cosmic_theme(cosmic_dir, nord):
+    result = apply_cosmic_theme(nord)
+
+    assert (cosmic_dir / MODE / "v1" / "is_dark").read_text() == "true\n"
+    assert (cosmic_dir / THEME_DARK / "v1" / "theme").read_text() == '(name: "Nord")\n'
+    assert "Nord" in (cosmic_dir / TERM / "v1" / "color_scheme").read_text()
+    background = (cosmic_dir / BACKGROUND / "v1" / "all").read_text()
+    assert f'source: Path("{(nord / "backgrounds" / "1-nord.png").resolve()}")' in background
+    assert len(result.written) == 4
+
+    assert not apply_cosmic_theme(nord).changed
+
+
+def test_apply_light_theme_without_wallpaper(cosmic_dir, nord):
+    (nord / "light.mode").touch()
+
+    apply_cosmic_theme(nord, wallpaper=False, terminal=False)
+
+    assert (cosmic_dir / MODE / "v1" / "is_dark").read_text() == "false\n"
+    assert (cosmic_dir / "com.system76.CosmicTheme.Light" / "v1" / "theme").exists()
+    assert not (cosmic_dir / BACKGROUND).exists()
+    assert not (cosmic_dir / TERM).exists()
+
+
+def test_apply_rejects_invalid_ron(cosmic_dir, nord):
+    (nord / "cosmic-term.ron").write_text("(unbalanced\n")
+    with pytest.raises(ValueError, match="Invalid RON"):
+        apply_cosmic_theme(nord)
+    assert not (cosmic_dir / MODE).exists()
+
+
+def test_apply_without_cosmic(mock_home, nord):
+    assert apply_cosmic_theme(nord) is None
+
+
+def test_cli_cosmic_apply_and_rollback(cosmic_dir, nord, tmp_themes_dir, capsys):
+    argv = ["cosmic", "apply", "nord", "--dir", str(tmp_themes_dir)]
+    assert main(argv) == 0
+    assert "COSMIC theme 'nord' applied (4 keys changed)" in capsys.readouterr().out
+    assert main(argv) == 0
+    assert "COSMIC already uses theme 'nord'" in capsys.readouterr().out
+
+    assert main(["cosmic", "rollback"]) == 0
+    assert "Restored 4 COSMIC config keys" in capsys.readouterr().out
+    assert not (cosmic_dir / MODE / "v1" / "is_dark").exists()
@@ -0,0 +1,203 @@
+"""Tests for cosmikase.downloads module."""
+
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from cosmikase.cli import main
+from cosmikase.downloads import DownloadCache, DownloadError
+
+BODY = b"0123456789" * 100
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves ``server.files`` with ETags and ranges; ``server.truncate`` cuts bodies short."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body = server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.sha256(body).hexdigest()[:8]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") in (None, etag):
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            status = 206
+        payload = body[start:]
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        if server.truncate:
+            payload = payload[: server.truncate]
+            server.truncate = None
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.files = {"/tool.tar.gz": BODY}
+    httpd.requests = []
+    httpd.truncate = None
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("COSMIKASE_DOWNLOAD_MIRROR", raising=False)
+    return DownloadCache(tmp_path / "downloads")
+
+
+def test_download_then_revalidate(server, cache):
+    url = f"{server.url}/tool.tar.gz"
+    first = cache.fetch(url)
+    assert first.status == "downloaded"
+    assert first.path.read_bytes() == BODY
+    assert first.digest == hashlib.sha256(BODY).hexdigest()
+
+    second = cache.fetch(url)
+    assert second.status == "revalidated"
+    assert second.path == first.path
+    assert server.requests[-1]["If-None-Match"]
+
+    # A known digest needs no request at all
+    count = len(server.requests)
+    assert cache.fetch(url, sha256=first.digest).status == "cached"
+    assert len(server.requests) == count
+
+
+def test_content_change_is_downloaded(server, cache):
+    url = f"{server.url}/tool.tar.gz"
+    cache.fetch(url)
+    server.files["/tool.tar.gz"] = b"new release"
+
+    result = cache.fetch(url)
+    assert result.status == "downloaded"
+    assert result.path.read_bytes() == b"new release"
+
+
+def test_interrupted_download_resumes(server, cache):
+    url = f"{server.url}/tool.tar.gz"
+    server.truncate = 300
+    with pytest.raises(DownloadError):
+        cache.fetch(url)
+
+    result = cache.fetch(url)
+    assert result.status == "resumed"
+    assert result.path.read_bytes() == BODY
+    assert server.requests[-1]["Range"] == "bytes=300-"
+
+
+def test_unreachable_server_uses_stale_copy(server, cache):
+    url = f"{server.url}/tool.tar.gz"
+    cache.fetch(url)
+    server.shutdown()
+    server.server_close()
+
+    assert cache.fetch(url).status == "stale"
+    with pytest.raises(DownloadError, match="Could not download"):
+        cache.fetch(f"{server.url}/other.deb")
+
+
+def test_checksum_mismatch(server, cache):
+    with pytest.raises(DownloadError, match="expected sha256"):
+        cache.fetch(f"{server.url}/tool.tar.gz", sha256="0" * 64)
+
+
+def test_mirror_is_used_before_network(server, cache, tmp_path):
+    url = f"{server.url}/tool.tar.gz"
+    digest = cache.fetch(url).digest
+    count = len(server.requests)
+
+    # With a pinned digest (or offline) the mirror is trusted without asking
+    lab = DownloadCache(tmp_path / "other", mirror=cache.root)
+    for result in (lab.fetch(url, sha256=digest), lab.fetch(url, offline=True)):
+        assert result.status == "mirror"
+        assert result.path.read_bytes() == BODY
+    assert len(server.requests) == count
+
+    # Otherwise it is revalidated with the mirror's validators
+    result = lab.fetch(url)
+    assert result.status == "mirror"
+    assert "If-None-Match" in server.requests[-1]
+    assert not (tmp_path / "other").exists()
+
+
+def test_mirror_of_changed_url_is_downloaded_again(server, cache, tmp_path):
+    url = f"{server.url}/tool.tar.gz"
+    cache.fetch(url)
+    server.files["/tool.tar.gz"] = b"new release"
+
+    lab = DownloadCache(tmp_path / "other", mirror=cache.root)
+    result = lab.fetch(url)
+    assert result.status == "downloaded"
+    assert result.path.read_bytes() == b"new release"
+    assert result.path.is_relative_to(tmp_path / "other")
+
+    # When the server fails, the mirrored copy is used anyway
+    server.files.clear()
+    other = DownloadCache(tmp_path / "third", mirror=cache.root)
+    assert other.fetch(url).status == "stale"
+
+
+def test_prune_evicts_least_recently_used(server, cache):
+    server.files["/a"] = b"a" * 100
+    server.files["/b"] = b"b" * 100
+    a = cache.fetch(f"{server.url}/a")
+    b = cache.fetch(f"{server.url}/b")
+    os.utime(a.path, ns=(0, 0))
+
+    assert cache.prune(max_bytes=150) == 1
+    assert not a.path.exists() and b.path.exists()
+    assert cache.fetch(f"{server.url}/a").status == "downloaded"
+
+
+def test_fetch_all(server, cache):
+    server.files["/a"] = b"a"
+    urls = [f"{server.url}/a", f"{server.url}/tool.tar.gz", f"{server.url}/a", f"{server.url}/x"]
+
+    results = cache.fetch_all(urls, jobs=2)
+    assert [getattr(r, "status", None) for r in results] == [
+        "downloaded",
+        "downloaded",
+        "downloaded",
+        None,
+    ]
+    assert isinstance(results[3], DownloadError)
+    assert len(server.requests) == 3
+
+
+def test_cli_download(server, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv("COSMIKASE_DOWNLOAD_MIRROR", raising=False)
+
+    assert main(["download", f"{server.url}/tool.tar.gz"]) == 0
+    path = Path(capsys.readouterr().out.strip())
+    assert path.read_bytes() == BODY
+
+    assert main(["download", f"{server.url}/missing", "--offline"]) == 1
+    assert "is not cached" in capsys.readouterr().err
@@ -0,0 +1,207 @@
+"""Tests for cosmikase.editors module."""
+
+import json
+
+import pytest
+
+from cosmikase.cli import main
+from cosmikase.editors import (
+    EDITORS,
+    ExtensionCache,
+    apply_editor_theme,
+    install_extensions,
+    parse_extensions_file,
+    read_cursor_theme,
+    set_jsonc_value,
+    update_settings,
+)
+
+CODE = EDITORS[1]
+
+
+@pytest.fixture
+def fake_code(tmp_path, monkeypatch):
+    """Fake `code` CLI that logs calls and lists one extension."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+    script = bin_dir / "code"
+    script.write_text(
+        f'#!/bin/sh\necho "code $*" >> "{log}"\n'
+        '[ "$1" = --list-extensions ] && echo Arcticicestudio.Nord-Visual-Studio-Code\n'
+        "exit 0\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    return log
+
+
+class TestSetJsoncValue:
+    def test_replaces_value_keeping_comments(self):
+        text = (
+            "{\n"
+            "    // Theme\n"
+            '    "workbench.colorTheme": "Dracula", /* old */\n'
+            '    "editor.fontSize": 14,\n'
+            "}\n"
+        )
+        result = set_jsonc_value(text, "workbench.colorTheme", "Nord")
+        assert result == text.replace('"Dracula"', '"Nord"')
+
+    def test_unchanged_value_returns_none(self):
+        text = '{"workbench.colorTheme": "Nord"}'
+        assert set_jsonc_value(text, "workbench.colorTheme", "Nord") is None
+
+    def test_ignores_nested_keys(self):
+        text = '{"other": {"workbench.colorTheme": "Nord"}, "a": [1, {"b": 2}]}'
+        result = set_jsonc_value(text, "workbench.colorTheme", "Nord")
+        assert json.loads(result)["workbench.colorTheme"] == "Nord"
+        assert json.loads(result)["other"] == {"workbench.colorTheme": "Nord"}
+
+    def test_replaces_nested_value(self):
+        text = '{"k": {"x": [1, 2]}, "y": 1}'
+        assert json.loads(set_jsonc_value(text, "k", "v")) == {"k": "v", "y": 1}
+
+    @pytest.mark.parametrize("text", ["", "{}", "{\n}\n", '{"a": 1}'])
+    def test_inserts_missing_key(self, text):
+        result = set_jsonc_value(text, "workbench.colorTheme", "Nord")
+        assert json.loads(result)["workbench.colorTheme"] == "Nord"
+
+    def test_rejects_non_object(self):
+        with pytest.raises(ValueError):
+            set_jsonc_value("[1, 2]", "k", "v")
+
+
+def test_update_settings_skips_unchanged(tmp_path):
+    path = tmp_path / "User" / "settings.json"
+    assert update_settings(path, "workbench.colorTheme", "Nord") is True
+    mtime = path.stat().st_mtime_ns
+    assert update_settings(path, "workbench.colorTheme", "Nord") is False
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_read_cursor_theme(tmp_themes_dir):
+    nord = tmp_themes_dir / "nord"
+    assert read_cursor_theme(nord) is None
+
+    (nord / "cursor.json").write_text('{"colorTheme": "Nord", "extension": "ext.nord"}')
+    assert read_cursor_theme(nord) == ("Nord", "ext.nord")
+
+    (nord / "cursor.json").write_text('{"extension": "ext.nord"}')
+    with pytest.raises(ValueError, match="No colorTheme"):
+        read_cursor_theme(nord)
+
+
+def test_extension_list_is_cached_by_mtime(tmp_path, mock_home, fake_code):
+    (mock_home / ".vscode" / "extensions").mkdir(parents=True)
+    cache = ExtensionCache(tmp_path / "cache.json", home=mock_home)
+
+    expected = {"arcticicestudio.nord-visual-studio-code"}
+    assert cache.installed(CODE, "code") == expected
+    assert cache.installed(CODE, "code") == expected
+    assert fake_code.read_text().count("--list-extensions") == 1
+
+    # The cache survives reloads, and is invalidated when the directory changes
+    cache.save()
+    cache = ExtensionCache(tmp_path / "cache.json", home=mock_home)
+    assert cache.installed(CODE, "code") == expected
+    (mock_home / ".vscode" / "extensions" / "new.ext").mkdir()
+    cache.installed(CODE, "code")
+    assert fake_code.read_text().count("--list-extensions") == 2
+
+
+def test_apply_editor_theme(tmp_path, mock_home, fake_code):
+    (mock_home / ".config" / "Code").mkdir(parents=True)
+    cache = ExtensionCache(tmp_path / "cache.json", home=mock_home)
+
+    results = apply_editor_theme("Nord", "ext.missing", home=mock_home, cache=cache)
+
+    assert [r.editor for r in results] == ["VS Code"]
+    assert results[0].settings_changed and results[0].extension_installed
+    assert "code --install-extension ext.missing --force" in fake_code.read_text()
+    settings = json.loads(CODE.settings_path(mock_home).read_text())
+    assert settings == {"workbench.colorTheme": "Nord"}
+
+
+def test_apply_editor_theme_reports_bad_settings(mock_home):
+    (mock_home / ".config" / "Code" / "User").mkdir(parents=True)
+    CODE.settings_path(mock_home).write_text("[]")
+
+    results = apply_editor_theme("Nord", home=mock_home)
+    assert results[0].warning.startswith("Could not update VS Code settings")
+
+
+def test_cli_editor_apply(tmp_themes_dir, mock_home, fake_code, capsys):
+    (mock_home / ".config" / "Code").mkdir(parents=True)
+    (tmp_themes_dir / "nord" / "cursor.json").write_text('{"colorTheme": "Nord"}')
+
+    assert main(["editor", "apply", "nord", "--dir", str(tmp_themes_dir)]) == 0
+    out = capsys.readouterr().out
+    assert "VS Code settings updated" in out
+    assert "Editor theme 'Nord' applied to: VS Code" in out
+
+    assert main(["editor", "apply", "catppuccin", "--dir", str(tmp_themes_dir)]) == 0
+    assert "No cursor.json found" in capsys.readouterr().out
+
+
+@pytest.fixture
+def fake_editors(tmp_path, monkeypatch):
+    """Fake cursor/code CLIs: bad.ext always fails, slow.ext hangs."""
+    bin_dir = tmp_path / "editors-bin"
+    bin_dir.mkdir()
+    log = tmp_path / "editors.log"
+    for name in ("cursor", "code"):
+        script = bin_dir / name
+        script.write_text(
+            f'#!/bin/sh\necho "{name} $*" >> "{log}"\n'
+            'case "$2" in bad.ext) exit 1 ;; slow.ext) sleep 5 ;; esac\n'
+            '[ "$1" = --list-extensions ] && echo present.ext\n'
+            "exit 0\n"
+        )
+        script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    return log
+
+
+def test_parse_extensions_file(tmp_path):
+    path = tmp_path / "extensions.txt"
+    path.write_text("# Header\n\nfoo.bar\n  baz.qux  # inline\nFoo.Bar\n")
+    assert parse_extensions_file(path) == ["foo.bar", "baz.qux"]
+
+
+def test_install_extensions_only_missing(tmp_path, mock_home, fake_editors):
+    cache = ExtensionCache(tmp_path / "cache.json", home=mock_home)
+
+    reports = install_extensions(
+        ["present.ext", "new.ext", "bad.ext"], EDITORS[:2], retries=1, backoff=0, cache=cache
+    )
+
+    assert [r.editor for r in reports] == ["Cursor", "VS Code"]
+    for report in reports:
+        assert (report.present, report.installed, report.failed) == (1, ["new.ext"], ["bad.ext"])
+    calls = fake_editors.read_text().splitlines()
+    assert "cursor --install-extension present.ext --force" not in calls
+    assert calls.count("code --install-extension bad.ext --force") == 2
+
+
+def test_install_extensions_timeout(tmp_path, mock_home, fake_editors):
+    cache = ExtensionCache(tmp_path / "cache.json", home=mock_home)
+
+    reports = install_extensions(["slow.ext"], EDITORS[:1], timeout=0.2, retries=0, cache=cache)
+    assert reports[0].failed == ["slow.ext"]
+    assert reports[0].seconds < 4
+
+
+def test_cli_install_extensions(tmp_path, mock_home, fake_editors, capsys):
+    path = tmp_path / "extensions.txt"
+    path.write_text("present.ext\nnew.ext\n")
+
+    assert main(["editor", "install-extensions", "-f", str(path), "--editors", "cursor,code"]) == 0
+    out = capsys.readouterr().out
+    assert "Cursor: 1 installed, 1 already present, 0 failed" in out
+    assert "VS Code: 1 installed" in out
+
+    assert main(["editor", "install-extensions", "-f", str(path), "--editors", "vim"]) == 1
+    assert "Unknown editor(s): vim" in capsys.readouterr().err
@@ -0,0 +1,148 @@
+"""Tests for cosmikase.fleet module."""
+
+import json
+
+import pytest
+import yaml
+
+from cosmikase import config
+from cosmikase.cli import main
+from cosmikase.fleet import changed_hosts, evaluate_fleet, hosts_enabling, read_report
+
+BASE = {
+    "defaults": {"theme": "nord"},
+    "apt": {"core": [{"name": "git"}, {"name": "htop"}]},
+    "flatpak": {"browsers": [{"id": "org.mozilla.firefox"}]},
+    "npm": [{"name": "@openai/codex", "version": "latest"}],
+}
+DEVELOPER = {
+    "extends": "../base.yaml",
+    "apt": {"core": [{"name": "ripgrep"}]},
+    "installers": {"runtimes": [{"name": "bun", "method": "script", "url": "https://bun.sh"}]},
+}
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(yaml.dump(data))
+
+
+@pytest.fixture
+def fleet_dir(tmp_path):
+    write(tmp_path / "base.yaml", BASE)
+    write(tmp_path / "roles" / "developer.yaml", DEVELOPER)
+    hosts = tmp_path / "hosts"
+    write(hosts / "dev1.yaml", {"extends": "../roles/developer.yaml"})
+    write(
+        hosts / "dev2.yaml",
+        {
+            "extends": ["../roles/developer.yaml"],
+            "defaults": {"theme": "gruvbox"},
+            "apt": {"core": [{"name": "htop", "install": False}]},
+        },
+    )
+    write(
+        hosts / "zbook.yaml",
+        {
+            "extends": "../base.yaml",
+            "hp_zbook_ultra": {"emit_notes": True, "notes": "Needs the OEM kernel"},
+        },
+    )
+    return hosts
+
+
+def by_host(entries):
+    return {entry["host"]: entry for entry in entries}
+
+
+def test_evaluate_fleet(fleet_dir):
+    entries = by_host(evaluate_fleet(fleet_dir, jobs=1))
+
+    assert list(entries) == ["dev1", "dev2", "zbook"]
+    dev1, dev2, zbook = entries.values()
+    assert dev1["valid"] and dev1["errors"] == []
+    assert dev1["packages"]["apt"] == ["git", "htop", "ripgrep"]
+    assert dev1["packages"]["npm"] == ["@openai/codex"]
+    assert dev1["installers"] == ["bun"]
+    assert dev1["layers"] == [
+        str(fleet_dir.parent / "base.yaml"),
+        str(fleet_dir.parent / "roles" / "developer.yaml"),
+    ]
+    assert (dev2["theme"], dev2["packages"]["apt"]) == ("gruvbox", ["git", "ripgrep"])
+    assert zbook["hardware"] == {"hp_zbook_ultra": "Needs the OEM kernel"}
+    assert zbook["installers"] == []
+
+    assert hosts_enabling(entries.values(), "ripgrep") == ["dev1", "dev2"]
+    assert hosts_enabling(entries.values(), "bun") == ["dev1", "dev2"]
+    assert hosts_enabling(entries.values(), "htop") == ["dev1", "zbook"]
+
+
+def test_shared_layers_are_merged_once(fleet_dir, monkeypatch):
+    merged = {}
+    monkeypatch.setattr(config, "_MERGED", merged)
+    write(fleet_dir / "dev3.yaml", {"extends": "../roles/developer.yaml", "npm": []})
+
+    evaluate_fleet(fleet_dir, jobs=1)
+    # One merge per distinct prefix: base, base+developer, then one per host
+    assert len(merged) == 2 + 4
+
+
+def test_since_reuses_unchanged_hosts(fleet_dir):
+    before = by_host(evaluate_fleet(fleet_dir, jobs=1))
+
+    # A comment-only edit changes the inputs but not the result
+    role = fleet_dir.parent / "roles" / "developer.yaml"
+    role.write_text(role.read_text() + "# reviewed\n")
+    write(fleet_dir / "new.yaml", {"extends": "../base.yaml"})
+    after = evaluate_fleet(fleet_dir, jobs=1, previous=before)
+
+    reused = [entry["host"] for entry in after if entry.get("reused")]
+    assert reused == ["zbook"]
+    assert changed_hosts(before, after) == {"added": ["new"], "removed": [], "changed": []}
+
+    write(role, {**DEVELOPER, "apt": {"core": [{"name": "fd-find"}]}})
+    after = evaluate_fleet(fleet_dir, jobs=1, previous=before)
+    assert changed_hosts(before, after)["changed"] == ["dev1", "dev2"]
+
+
+def test_invalid_hosts(fleet_dir):
+    write(fleet_dir / "loop.yaml", {"extends": "loop.yaml"})
+    write(fleet_dir / "orphan.yaml", {"extends": "../missing.yaml"})
+    write(fleet_dir / "typo.yaml", {"extends": "../base.yaml", "defaults": {"install": "yes!"}})
+
+    entries = by_host(evaluate_fleet(fleet_dir, jobs=1))
+    assert "extends itself" in entries["loop"]["errors"][0]
+    assert "missing.yaml" in entries["orphan"]["errors"][0]
+    assert not entries["typo"]["valid"]
+    assert entries["typo"]["errors"][0].startswith("defaults.install:")
+    assert entries["dev1"]["valid"]
+
+
+def test_process_pool_matches_serial(fleet_dir):
+    for i in range(20):
+        write(fleet_dir / f"lab{i:02}.yaml", {"extends": "../roles/developer.yaml"})
+
+    assert evaluate_fleet(fleet_dir, jobs=2) == evaluate_fleet(fleet_dir, jobs=1)
+
+
+def test_cli_fleet(fleet_dir, tmp_path, capsys):
+    report = tmp_path / "report.jsonl"
+    assert main(["fleet", str(fleet_dir), "-j", "1", "--out", str(report)]) == 0
+    assert capsys.readouterr().out == ""
+    assert list(read_report(report)) == ["dev1", "dev2", "zbook"]
+
+    assert main(["fleet", str(fleet_dir), "-j", "1", "--enables", "ripgrep"]) == 0
+    assert capsys.readouterr().out.split() == ["dev1", "dev2"]
+
+    codex = {"name": "@openai/codex", "install": False}
+    write(fleet_dir / "dev1.yaml", {"extends": "../roles/developer.yaml", "npm": [codex]})
+    write(fleet_dir / "bad.yaml", {"extends": "../nope.yaml"})
+    assert main(["fleet", str(fleet_dir), "-j", "1", "--since", str(report)]) == 1
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == ["+ bad", "~ dev1"]
+    assert "Invalid host config(s): bad" in captured.err
+
+    assert main(["fleet", str(fleet_dir / "dev1.yaml")]) == 1
+    assert main(["fleet", str(fleet_dir), "-j", "1"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["host"] for line in lines] == ["bad", "dev1", "dev2", "zbook"]
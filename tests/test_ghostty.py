@@ -0,0 +1,139 @@
+"""Tests for cosmikase.ghostty module."""
+
+import json
+import subprocess
+
+import pytest
+
+from cosmikase.cli import main
+from cosmikase.ghostty import GhosttyBuildError, build_ghostty
+
+# Builds zig-out from the checkout's ghostty.txt, logging each build
+FAKE_ZIG = """#!/bin/sh
+if [ "$1" = version ]; then echo 0.13.0; exit 0; fi
+echo "$@" >> "{log}"
+mkdir -p zig-out/bin zig-out/share/applications
+cp ghostty.txt zig-out/bin/ghostty
+echo "[Desktop Entry]" > zig-out/share/applications/com.mitchellh.ghostty.desktop
+echo built
+"""
+
+
+def git(source, *args):
+    subprocess.run(["git", *args], cwd=source, check=True, capture_output=True)
+
+
+def commit(source, name, content):
+    (source / name).write_text(content)
+    git(source, "add", name)
+    git(source, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", f"edit {name}")
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    source = tmp_path / "ghostty-source"
+    source.mkdir()
+    git(source, "init", "-q")
+    (source / ".gitignore").write_text("zig-out/\n")
+    commit(source, "ghostty.txt", "v1\n")
+
+    log = tmp_path / "builds.log"
+    zig = tmp_path / "zig"
+    zig.write_text(FAKE_ZIG.format(log=log))
+    zig.chmod(0o755)
+    return source, zig, log
+
+
+def build(tmp_path, checkout, **kwargs):
+    source, zig, _ = checkout
+    return build_ghostty(
+        source=source,
+        prefix=tmp_path / "local",
+        zig=zig,
+        state_path=tmp_path / "state.json",
+        zig_cache=tmp_path / "zig-cache",
+        pull=False,
+        output=lambda line: None,
+        **kwargs,
+    )
+
+
+def builds(checkout):
+    log = checkout[2]
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def test_first_build_installs(tmp_path, checkout):
+    result = build(tmp_path, checkout)
+
+    assert result.decision == "installed"
+    assert set(result.timings) == {"build", "install"}
+    assert (tmp_path / "local" / "bin" / "ghostty").read_text() == "v1\n"
+    assert (tmp_path / "local" / "share" / "applications").is_dir()
+    assert builds(checkout) == [
+        f"build -Doptimize=ReleaseFast --global-cache-dir {tmp_path / 'zig-cache'}"
+    ]
+    state = json.loads((tmp_path / "state.json").read_text())
+    assert state["commit"] == result.commit
+
+
+def test_unchanged_head_skips_build(tmp_path, checkout):
+    build(tmp_path, checkout)
+    result = build(tmp_path, checkout)
+
+    assert result.decision == "up to date"
+    assert "build" not in result.timings
+    assert len(builds(checkout)) == 1
+
+    # --force, local edits and a missing binary all rebuild
+    assert build(tmp_path, checkout, force=True).decision == "unchanged"
+    (checkout[0] / "ghostty.txt").write_text("dirty\n")
+    assert build(tmp_path, checkout).decision == "installed"
+    (tmp_path / "local" / "bin" / "ghostty").unlink()
+    assert build(tmp_path, checkout).decision == "installed"
+    assert len(builds(checkout)) == 4
+
+
+def test_same_output_is_not_reinstalled(tmp_path, checkout):
+    build(tmp_path, checkout)
+    binary = tmp_path / "local" / "bin" / "ghostty"
+    inode = binary.stat().st_ino
+
+    commit(checkout[0], "README.md", "docs only\n")
+    result = build(tmp_path, checkout)
+    assert result.decision == "unchanged"
+    assert binary.stat().st_ino == inode
+
+    commit(checkout[0], "ghostty.txt", "v2\n")
+    assert build(tmp_path, checkout).decision == "installed"
+    assert binary.read_text() == "v2\n"
+    assert binary.stat().st_ino != inode
+
+
+def test_errors(tmp_path, checkout):
+    with pytest.raises(GhosttyBuildError, match="No Ghostty checkout"):
+        build_ghostty(source=tmp_path / "missing", zig=checkout[1])
+
+    checkout[1].write_text('#!/bin/sh\n[ "$1" = version ] && echo 0.13.0 || exit 3\n')
+    with pytest.raises(GhosttyBuildError, match="exited with status 3"):
+        build(tmp_path, checkout)
+
+
+def test_cli_ghostty_build(tmp_path, checkout, monkeypatch, capsys):
+    source, zig, _ = checkout
+    monkeypatch.setenv("PATH", f"{tmp_path}:/usr/bin:/bin")
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    argv = ["ghostty", "build", "--source", str(source), "--prefix", str(tmp_path / "local")]
+
+    assert main([*argv, "--no-pull"]) == 0
+    out = capsys.readouterr().out
+    assert "built" in out
+    assert ": installed (build " in out
+
+    assert main([*argv, "--no-pull", "-q"]) == 0
+    assert capsys.readouterr().out.strip().endswith(": up to date")
+
+    # No upstream to pull from
+    assert main(argv) == 1
+    assert "git pull --ff-only exited with status" in capsys.readouterr().err
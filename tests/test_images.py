@@ -0,0 +1,24 @@
+"""Tests for cosmikase.images module."""
+
+import hashlib
+
+from cosmikase import images
+from cosmikase.images import source_digest
+
+
+def test_source_digest_is_memoized_and_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "_MEMO_SIZE", 2)
+    monkeypatch.setattr(images, "_digest_memo", type(images._digest_memo)())
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.png"
+        path.write_bytes(name.encode())
+        paths.append(path)
+
+    for path in paths:
+        assert source_digest(path) == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert [key[0] for key in images._digest_memo] == [str(p) for p in paths[1:]]
+
+    # Changed contents are hashed again
+    paths[2].write_bytes(b"changed")
+    assert source_digest(paths[2]) == hashlib.sha256(b"changed").hexdigest()
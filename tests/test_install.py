@@ -0,0 +1,92 @@
+"""Tests for cosmikase.install module."""
+
+import pytest
+import yaml
+
+from cosmikase import install
+from cosmikase.cli import main
+from cosmikase.install import AptBackend, PackageBackend, install_batch, install_packages
+
+CONFIG = {
+    "apt": {
+        "core": [{"name": "fzf"}, {"name": "zoxide"}, {"name": "steam", "install": False}],
+        "terminal": [{"name": "ghostty", "source": "source"}, {"name": "kitty"}],
+    },
+    "flatpak": {"apps": [{"id": "md.obsidian.Obsidian"}]},
+}
+
+
+class FakeBackend(PackageBackend):
+    """Fails any transaction that contains a package in ``broken``."""
+
+    def __init__(self, name, broken=()):
+        self.name = name
+        self.broken = set(broken)
+        self.transactions = []
+
+    def command(self, packages):
+        return [self.name, "install", *packages]
+
+    def install(self, packages):
+        self.transactions.append(list(packages))
+        return not self.broken.intersection(packages)
+
+
+def test_one_transaction_per_backend():
+    backends = {"apt": FakeBackend("apt"), "flatpak": FakeBackend("flatpak")}
+    results = install_packages(CONFIG, backends)
+
+    assert backends["apt"].transactions == [["fzf", "zoxide", "kitty"]]
+    assert backends["flatpak"].transactions == [["md.obsidian.Obsidian"]]
+    assert all(result.ok for result in results)
+
+
+def test_bisect_isolates_failures():
+    backend = FakeBackend("apt", broken={"c", "f"})
+    result = install_batch(backend, list("abcdefgh"))
+
+    assert sorted(result.installed) == list("abdegh")
+    assert result.failed == ["c", "f"]
+    assert backend.transactions[0] == list("abcdefgh")
+
+
+def test_only_limits_listed_sections():
+    backends = {"apt": FakeBackend("apt"), "flatpak": FakeBackend("flatpak")}
+    install_packages(CONFIG, backends, only={"apt": ["zoxide"]})
+
+    assert backends["apt"].transactions == [["zoxide"]]
+    assert backends["flatpak"].transactions == [["md.obsidian.Obsidian"]]
+
+
+def test_apt_command_uses_sudo(monkeypatch):
+    monkeypatch.setattr(install.os, "geteuid", lambda: 1000)
+    assert AptBackend().command(["fzf"]) == ["sudo", "apt-get", "install", "-y", "-q", "fzf"]
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "cosmikase.yaml"
+    path.write_text(yaml.dump(CONFIG))
+    return path
+
+
+def test_cli_install_dry_run(config_file, monkeypatch, capsys):
+    monkeypatch.setattr(install.os, "geteuid", lambda: 0)
+
+    assert main(["install", "--packages", "-c", str(config_file), "--dry-run"]) == 0
+    out = capsys.readouterr().out
+    assert "Would run: apt-get install -y -q fzf zoxide kitty" in out
+    assert "Would run: flatpak install -y --noninteractive flathub md.obsidian.Obsidian" in out
+
+
+def test_cli_install_reports_failures(config_file, monkeypatch, capsys):
+    monkeypatch.setitem(install.BACKENDS, "apt", lambda: FakeBackend("apt", broken={"kitty"}))
+    monkeypatch.setitem(install.BACKENDS, "flatpak", lambda: FakeBackend("flatpak"))
+
+    assert main(["install", "--packages", "-c", str(config_file)]) == 1
+    captured = capsys.readouterr()
+    assert "apt: failed to install: kitty" in captured.err
+    assert "apt: 2 installed in 5 transaction(s)" in captured.out
+
+    assert main(["install", "-c", str(config_file)]) == 1
+    assert "pass --packages" in capsys.readouterr().err
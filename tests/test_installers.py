@@ -0,0 +1,224 @@
+"""Tests for cosmikase.installers module."""
+
+import json
+import threading
+import time
+
+import yaml
+
+from cosmikase.checks import CheckCache
+from cosmikase.cli import main
+from cosmikase.installers import (
+    DPKG_LOCK,
+    Installer,
+    build_graph,
+    critical_path,
+    run_command,
+    run_graph,
+    waterfall,
+)
+
+CONFIG = {
+    "installers": {
+        "runtimes": [
+            {"name": "nvm", "method": "custom_nvm", "check": "nvm"},
+            {"name": "bun", "method": "script", "url": "https://bun.sh/install", "check": "bun"},
+            {"name": "zig", "method": "tarball", "url": "https://z/zig.tar.xz", "install": False},
+        ],
+        "ai_tools": [
+            {"name": "cursor", "method": "deb", "deb_url": "https://c/cursor.deb"},
+            {"name": "claude-code", "method": "npm", "check": "claude"},
+            {"name": "opencode", "method": "bun", "bun_package": "opencode-ai"},
+            {"name": "amp", "method": "manual"},
+        ],
+        "security": [{"name": "brave-browser", "method": "custom_brave"}],
+    }
+}
+
+
+class FakeRunner:
+    """Sleeps per node, fails the named ones, and tracks concurrency."""
+
+    def __init__(self, seconds=0.05, fail=()):
+        self.seconds = seconds
+        self.fail = set(fail)
+        self.order = []
+        self.active = set()
+        self.overlaps = []
+        self.lock = threading.Lock()
+
+    def __call__(self, node, output):
+        with self.lock:
+            self.order.append(node.name)
+            self.overlaps.append(set(self.active))
+            self.active.add(node.name)
+        output(f"installing {node.name}")
+        time.sleep(self.seconds if isinstance(self.seconds, float) else self.seconds[node.name])
+        with self.lock:
+            self.active.discard(node.name)
+        return node.name not in self.fail
+
+
+def node(name, deps=(), locks=()):
+    return Installer(name, "script", f"install {name}", tuple(deps), tuple(locks))
+
+
+def test_build_graph(tmp_path):
+    nodes = build_graph(CONFIG, home=tmp_path, check=False)
+
+    assert list(nodes) == ["nvm", "bun", "cursor", "claude-code", "opencode", "brave-browser"]
+    assert nodes["claude-code"].deps == ("nvm",)
+    assert nodes["opencode"].deps == ("bun",)
+    assert nodes["bun"].deps == ()
+    assert nodes["cursor"].locks == nodes["brave-browser"].locks == (DPKG_LOCK,)
+    assert "npm install -g @anthropic-ai/claude-code" in nodes["claude-code"].command
+    assert "bun add -g opencode-ai" in nodes["opencode"].command
+    assert nodes["bun"].command.endswith("https://bun.sh/install | bash")
+    assert nodes["cursor"].artifact == "https://c/cursor.deb"
+
+
+def test_build_graph_marks_installed(tmp_path):
+    (tmp_path / ".nvm").mkdir()
+    (tmp_path / ".nvm" / "nvm.sh").write_text("nvm() { echo 0.40.3; }\n")
+    bun = tmp_path / ".bun" / "bin" / "bun"
+    bun.parent.mkdir(parents=True)
+    bun.write_text("#!/bin/sh\n")
+    bun.chmod(0o755)
+
+    cache = CheckCache(tmp_path / "checks.json")
+    nodes = build_graph(CONFIG, home=tmp_path, check_cache=cache)
+    assert nodes["nvm"].installed and nodes["bun"].installed
+    assert not nodes["cursor"].installed
+
+
+def test_independent_nodes_run_concurrently():
+    nodes = {name: node(name) for name in "abcd"}
+    runner = FakeRunner(seconds=0.2)
+
+    start = time.monotonic()
+    results = run_graph(nodes, jobs=4, runner=runner)
+
+    assert time.monotonic() - start < 0.6
+    assert all(r.status == "ok" for r in results.values())
+    assert max(len(active) for active in runner.overlaps) == 3
+
+
+def test_dependencies_and_locks_are_respected():
+    nodes = {
+        "nvm": node("nvm"),
+        "claude": node("claude", deps=["nvm"]),
+        "cursor": node("cursor", locks=[DPKG_LOCK]),
+        "brave": node("brave", locks=[DPKG_LOCK]),
+    }
+    runner = FakeRunner()
+    results = run_graph(nodes, jobs=4, runner=runner)
+
+    assert results["claude"].start >= results["nvm"].end
+    first, second = sorted((results["cursor"], results["brave"]), key=lambda r: r.start)
+    assert second.start >= first.end
+    for name, active in zip(runner.order, runner.overlaps, strict=True):
+        if name in ("cursor", "brave"):
+            assert not active & {"cursor", "brave"}
+
+
+def test_lock_capacity():
+    nodes = {name: node(name, locks=["network"]) for name in "abc"}
+    runner = FakeRunner(seconds=0.1)
+    run_graph(nodes, jobs=4, runner=runner, capacity={"network": 2})
+
+    assert max(len(active) for active in runner.overlaps) == 1
+
+
+def test_failure_blocks_dependents():
+    nodes = {"nvm": node("nvm"), "claude": node("claude", deps=["nvm"]), "bun": node("bun")}
+    events = []
+    results = run_graph(nodes, runner=FakeRunner(fail={"nvm"}), on_event=events.append)
+
+    assert results["nvm"].status == "failed"
+    assert results["claude"].status == "blocked"
+    assert results["claude"].message == "nvm failed"
+    assert results["bun"].status == "ok"
+    outputs = [(e["item"], e["line"]) for e in events if e["event"] == "output"]
+    assert ("bun", "installing bun") in outputs
+
+
+def test_stuck_nodes_report_why():
+    nodes = {
+        "a": node("a", deps=["b"]),
+        "b": node("b", deps=["a"]),
+        "c": node("c", deps=["a"]),
+        "deb": node("deb", locks=["dpkg"]),
+        "after": node("after", deps=["deb"]),
+        "free": node("free"),
+    }
+    results = run_graph(nodes, runner=FakeRunner(seconds=0.0), capacity={"dpkg": 0})
+
+    messages = {name: result.message for name, result in results.items()}
+    assert messages == {
+        "a": "dependency cycle",
+        "b": "dependency cycle",
+        "c": "a never ran",
+        "deb": "no capacity for lock dpkg",
+        "after": "deb never ran",
+        "free": "",
+    }
+    assert results["free"].status == "ok"
+    assert {results[name].status for name in "abc"} == {"blocked"}
+
+
+def test_critical_path_and_waterfall():
+    nodes = {
+        "nvm": node("nvm"),
+        "claude": node("claude", deps=["nvm"]),
+        "quick": node("quick"),
+    }
+    runner = FakeRunner(seconds={"nvm": 0.15, "claude": 0.15, "quick": 0.02})
+    results = run_graph(nodes, runner=runner)
+
+    assert critical_path(nodes, results) == ["nvm", "claude"]
+    chart = waterfall(nodes, results, width=20)
+    assert chart[0].startswith("* nvm")
+    assert any(line.startswith("  quick") for line in chart)
+    assert chart[-1].lstrip().startswith("total")
+
+
+def test_cli_install_installers(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", "/usr/bin:/bin")
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    config_file = tmp_path / "cosmikase.yaml"
+    config_file.write_text(yaml.dump(CONFIG))
+
+    assert main(["install", "--installers", "-c", str(config_file), "--dry-run"]) == 0
+    out = capsys.readouterr().out
+    assert "claude-code (after: nvm)" in out
+    assert "cursor (after: dpkg lock)" in out
+
+    # A failing installer is reported, and its events are logged
+    monkeypatch.setattr(
+        "cosmikase.installers.METHODS",
+        {"script": lambda item: f"echo {item['name']}; exit 3"},
+    )
+    config_file.write_text(
+        yaml.dump({"installers": {"runtimes": [{"name": "x", "method": "script"}]}})
+    )
+    log = tmp_path / "install.jsonl"
+    assert main(["install", "--installers", "-c", str(config_file), "--log", str(log)]) == 1
+    captured = capsys.readouterr()
+    assert "[x] x" in captured.out
+    assert "Failed installers: x" in captured.err
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [e["event"] for e in events] == ["start", "output", "failed"]
+
+
+def test_run_command_passes_cached_artifact(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv("COSMIKASE_DOWNLOAD_MIRROR", raising=False)
+    artifact = tmp_path / "tool.tar.gz"
+    artifact.write_text("payload\n")
+    node = Installer("tool", "tarball", 'cat "$COSMIKASE_ARTIFACT"', artifact=artifact.as_uri())
+
+    lines = []
+    assert run_command(node, lines.append)
+    assert lines[0].startswith(f"{artifact.as_uri()}: downloaded (")
+    assert lines[1] == "payload"
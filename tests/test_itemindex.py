@@ -0,0 +1,131 @@
+"""Tests for cosmikase.itemindex module."""
+
+import json
+
+import pytest
+import yaml
+
+from cosmikase.cli import main
+from cosmikase.itemindex import ItemIndex, config_items, load_index
+
+CONFIG = {
+    "defaults": {"theme": "nord"},
+    "apt": {
+        "core": [
+            {"name": "ripgrep", "desc": "Fast line-oriented search tool"},
+            {"name": "git", "desc": "Version control"},
+            {"name": "htop", "install": False},
+        ],
+        "gui": [{"name": "code", "desc": "Code editor", "note": "From the Microsoft repo"}],
+    },
+    "flatpak": {"browsers": [{"id": "org.mozilla.firefox", "desc": "Web browser"}]},
+    "npm": [{"name": "@openai/codex", "alias": "codex"}],
+    "cargo_tools": ["ripgrep_all"],
+    "installers": {"editors": [{"name": "cursor", "desc": "AI code editor", "method": "script"}]},
+}
+
+
+def names(hits):
+    return [hit.item["name"] for hit in hits]
+
+
+@pytest.fixture
+def index():
+    return ItemIndex.build(CONFIG)
+
+
+def test_config_items():
+    items = {(item["name"], item["section"], item["group"]) for item in config_items(CONFIG)}
+    assert ("ripgrep", "apt", "core") in items
+    assert ("org.mozilla.firefox", "flatpak", "browsers") in items
+    assert ("ripgrep_all", "cargo_tools", None) in items
+    assert len(items) == 8
+
+    htop = next(item for item in config_items(CONFIG) if item["name"] == "htop")
+    assert htop == {"section": "apt", "group": "core", "name": "htop", "enabled": False}
+
+
+def test_search_ranks_names_first(index):
+    hits = index.search("ripgrep")
+    assert names(hits) == ["ripgrep", "ripgrep_all"]
+    assert [hit.match for hit in hits] == ["exact", "name"]
+    assert hits[0].location == "apt.core"
+
+    # Descriptions and notes match after names
+    assert names(index.search("code")) == ["code", "@openai/codex", "cursor"]
+    assert names(index.search("editor")) == ["code", "cursor"]
+    assert names(index.search("microsoft")) == ["code"]
+
+
+def test_search_prefixes_and_locations(index):
+    assert names(index.search("rip")) == ["ripgrep", "ripgrep_all"]
+    assert names(index.search("mozilla fire")) == ["org.mozilla.firefox"]
+    assert names(index.search("apt core")) == ["git", "htop", "ripgrep"]
+    assert names(index.search("apt fast")) == ["ripgrep"]
+    assert names(index.search("cargo")) == ["ripgrep_all"]
+    assert names(index.search("code editor", limit=1)) == ["code"]
+    assert index.search("apt browser") == []
+
+
+def test_search_falls_back_to_fuzzy(index):
+    hits = index.search("ripgrp")
+    assert hits[0].item["name"] == "ripgrep"
+    assert hits[0].match == "fuzzy"
+    assert index.search("ripgrp", fuzzy=False) == []
+    assert index.search("  ") == []
+
+
+def test_groups_and_fields_combine():
+    config = {"apt": {f"group{g}": [] for g in range(10)}}
+    for n in range(2000):
+        item = {"name": f"tool{n}", "desc": "even" if n % 2 == 0 else "odd"}
+        config["apt"][f"group{n % 10}"].append(item)
+    index = ItemIndex.build(config)
+
+    hits = index.search("group3 even")
+    assert hits == []
+    hits = index.search("group3 odd", limit=3)
+    assert names(hits) == ["tool1003", "tool1013", "tool1023"]
+    assert len(index.search("group4 even")) == 200
+    assert names(index.search("tool19", limit=2)) == ["tool19", "tool190"]
+
+
+def test_load_index_caches_by_config(tmp_path):
+    config_path = tmp_path / "cosmikase.yaml"
+    config_path.write_text(yaml.dump(CONFIG))
+    cache_dir = tmp_path / "cache"
+
+    index, cached = load_index(config_path, cache_dir=cache_dir)
+    assert not cached
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    index, cached = load_index(config_path, cache_dir=cache_dir)
+    assert cached
+    assert names(index.search("rip")) == ["ripgrep", "ripgrep_all"]
+
+    host = tmp_path / "host.yaml"
+    host.write_text(yaml.dump({"apt": {"core": [{"name": "ripgrep", "install": False}]}}))
+    index, cached = load_index([config_path, host], cache_dir=cache_dir)
+    assert not cached
+    assert not index.search("ripgrep")[0].item["enabled"]
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_cli_search(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    config_path = tmp_path / "cosmikase.yaml"
+    config_path.write_text(yaml.dump(CONFIG))
+
+    assert main(["search", "editor", "-c", str(config_path)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        "  ✓ code    apt.gui             Code editor",
+        "  ✓ cursor  installers.editors  AI code editor",
+    ]
+
+    assert main(["search", "htop", "-c", str(config_path), "--json"]) == 0
+    (hit,) = json.loads(capsys.readouterr().out)
+    assert (hit["location"], hit["enabled"], hit["match"]) == ("apt.core", False, "exact")
+
+    assert main(["search", "nothing", "-c", str(config_path), "--exact"]) == 1
+    assert "No items match 'nothing'" in capsys.readouterr().err
+    assert main(["search", "git", "-c", str(tmp_path / "missing.yaml")]) == 1
@@ -0,0 +1,125 @@
+"""Tests for cosmikase.pack module."""
+
+import hashlib
+import os
+
+import pytest
+
+from cosmikase.apply import ApplyOptions, apply_theme
+from cosmikase.cli import main
+from cosmikase.pack import (
+    PACK_SUFFIX,
+    ThemePack,
+    materialize,
+    open_pack,
+    pack_theme,
+    unpack_theme,
+)
+from cosmikase.themes import list_themes, load_manifest, read_theme_file, resolve_theme
+
+
+@pytest.fixture
+def packed(tmp_themes_dir, tmp_path):
+    """Pack the sample nord theme (with a wallpaper and a script) into tmp/packs."""
+    nord = tmp_themes_dir / "nord"
+    (nord / "backgrounds" / "1.png").write_bytes(b"\x89PNG fake" * 50)
+    script = nord / "hook.sh"
+    script.write_text("#!/bin/sh\n")
+    script.chmod(0o755)
+    return pack_theme(nord, tmp_path / "packs")
+
+
+def test_pack_members(packed, tmp_themes_dir):
+    with ThemePack(packed) as pack:
+        assert pack.name == "nord"
+        assert sorted(pack.names()) == ["backgrounds/1.png", "hook.sh", "theme.yaml"]
+        data = (tmp_themes_dir / "nord" / "theme.yaml").read_bytes()
+        assert pack.read("theme.yaml") == data
+        assert pack.member("theme.yaml").digest == hashlib.sha256(data).hexdigest()
+        assert pack.member("hook.sh").mode == 0o755
+        view = pack.view("backgrounds/1.png")
+        assert bytes(view) == b"\x89PNG fake" * 50
+        view.release()
+        assert pack.read("missing") is None
+
+
+def test_pack_is_deterministic(packed, tmp_themes_dir, tmp_path):
+    again = pack_theme(tmp_themes_dir / "nord", tmp_path / "again")
+    assert again.read_bytes() == packed.read_bytes()
+
+
+def test_invalid_packs(tmp_path):
+    bad = tmp_path / "bad.ctheme"
+    for content in (b"", b"not a pack at all"):
+        bad.write_bytes(content)
+        with pytest.raises(ValueError, match="Not a theme pack"):
+            ThemePack(bad)
+
+
+def test_unpack_roundtrip(packed, tmp_themes_dir, tmp_path):
+    out = tmp_path / "out"
+    target = unpack_theme(packed, out)
+
+    assert target == out / "nord"
+    for rel in ("theme.yaml", "backgrounds/1.png", "hook.sh"):
+        assert (target / rel).read_bytes() == (tmp_themes_dir / "nord" / rel).read_bytes()
+    assert os.access(target / "hook.sh", os.X_OK)
+
+    # Unpacking again replaces the old copy
+    (target / "stale").write_text("x")
+    unpack_theme(packed, out)
+    assert not (target / "stale").exists()
+
+
+def test_packed_themes_are_listed_and_loaded(packed, tmp_themes_dir):
+    packs_dir = packed.parent
+    (packs_dir / "tokyo-night").mkdir()
+    assert list_themes(packs_dir) == ["nord", "tokyo-night"]
+    assert resolve_theme(packs_dir, "nord") == packed
+    assert resolve_theme(packs_dir, "tokyo-night") == packs_dir / "tokyo-night"
+
+    manifest = load_manifest(packed)
+    assert manifest == load_manifest(tmp_themes_dir / "nord")
+    assert hash(manifest) == hash(load_manifest(tmp_themes_dir / "nord"))
+    assert read_theme_file(packed, "hook.sh") == b"#!/bin/sh\n"
+    assert read_theme_file(packed, "missing") is None
+
+
+def test_directory_wins_over_pack(packed, tmp_themes_dir):
+    pack_theme(tmp_themes_dir / "nord", tmp_themes_dir)
+    assert list_themes(tmp_themes_dir).count("nord") == 1
+    assert resolve_theme(tmp_themes_dir, "nord") == tmp_themes_dir / "nord"
+
+
+def test_open_pack_reopens_replaced_file(packed, tmp_themes_dir):
+    first = open_pack(packed)
+    assert open_pack(packed) is first
+    (tmp_themes_dir / "nord" / "extra.txt").write_text("new member\n")
+    pack_theme(tmp_themes_dir / "nord", packed.parent)
+    assert "extra.txt" in open_pack(packed)
+    assert "extra.txt" not in first
+
+
+def test_materialize_and_apply(packed, tmp_path, mock_home, monkeypatch):
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    cache = tmp_path / "cache"
+    root = materialize(packed, cache)
+    assert (root / "nord" / "theme.yaml").is_file()
+    assert materialize(packed, cache) == root
+
+    options = ApplyOptions(chezmoi_apply=False, cursor=False, cosmic=False, terminals=False)
+    apply_theme("nord", packed.parent, options)
+    chezmoi_toml = (mock_home / ".config" / "chezmoi" / "chezmoi.toml").read_text()
+    assert f'themes_dir = "{mock_home / ".cache" / "cosmikase" / "unpacked"}' in chezmoi_toml
+
+
+def test_cli_pack_unpack(tmp_themes_dir, tmp_path, capsys):
+    out = tmp_path / "packs"
+    assert main(["themes", "pack", "nord", "--dir", str(tmp_themes_dir), "--out", str(out)]) == 0
+    assert (out / f"nord{PACK_SUFFIX}").is_file()
+    assert main(["themes", "pack", "missing", "--dir", str(tmp_themes_dir), "-o", str(out)]) == 1
+
+    assert main(["themes", "unpack", str(out / f"nord{PACK_SUFFIX}")]) == 0
+    assert (out / "nord" / "theme.yaml").is_file()
+    (out / "broken.ctheme").write_bytes(b"junk")
+    assert main(["themes", "unpack", str(out / "broken.ctheme")]) == 1
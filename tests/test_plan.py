@@ -0,0 +1,159 @@
+"""Tests for cosmikase.plan module."""
+
+import json
+
+import pytest
+import yaml
+
+from cosmikase import plan as plan_module
+from cosmikase.cli import main
+from cosmikase.plan import parse_dpkg_status, parse_uv_tool_list, plan, wanted_packages
+
+DPKG_STATUS = """\
+Package: fzf
+Status: install ok installed
+Version: 0.44.1
+
+Package: zoxide
+Status: deinstall ok config-files
+Version: 0.9.2
+
+Package: kitty
+Status: install ok installed
+"""
+
+CONFIG = {
+    "defaults": {"yubikey_setup": False},
+    "apt": {
+        "core": [{"name": "fzf"}, {"name": "zoxide"}, {"name": "steam", "install": False}],
+        "terminal": [{"name": "ghostty", "source": "source"}, {"name": "kitty"}],
+        "yubikey": [{"name": "yubikey-manager"}],
+    },
+    "flatpak": {"apps": [{"id": "md.obsidian.Obsidian"}, {"id": "com.spotify.Client"}]},
+    "npm": [{"name": "@openai/codex"}, {"name": "left-pad", "version": "1.3.0"}],
+    "uv_tools": ["ruff", {"name": "ty"}],
+}
+
+
+@pytest.fixture
+def fake_backends(tmp_path, monkeypatch):
+    """Fake dpkg status, flatpak, npm and uv; every command invocation is logged."""
+    status = tmp_path / "status"
+    status.write_text(DPKG_STATUS)
+    monkeypatch.setattr(plan_module, "DPKG_STATUS", status)
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+    outputs = {
+        "flatpak": "md.obsidian.Obsidian\n",
+        "npm": json.dumps({"dependencies": {"@openai/codex": {"version": "1.0.0"}}}),
+        "uv": "ruff v0.4.1\n- ruff\n",
+    }
+    for name, output in outputs.items():
+        script = bin_dir / name
+        script.write_text(f'#!/bin/sh\necho "{name} $*" >> "{log}"\ncat <<\'EOF\'\n{output}\nEOF\n')
+        script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.setenv("UV_TOOL_DIR", str(tmp_path / "uv-tools"))
+    (tmp_path / "uv-tools").mkdir()
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    return log
+
+
+def test_parse_dpkg_status():
+    assert parse_dpkg_status(DPKG_STATUS) == {"fzf", "kitty"}
+
+
+def test_parse_uv_tool_list():
+    output = "ruff v0.4.1\n- ruff\nty v0.0.1\n- ty\n"
+    assert parse_uv_tool_list(output) == {"ruff", "ty"}
+
+
+def test_wanted_packages():
+    wanted = wanted_packages(CONFIG)
+    assert list(wanted["apt"]) == ["fzf", "zoxide", "kitty"]
+    assert list(wanted["npm"].values()) == ["@openai/codex@latest", "left-pad@1.3.0"]
+    assert list(wanted["uv_tools"]) == ["ruff", "ty"]
+
+    config = {**CONFIG, "defaults": {"yubikey_setup": True}}
+    assert "yubikey-manager" in wanted_packages(config)["apt"]
+
+
+def test_plan_lists_only_missing(tmp_path, fake_backends):
+    result = plan(CONFIG, cache_path=tmp_path / "state.json")
+
+    assert result["apt"] == ["zoxide"]
+    assert result["flatpak"] == ["com.spotify.Client"]
+    assert result["npm"] == ["left-pad@1.3.0"]
+    assert result["uv_tools"] == ["ty"]
+    assert result["changed"] is True
+    assert result["unavailable"] == {}
+
+
+def test_installed_state_is_cached(tmp_path, fake_backends):
+    cache_path = tmp_path / "state.json"
+    plan(CONFIG, cache_path=cache_path)
+    calls = fake_backends.read_text()
+    assert calls.count("uv tool list") == 1
+
+    result = plan(CONFIG, cache_path=cache_path)
+    assert "uv_tools" in result["cached"]
+    assert fake_backends.read_text().count("uv tool list") == 1
+
+    # A change to the backend's database invalidates its entry
+    (tmp_path / "uv-tools" / "ty").mkdir()
+    plan(CONFIG, cache_path=cache_path)
+    assert fake_backends.read_text().count("uv tool list") == 2
+
+    plan(CONFIG, cache_path=cache_path, refresh=True)
+    assert fake_backends.read_text().count("uv tool list") == 3
+
+
+def test_npm_cache_follows_scope_directories(tmp_path, fake_backends):
+    # The fake npm is <prefix>/bin/npm, so packages live in <prefix>/lib/node_modules
+    scope = tmp_path / "lib" / "node_modules" / "@openai"
+    scope.mkdir(parents=True)
+    cache_path = tmp_path / "state.json"
+    plan(CONFIG, cache_path=cache_path)
+    assert "npm" in plan(CONFIG, cache_path=cache_path)["cached"]
+
+    # Installing another package into the scope leaves node_modules untouched
+    (scope / "other").mkdir()
+    result = plan(CONFIG, cache_path=cache_path)
+    assert "npm" not in result["cached"]
+    assert fake_backends.read_text().count("npm ls") == 2
+
+
+def test_unavailable_backend_plans_everything(tmp_path, fake_backends):
+    (tmp_path / "bin" / "flatpak").unlink()
+    result = plan(CONFIG, cache_path=tmp_path / "state.json")
+
+    assert result["flatpak"] == ["md.obsidian.Obsidian", "com.spotify.Client"]
+    assert result["unavailable"] == {"flatpak": "flatpak not found"}
+
+
+def test_cli_plan(tmp_path, fake_backends, capsys):
+    config_file = tmp_path / "cosmikase.yaml"
+    config_file.write_text(yaml.dump(CONFIG))
+
+    assert main(["plan", "-c", str(config_file), "--json"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["apt"] == ["zoxide"]
+
+    assert main(["plan", "-c", str(config_file)]) == 0
+    out = capsys.readouterr().out
+    assert "apt: install 1: zoxide" in out
+    assert "uv_tools: install 1: ty" in out
+
+    assert main(["plan", "-c", str(tmp_path / "missing.yaml")]) == 1
+    assert "Config file not found" in capsys.readouterr().err
+
+    # Layers, and a host extending a missing layer
+    host = tmp_path / "host.yaml"
+    host.write_text(yaml.dump({"apt": {"core": [{"name": "zoxide", "install": False}]}}))
+    assert main(["plan", "-c", str(config_file), "-c", str(host)]) == 0
+    assert "apt: up to date" in capsys.readouterr().out
+    host.write_text(yaml.dump({"extends": "missing.yaml"}))
+    assert main(["plan", "-c", str(host)]) == 1
+    assert capsys.readouterr().err.startswith("Error: ")
@@ -0,0 +1,225 @@
+"""Tests for cosmikase.rendercache module."""
+
+from pathlib import Path
+
+import pytest
+
+from cosmikase.apply import ApplyOptions, apply_theme
+from cosmikase.cli import main
+from cosmikase.rendercache import (
+    THEME_KEYS,
+    RenderCache,
+    target_mode,
+    target_path,
+    themed_templates,
+)
+
+KITTY = "dot_config/kitty/kitty.conf.tmpl"
+STARSHIP = "dot_config/starship.toml.tmpl"
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source = tmp_path / "source"
+    (source / "dot_config" / "kitty").mkdir(parents=True)
+    (source / KITTY).write_text("include {{ .themes_dir }}/{{ .theme }}/kitty.conf\n")
+    (source / STARSHIP).write_text('palette = "{{ .theme }}"\n')
+    # Not theme-dependent, or not a plain file
+    (source / "dot_bashrc.tmpl").write_text("{{ .chezmoi.hostname }}\n")
+    (source / "run_after_setup.sh.tmpl").write_text("echo {{ .theme }}\n")
+    (source / ".chezmoi.toml.tmpl").write_text("theme = {{ .theme }}\n")
+    return source
+
+
+@pytest.fixture
+def cache(tmp_path, source_dir, mock_home):
+    return RenderCache(root=tmp_path / "cache", source_dir=source_dir, home=mock_home)
+
+
+@pytest.fixture
+def fake_chezmoi(tmp_path, monkeypatch):
+    """Fake chezmoi that echoes templates back and logs its arguments.
+
+    ``chezmoi managed`` lists the targets in managed.txt instead, unlogged.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+    managed = tmp_path / "managed.txt"
+    managed.write_text(".config/kitty/kitty.conf\n.config/starship.toml\n")
+    script = bin_dir / "chezmoi"
+    script.write_text(
+        f'#!/bin/sh\ncase " $* " in\n  *" managed "*) cat "{managed}" ;;\n'
+        f'  *) echo "chezmoi $*" >> "{log}"; cat ;;\nesac\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    return log
+
+
+def _data(themes_dir, theme="nord"):
+    return {"theme": theme, "themes_dir": str(themes_dir), "unrelated": 1}
+
+
+def test_target_path():
+    assert target_path(KITTY) == Path(".config/kitty/kitty.conf")
+    assert target_path("private_dot_ssh/config.tmpl") == Path(".ssh/config")
+    assert target_path("dot_local/bin/executable_tool") == Path(".local/bin/tool")
+
+
+def test_themed_templates_are_scanned(cache, source_dir):
+    assert cache.templates == [KITTY, STARSHIP]
+
+    # Through a shared template too
+    shared = source_dir / ".chezmoitemplates"
+    shared.mkdir()
+    (shared / "palette").write_text("{{ .themes_dir }}\n")
+    (source_dir / "dot_config" / "btop.conf.tmpl").write_text('{{ template "palette" . }}\n')
+    assert themed_templates(source_dir) == ["dot_config/btop.conf.tmpl", KITTY, STARSHIP]
+
+
+def test_repo_themed_templates_are_all_cached():
+    """Every repo template reading the theme is in the set, or a switch would miss it."""
+    source_dir = Path(__file__).resolve().parent.parent / "chezmoi"
+    themed = set(themed_templates(source_dir))
+    for path in source_dir.rglob("*.tmpl"):
+        template = path.relative_to(source_dir).as_posix()
+        # chezmoi's own files, scripts and symlinks are always left to chezmoi apply
+        if template.startswith(".") or path.name.startswith(("run_", "symlink_")):
+            continue
+        text = path.read_text()
+        if any(f".{key}" in text for key in THEME_KEYS):
+            assert template in themed
+    assert "dot_config/Cursor/User/settings.json.tmpl" in themed
+    assert "dot_config/codex/config.toml.tmpl" in themed
+
+
+def test_key_depends_on_referenced_data(cache, tmp_themes_dir):
+    data = _data(tmp_themes_dir)
+    key = cache.key(STARSHIP, data)
+
+    assert cache.key(STARSHIP, {**data, "unrelated": 2}) == key
+    assert cache.key(STARSHIP, _data(tmp_themes_dir, "catppuccin")) != key
+
+
+def test_key_depends_on_theme_files(cache, tmp_themes_dir):
+    data = _data(tmp_themes_dir)
+    key = cache.key(KITTY, data)
+
+    (tmp_themes_dir / "nord" / "kitty.conf").write_text("foreground #eceff4\n")
+    assert cache.key(KITTY, data) != key
+
+
+def test_key_depends_on_template(cache, source_dir, tmp_themes_dir):
+    data = _data(tmp_themes_dir)
+    key = cache.key(STARSHIP, data)
+
+    (source_dir / STARSHIP).write_text('palette = "{{ .theme }}-dark"\n')
+    assert cache.key(STARSHIP, data) != key
+
+
+def test_write_hits(cache, mock_home, tmp_themes_dir):
+    data = _data(tmp_themes_dir)
+    cache.store(KITTY, data, b"rendered kitty\n")
+
+    stats, misses = cache.write_hits(data)
+
+    assert (stats.hits, stats.misses, stats.written) == (1, 1, 1)
+    assert misses == [STARSHIP]
+    assert (mock_home / ".config" / "kitty" / "kitty.conf").read_bytes() == b"rendered kitty\n"
+    # Unchanged targets aren't rewritten
+    assert cache.write_hits(data)[0].written == 0
+
+
+def test_target_mode():
+    assert target_mode(KITTY, 0o022) == 0o644
+    assert target_mode("private_dot_netrc.tmpl", 0o022) == 0o600
+    assert target_mode("dot_local/bin/executable_hook.tmpl", 0o022) == 0o755
+    assert target_mode("private_readonly_executable_hook", 0o002) == 0o500
+
+
+def test_write_hits_applies_source_modes(tmp_path, source_dir, mock_home, tmp_themes_dir):
+    hook = "dot_local/bin/private_executable_theme-hook.tmpl"
+    (source_dir / hook).parent.mkdir(parents=True)
+    (source_dir / hook).write_text("#!/bin/sh\necho {{ .theme }}\n")
+    cache = RenderCache(tmp_path / "cache", source_dir, mock_home, templates=[hook])
+    data = _data(tmp_themes_dir)
+    cache.store(hook, data, b"#!/bin/sh\necho nord\n")
+
+    target = mock_home / ".local" / "bin" / "theme-hook"
+    target.parent.mkdir(parents=True)
+    target.write_bytes(b"#!/bin/sh\necho nord\n")
+    assert cache.write_hits(data)[0].written == 1
+    # Same content, but private and executable now
+    assert target.stat().st_mode & 0o777 == 0o700
+
+
+def test_store_targets_only_caches_managed_files(cache, mock_home, fake_chezmoi, tmp_themes_dir):
+    (fake_chezmoi.parent / "managed.txt").write_text(".config/kitty/kitty.conf\n")
+    for template in (KITTY, STARSHIP):
+        target = mock_home / target_path(template)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(b"applied\n")
+    data = _data(tmp_themes_dir)
+
+    cache.store_targets(data, [KITTY, STARSHIP])
+    assert cache.lookup(KITTY, data) == b"applied\n"
+    # Ignored by chezmoi: left as an older apply wrote it, so not cached
+    assert cache.lookup(STARSHIP, data) is None
+
+
+def test_warm_renders_missing_outputs(cache, fake_chezmoi, tmp_themes_dir):
+    datasets = [_data(tmp_themes_dir, name) for name in ("nord", "catppuccin")]
+
+    stats = cache.warm(datasets, jobs=2)
+
+    assert (stats.hits, stats.written, stats.errors) == (0, 4, [])
+    assert cache.lookup(STARSHIP, datasets[1]) == b'palette = "{{ .theme }}"\n'
+    assert "--override-data" in fake_chezmoi.read_text()
+    assert cache.warm(datasets).hits == 4
+
+
+def test_warm_reports_errors(cache, tmp_path, monkeypatch, tmp_themes_dir):
+    script = tmp_path / "bin" / "chezmoi"
+    script.parent.mkdir()
+    script.write_text("#!/bin/sh\necho 'template: bad' >&2\nexit 1\n")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:/usr/bin:/bin")
+
+    stats = cache.warm([_data(tmp_themes_dir)])
+
+    assert stats.written == 0
+    assert len(stats.errors) == 2
+    assert "template: bad" in stats.errors[0]
+
+
+def test_apply_skips_templates_on_full_hit(
+    cache, mock_home, tmp_themes_dir, fake_chezmoi, monkeypatch
+):
+    monkeypatch.setattr("cosmikase.apply.RenderCache", lambda: cache)
+    options = ApplyOptions(cursor=False, cosmic=False, terminals=False)
+
+    apply_theme("nord", tmp_themes_dir, options)
+    assert fake_chezmoi.read_text().splitlines() == ["chezmoi apply --force"]
+
+    data = {"theme": "nord", "themes_dir": str(tmp_themes_dir)}
+    cache.store(KITTY, data, b"kitty\n")
+    cache.store(STARSHIP, data, b"starship\n")
+    apply_theme("nord", tmp_themes_dir, options)
+
+    # chezmoi still applies everything else, ignoring the targets written from the cache
+    assert fake_chezmoi.read_text().splitlines()[-1] == (
+        "chezmoi apply --force --override-data "
+        '{"cosmikase_cached": [".config/kitty/kitty.conf", ".config/starship.toml"]}'
+    )
+    assert (mock_home / ".config" / "starship.toml").read_bytes() == b"starship\n"
+
+
+def test_cli_chezmoi_warm(cache, mock_home, tmp_themes_dir, fake_chezmoi, monkeypatch, capsys):
+    monkeypatch.setattr("cosmikase.cli.RenderCache", lambda: cache)
+
+    assert main(["chezmoi", "warm", "--dir", str(tmp_themes_dir), "nord"]) == 0
+    assert "Rendered 2 outputs for 1 themes (0 already cached)" in capsys.readouterr().out
+
+    assert main(["chezmoi", "warm", "--dir", str(tmp_themes_dir), "missing"]) == 1
+    assert "Theme(s) not found: missing" in capsys.readouterr().err
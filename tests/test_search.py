@@ -0,0 +1,57 @@
+"""Tests for cosmikase.search module."""
+
+from cosmikase.search import FuzzyIndex, fuzzy_score
+
+
+def _index():
+    index = FuzzyIndex()
+    for name, variant in [
+        ("tokyo-night", "dark"),
+        ("nord", "dark"),
+        ("catppuccin-latte", "light"),
+        ("rose-pine", "light"),
+        ("gruvbox", "dark"),
+    ]:
+        index.add(name, [name, variant])
+    return index
+
+
+def test_fuzzy_score_ranks_substring_over_scattered():
+    assert fuzzy_score("nord", "nord dark") > fuzzy_score("nrd", "nord dark")
+    assert fuzzy_score("xyz", "nord") is None
+    assert fuzzy_score("", "anything") == 0
+
+
+def test_search_fuzzy_and_fields():
+    index = _index()
+    assert index.search("tkn") == ["tokyo-night"]
+    assert set(index.search("light")) == {"catppuccin-latte", "rose-pine"}
+    assert index.search("nord")[0] == "nord"
+    assert index.search("") == ["tokyo-night", "nord", "catppuccin-latte", "rose-pine", "gruvbox"]
+    assert index.search("zzz") == []
+
+
+def test_search_refines_previous_results(monkeypatch):
+    index = _index()
+    index.search("r")
+    calls = []
+    original = index._candidates
+    monkeypatch.setattr(index, "_candidates", lambda q: calls.append(q) or original(q))
+
+    # Extending the query reuses the previous result set
+    assert index.search("ro") == ["rose-pine", "gruvbox"]
+    assert calls == []
+    # Unrelated query rescans through the index
+    index.search("gr")
+    assert calls == ["gr"]
+
+
+def test_add_and_remove_invalidate_history():
+    index = _index()
+    assert index.search("everforest") == []
+    index.add("everforest", ["everforest", "dark"])
+    assert index.search("everforest") == ["everforest"]
+    index.remove("everforest")
+    assert index.search("everforest") == []
+    assert "everforest" not in index
+    assert len(index) == 5
@@ -0,0 +1,195 @@
+"""Tests for cosmikase.sync module."""
+
+import os
+
+import pytest
+
+from cosmikase.blobstore import BlobStore
+from cosmikase.cli import main
+from cosmikase.sync import MANIFEST_NAME, Manifest, copy_file, scan_source, sync_themes
+
+
+@pytest.fixture
+def src(tmp_path):
+    root = tmp_path / "src"
+    for theme in ("nord", "gruvbox"):
+        (root / theme / "backgrounds").mkdir(parents=True)
+        (root / theme / "theme.yaml").write_text(f"name: {theme}\n")
+        (root / theme / "backgrounds" / "1.png").write_bytes(theme.encode() * 1000)
+    (root / "README.md").write_text("# Themes\n")
+    script = root / "download.sh"
+    script.write_text("#!/bin/sh\n")
+    script.chmod(0o755)
+    return root
+
+
+def test_scan_source_root_hashes(src):
+    first = scan_source(src)
+    assert set(first.themes) == {"", "nord", "gruvbox"}
+    assert set(first.themes[""].files) == {"README.md", "download.sh"}
+
+    (src / "nord" / "theme.yaml").write_text("name: Nord\n")
+    second = scan_source(src, first)
+    assert second.themes["nord"].root != first.themes["nord"].root
+    assert second.themes["gruvbox"].root == first.themes["gruvbox"].root
+    assert second.root != first.root
+
+
+def test_scan_source_reuses_digests(src, monkeypatch):
+    first = scan_source(src)
+    monkeypatch.setattr("cosmikase.sync.file_digest", pytest.fail)
+    assert scan_source(src, first).root == first.root
+
+
+def test_initial_sync_copies_everything(src, tmp_path):
+    dest = tmp_path / "dest"
+    stats = sync_themes(src, dest)
+
+    assert sorted(stats.changed) == ["", "gruvbox", "nord"]
+    assert stats.copied == 6
+    assert (dest / "nord" / "backgrounds" / "1.png").read_bytes() == b"nord" * 1000
+    assert (dest / "README.md").read_text() == "# Themes\n"
+    assert os.access(dest / "download.sh", os.X_OK)
+    assert Manifest.load(dest / MANIFEST_NAME).root == scan_source(src).root
+    assert not [p for p in dest.iterdir() if ".sync-" in p.name]
+
+
+def test_resync_is_a_noop(src, tmp_path, monkeypatch):
+    dest = tmp_path / "dest"
+    sync_themes(src, dest)
+    monkeypatch.setattr("cosmikase.sync.file_digest", pytest.fail)
+    monkeypatch.setattr("cosmikase.sync.copy_file", pytest.fail)
+
+    stats = sync_themes(src, dest)
+    assert stats.up_to_date
+    assert stats.themes == 2
+
+
+def test_sync_only_changed_theme(src, tmp_path):
+    dest = tmp_path / "dest"
+    sync_themes(src, dest)
+    before = (dest / "gruvbox" / "backgrounds" / "1.png").stat().st_ino
+    unchanged = (dest / "nord" / "backgrounds" / "1.png").stat().st_ino
+
+    (src / "nord" / "theme.yaml").write_text("name: Nord\n")
+    (src / "nord" / "extra.conf").write_text("x\n")
+    stats = sync_themes(src, dest)
+
+    assert stats.changed == ["nord"]
+    assert (stats.copied, stats.linked) == (2, 1)
+    assert (dest / "nord" / "theme.yaml").read_text() == "name: Nord\n"
+    assert (dest / "nord" / "extra.conf").exists()
+    # Untouched theme and unchanged files keep their inodes
+    assert (dest / "gruvbox" / "backgrounds" / "1.png").stat().st_ino == before
+    assert (dest / "nord" / "backgrounds" / "1.png").stat().st_ino == unchanged
+
+
+def test_sync_deletes_removed_files_and_themes(src, tmp_path):
+    dest = tmp_path / "dest"
+    sync_themes(src, dest)
+    (dest / "custom").mkdir()  # User theme not managed by sync
+
+    (src / "nord" / "backgrounds" / "1.png").unlink()
+    (src / "README.md").unlink()
+    for path in sorted((src / "gruvbox").rglob("*"), reverse=True):
+        path.rmdir() if path.is_dir() else path.unlink()
+    (src / "gruvbox").rmdir()
+    stats = sync_themes(src, dest)
+
+    assert stats.removed == ["gruvbox"]
+    assert not (dest / "gruvbox").exists()
+    assert not (dest / "nord" / "backgrounds" / "1.png").exists()
+    assert not (dest / "README.md").exists()
+    assert (dest / "download.sh").exists()
+    assert (dest / "custom").is_dir()
+
+
+def test_sync_restores_missing_theme(src, tmp_path):
+    dest = tmp_path / "dest"
+    sync_themes(src, dest)
+    for path in sorted((dest / "nord").rglob("*"), reverse=True):
+        path.rmdir() if path.is_dir() else path.unlink()
+    (dest / "nord").rmdir()
+
+    assert sync_themes(src, dest).changed == ["nord"]
+    assert (dest / "nord" / "theme.yaml").exists()
+
+
+def test_sync_repairs_installed_files(src, tmp_path, monkeypatch):
+    dest = tmp_path / "dest"
+    sync_themes(src, dest)
+    (dest / "nord" / "theme.yaml").write_text("name: edited\n")
+    (dest / "gruvbox" / "backgrounds" / "1.png").unlink()
+    (dest / "README.md").write_text("edited\n")
+
+    # Nothing changed in the source, so nothing is hashed
+    monkeypatch.setattr("cosmikase.sync.file_digest", pytest.fail)
+    stats = sync_themes(src, dest)
+    assert stats.changed == ["", "gruvbox", "nord"]
+    assert (dest / "nord" / "theme.yaml").read_text() == "name: nord\n"
+    assert (dest / "gruvbox" / "backgrounds" / "1.png").read_bytes() == b"gruvbox" * 1000
+    assert (dest / "README.md").read_text() == "# Themes\n"
+    assert (stats.copied, stats.linked) == (3, 2)
+    assert sync_themes(src, dest).up_to_date
+
+
+def test_sync_theme_without_files(src, tmp_path):
+    (src / "empty").mkdir()
+    dest = tmp_path / "dest"
+    stats = sync_themes(src, dest)
+    assert "empty" in stats.changed
+    assert (dest / "empty").is_dir()
+
+    (dest / "empty" / "stray.conf").write_text("x\n")
+    assert sync_themes(src, dest).changed == ["empty"]
+    assert list((dest / "empty").iterdir()) == []
+    assert sync_themes(src, dest).up_to_date
+
+
+def test_sync_links_images_from_store(src, tmp_path):
+    for theme in ("nord", "gruvbox"):
+        (src / theme / "backgrounds" / "shared.png").write_bytes(b"same-image" * 100)
+    dest = tmp_path / "dest"
+    store = BlobStore(tmp_path / "blobs")
+    stats = sync_themes(src, dest, store=store)
+
+    # Four images, three unique: each is stored once and linked into the themes
+    assert (stats.copied, stats.shared) == (4, 4)
+    assert len(list(store.blobs())) == 3
+    nord = dest / "nord" / "backgrounds" / "shared.png"
+    assert os.path.samefile(nord, dest / "gruvbox" / "backgrounds" / "shared.png")
+    assert nord.read_bytes() == b"same-image" * 100
+    assert nord.stat().st_mode & 0o200
+
+    # A changed image gets a new blob; unchanged ones stay linked
+    (src / "nord" / "backgrounds" / "1.png").write_bytes(b"new")
+    stats = sync_themes(src, dest, store=store)
+    assert (stats.shared, stats.linked) == (1, 2)
+    assert len(list(store.blobs())) == 4
+    assert (dest / "nord" / "backgrounds" / "1.png").read_bytes() == b"new"
+
+
+def test_dry_run_writes_nothing(src, tmp_path):
+    dest = tmp_path / "dest"
+    stats = sync_themes(src, dest, dry_run=True)
+    assert len(stats.changed) == 3
+    assert not dest.exists()
+
+
+def test_copy_file(tmp_path):
+    source = tmp_path / "a"
+    source.write_bytes(os.urandom(300_000))
+    copy_file(source, tmp_path / "b")
+    assert (tmp_path / "b").read_bytes() == source.read_bytes()
+
+
+def test_cli_sync(src, tmp_path, capsys):
+    dest = tmp_path / "dest"
+    store = tmp_path / "blobs"
+    assert main(["themes", "sync", str(src), str(dest), "--store", str(store)]) == 0
+    out = capsys.readouterr().out
+    assert "Updated 2 of 2 themes and top-level files: gruvbox, nord" in out
+    assert f"linked 0 unchanged and 2 images from {store}" in out
+    assert main(["themes", "sync", str(src), str(dest)]) == 0
+    assert "Themes up to date (2 themes" in capsys.readouterr().out
+    assert main(["themes", "sync", str(tmp_path / "missing"), str(dest)]) == 1
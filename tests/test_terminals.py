@@ -0,0 +1,107 @@
+"""Tests for cosmikase.terminals module."""
+
+import os
+import signal
+
+import pytest
+
+from cosmikase.cli import main
+from cosmikase.terminals import (
+    TERMINALS,
+    Terminal,
+    describe,
+    register_terminal,
+    reload_terminals,
+    scan_processes,
+)
+
+
+@pytest.fixture
+def fake_proc(tmp_path):
+    """Fake /proc with two kitty windows, a ghostty and an alacritty."""
+    proc = tmp_path / "proc"
+    processes = {
+        1: "systemd",
+        100: "kitty",
+        101: "kitty",
+        200: "ghostty",
+        300: "alacritty",
+        400: "bash",
+        500: "a-very-long-terminal-name"[:15],
+    }
+    for pid, comm in processes.items():
+        (proc / str(pid)).mkdir(parents=True)
+        (proc / str(pid) / "comm").write_text(comm + "\n")
+    (proc / "self").mkdir()
+    (proc / "meminfo").write_text("")
+    return proc
+
+
+@pytest.fixture
+def signals(monkeypatch):
+    sent = []
+    monkeypatch.setattr("cosmikase.terminals.os.kill", lambda pid, sig: sent.append((pid, sig)))
+    return sent
+
+
+def test_scan_processes(fake_proc):
+    found = scan_processes(["kitty", "ghostty", "foot"], fake_proc)
+    assert found == {"kitty": [100, 101], "ghostty": [200]}
+
+
+def test_scan_processes_other_user(fake_proc):
+    assert scan_processes(["kitty"], fake_proc, uid=os.getuid() + 1) == {}
+
+
+def test_scan_processes_truncated_names(fake_proc):
+    found = scan_processes(["a-very-long-terminal-name"], fake_proc)
+    assert found == {"a-very-long-terminal-name": [500]}
+
+
+def test_reload_signals_matching_processes(fake_proc, signals):
+    results = {r.terminal.name: r for r in reload_terminals(proc_root=fake_proc)}
+
+    assert sorted(signals) == [(100, signal.SIGUSR1), (101, signal.SIGUSR1), (200, signal.SIGUSR1)]
+    assert describe(results["kitty"]) == "Reloaded kitty (2 processes)"
+    assert describe(results["ghostty"]) == "Reloaded ghostty (1 process)"
+    assert describe(results["alacritty"]) == (
+        "alacritty running (1 process, auto-reloads via inotify)"
+    )
+    assert describe(results["cosmic-term"]) == "cosmic-term not running"
+
+
+def test_reload_dry_run(fake_proc, signals):
+    results = reload_terminals(proc_root=fake_proc, dry_run=True)
+    assert signals == []
+    assert describe(results[0], dry_run=True) == "Would reload kitty (2 processes)"
+
+
+def test_reload_counts_failures(fake_proc, monkeypatch):
+    def kill(pid, sig):
+        if pid == 101:
+            raise PermissionError
+        if pid == 200:
+            raise ProcessLookupError
+
+    monkeypatch.setattr("cosmikase.terminals.os.kill", kill)
+    results = {r.terminal.name: r for r in reload_terminals(proc_root=fake_proc)}
+
+    assert (results["kitty"].signalled, results["kitty"].failed) == (1, 1)
+    assert describe(results["kitty"]) == "Failed to reload kitty (1 of 2 processes)"
+    # Exited between the scan and the signal
+    assert (results["ghostty"].signalled, results["ghostty"].failed) == (0, 0)
+
+
+def test_register_terminal(fake_proc, signals, monkeypatch):
+    monkeypatch.setattr("cosmikase.terminals.TERMINALS", dict(TERMINALS))
+    register_terminal(Terminal("long", ("a-very-long-terminal-name",), signal.SIGHUP))
+
+    results = reload_terminals(proc_root=fake_proc)
+    assert results[-1].terminal.name == "long"
+    assert (500, signal.SIGHUP) in signals
+
+
+def test_cli_terminals_reload(fake_proc, capsys):
+    argv = ["terminals", "reload", "--dry-run", "--proc", str(fake_proc), "--only", "kitty"]
+    assert main(argv) == 0
+    assert capsys.readouterr().out == "  - Would reload kitty (2 processes)\n"
@@ -1,5 +1,12 @@
+import asyncio
 from pathlib import Path
 
+from rich.text import Text
+from textual.app import App
+from textual.widgets import OptionList
+
+from cosmikase.pack import pack_theme
+from cosmikase.theme_tui import PreviewCache, ThemeTui, render_preview, sync_options
 from cosmikase.themes import _unique_dirs, list_themes
 
 
@@ -30,3 +37,116 @@ def test_list_themes_none():
     assert list_themes(None) == []
     assert list_themes(Path("/non/existent/path")) == []
 
+
+def test_render_preview(tmp_themes_dir):
+    text = render_preview(tmp_themes_dir / "nord")
+    assert "Theme: Nord" in text.plain
+    assert "background: #000000" in text.plain
+    assert "Cursor: Nord" in text.plain
+
+
+def test_render_preview_packed_theme(tmp_themes_dir, tmp_path):
+    pack = pack_theme(tmp_themes_dir / "nord", tmp_path / "packs")
+    assert render_preview(pack).plain == render_preview(tmp_themes_dir / "nord").plain
+
+
+def test_render_preview_error(tmp_path):
+    theme = tmp_path / "broken"
+    theme.mkdir()
+    (theme / "theme.yaml").write_text("name: [unclosed")
+    assert "Error loading preview" in render_preview(theme).plain
+
+
+def test_preview_cache_lru():
+    cache = PreviewCache(maxsize=2)
+    cache.put(Path("a"), Text("a"))
+    cache.put(Path("b"), Text("b"))
+    assert cache.get(Path("a")).plain == "a"  # a becomes most recent
+    cache.put(Path("c"), Text("c"))
+    assert Path("b") not in cache
+    assert Path("a") in cache
+    assert len(cache) == 2
+
+
+def test_preview_cache_load_renders_once(tmp_themes_dir, monkeypatch):
+    calls = []
+
+    def fake_render(path):
+        calls.append(path)
+        return Text(path.name)
+
+    monkeypatch.setattr("cosmikase.theme_tui.render_preview", fake_render)
+    cache = PreviewCache()
+    nord = tmp_themes_dir / "nord"
+    assert cache.load(nord).plain == "nord"
+    assert cache.load(nord).plain == "nord"
+    assert calls == [nord]
+
+
+def test_tui_preview_loads_in_background_and_prefetches(tmp_themes_dir, monkeypatch):
+    monkeypatch.setenv("THEMES_DIR", str(tmp_themes_dir))
+
+    async def scenario():
+        app = ThemeTui()
+        async with app.run_test() as pilot:
+            await pilot.pause(0.3)
+            await app.workers.wait_for_complete()
+            # First theme shown, its neighbor prefetched
+            assert app.preview.theme_path == tmp_themes_dir / "catppuccin"
+            assert tmp_themes_dir / "nord" in app.preview_cache
+
+            await pilot.press("down")
+            await pilot.pause()
+            # Cached neighbor is shown without waiting for the debounce
+            assert app.preview.theme_path == tmp_themes_dir / "nord"
+
+    asyncio.run(scenario())
+
+
+def test_sync_options_minimal_updates():
+    async def scenario():
+        app = App()
+        async with app.run_test():
+            option_list = OptionList()
+            await app.mount(option_list)
+
+            sync_options(option_list, ["a", "b"])
+            sync_options(option_list, ["a", "b", "c", "d"])
+            assert [o.id for o in option_list._options] == ["a", "b", "c", "d"]
+
+            option_list.highlighted = 2
+            removed = []
+            original_remove = option_list.remove_option
+            option_list.remove_option = lambda oid: removed.append(oid) or original_remove(oid)
+            sync_options(option_list, ["a", "c"])
+            assert removed == ["b", "d"]
+            assert option_list.highlighted == 1  # "c" stays highlighted
+
+            sync_options(option_list, ["d", "a"])
+            assert [o.id for o in option_list._options] == ["d", "a"]
+
+    asyncio.run(scenario())
+
+
+def test_tui_search_filters_list(tmp_themes_dir, monkeypatch):
+    monkeypatch.setenv("THEMES_DIR", str(tmp_themes_dir))
+
+    async def scenario():
+        app = ThemeTui()
+        async with app.run_test() as pilot:
+            await app.workers.wait_for_complete()
+            await pilot.press("/", "t", "k", "n")
+            await pilot.pause()
+            assert [o.id for o in app.option_list._options] == ["tokyo-night"]
+
+            # Typed characters go to the search box, not to app bindings like "r"
+            await pilot.press("backspace", "backspace", "backspace", "n", "o", "r", "d")
+            await pilot.pause()
+            assert app.query_one("#search").value == "nord"
+            assert [o.id for o in app.option_list._options] == ["nord"]
+
+            await pilot.press("escape")
+            await pilot.pause()
+            assert app.option_list.option_count == 3
+
+    asyncio.run(scenario())
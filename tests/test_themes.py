@@ -36,6 +36,8 @@ class TestThemeLogic(unittest.TestCase):
         self.assertEqual(manifest.colors["bg"], "#000000")
         self.assertEqual(manifest.cursor_theme, "TestCursor")
         self.assertEqual(manifest.wallpaper, "bg.png")
+        self.assertEqual(manifest.colors.rgba("bg"), (0, 0, 0, 255))
+        self.assertEqual(hash(manifest), hash(load_manifest(self.theme_path)))
 
     def test_load_manifest_legacy(self):
         # Create legacy files
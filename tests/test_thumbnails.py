@@ -0,0 +1,156 @@
+"""Tests for cosmikase.thumbnails module."""
+
+import os
+
+import pytest
+
+from cosmikase import thumbnails
+from cosmikase.images import source_digest
+from cosmikase.thumbnails import (
+    Thumbnail,
+    find_preview_image,
+    get_thumbnail,
+    pick_preview_member,
+    prune,
+    render_halfblocks,
+)
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "wallpaper.png"
+    img = Image.new("RGB", (400, 200), (255, 0, 0))
+    img.paste((0, 0, 255), (0, 100, 400, 200))
+    img.save(path)
+    return path
+
+
+def test_ppm_roundtrip():
+    thumb = Thumbnail(2, 1, bytes([10, 32, 9, 255, 255, 255]))
+    assert Thumbnail.from_ppm(thumb.to_ppm()) == thumb
+
+
+def test_ppm_rejects_truncated():
+    with pytest.raises(ValueError):
+        Thumbnail.from_ppm(b"P6\n2 2\n255\n\x00\x00")
+
+
+def test_render_halfblocks():
+    # 1x2 image: red above blue makes one cell
+    thumb = Thumbnail(1, 2, bytes([255, 0, 0, 0, 0, 255]))
+    text = render_halfblocks(thumb)
+    assert text.plain == "▀\n"
+    style = text.spans[0].style
+    assert style.color.name == "#ff0000"
+    assert style.bgcolor.name == "#0000ff"
+
+
+def test_find_preview_image(tmp_path):
+    theme = tmp_path / "theme"
+    (theme / "backgrounds").mkdir(parents=True)
+    (theme / "backgrounds" / "b.jpg").touch()
+    (theme / "backgrounds" / "a.txt").touch()
+    assert find_preview_image(theme) == theme / "backgrounds" / "b.jpg"
+
+    (theme / "backgrounds" / "wall.png").touch()
+    assert find_preview_image(theme, "backgrounds/wall.png") == theme / "backgrounds" / "wall.png"
+
+    (theme / "preview.png").touch()
+    assert find_preview_image(theme, "backgrounds/wall.png") == theme / "preview.png"
+
+
+def test_pick_preview_member():
+    names = ["theme.yaml", "backgrounds/b.jpg", "backgrounds/a.txt", "backgrounds/x/deep.png"]
+    assert pick_preview_member(names) == "backgrounds/b.jpg"
+    names.append("backgrounds/wall.png")
+    assert pick_preview_member(names, "backgrounds/wall.png") == "backgrounds/wall.png"
+    names.append("preview.png")
+    assert pick_preview_member(names, "backgrounds/wall.png") == "preview.png"
+    assert pick_preview_member(["theme.yaml"]) is None
+
+
+def test_get_thumbnail_from_bytes(image_file, tmp_path):
+    cache_dir = tmp_path / "thumbs"
+    digest = source_digest(image_file)
+    data = memoryview(image_file.read_bytes())
+
+    thumb = get_thumbnail(data, 40, 20, cache_dir=cache_dir, digest=digest)
+    assert thumb.pixel(0, 0) == (255, 0, 0)
+    # Same digest, same cache entry as the file on disk
+    assert get_thumbnail(image_file, 40, 20, cache_dir=cache_dir) == thumb
+    assert len(list(cache_dir.glob("*/*.ppm"))) == 1
+    with pytest.raises(TypeError):
+        get_thumbnail(data, 40, 20, cache_dir=cache_dir)
+
+
+def test_get_thumbnail_decodes_once(image_file, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "thumbs"
+    decodes = []
+    original = thumbnails._decode
+    monkeypatch.setattr(thumbnails, "_decode", lambda *a: decodes.append(a) or original(*a))
+
+    thumb = get_thumbnail(image_file, 40, 20, cache_dir=cache_dir)
+    assert (thumb.width, thumb.height) == (40, 20)
+    assert thumb.pixel(0, 0) == (255, 0, 0)
+    assert thumb.pixel(0, 19) == (0, 0, 255)
+
+    assert get_thumbnail(image_file, 40, 20, cache_dir=cache_dir) == thumb
+    assert len(decodes) == 1
+    # A different target size is a separate cache entry
+    get_thumbnail(image_file, 20, 10, cache_dir=cache_dir)
+    assert len(decodes) == 2
+    assert len(list(cache_dir.glob("*/*.ppm"))) == 2
+
+
+def test_get_thumbnail_without_pillow_uses_cache_only(image_file, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "thumbs"
+    thumb = get_thumbnail(image_file, 40, 20, cache_dir=cache_dir)
+
+    monkeypatch.setattr(thumbnails, "Image", None)
+    assert get_thumbnail(image_file, 40, 20, cache_dir=cache_dir) == thumb
+    assert get_thumbnail(image_file, 10, 5, cache_dir=cache_dir) is None
+
+
+def test_get_thumbnail_prunes_once_per_batch(image_file, tmp_path, monkeypatch):
+    prunes = []
+    original = thumbnails.prune
+    monkeypatch.setattr(thumbnails, "prune", lambda *a: prunes.append(a) or original(*a))
+
+    # The first write sizes up the cache; later ones only add to that
+    cache_dir = tmp_path / "thumbs"
+    for width in (40, 30, 20, 10):
+        get_thumbnail(image_file, width, width // 2, cache_dir=cache_dir)
+    assert len(prunes) == 1
+    assert len(list(cache_dir.glob("*/*.ppm"))) == 4
+
+    # Crossing the cap prunes below it, so the next write doesn't prune again
+    prunes.clear()
+    cache_dir = tmp_path / "small"
+    for width in (40, 20, 10):
+        get_thumbnail(image_file, width, width // 2, cache_dir=cache_dir, max_bytes=3000)
+    assert len(prunes) == 2
+    assert sum(p.stat().st_size for p in cache_dir.glob("*/*.ppm")) <= 3000 * 0.8
+
+
+def test_get_thumbnail_missing_source(tmp_path):
+    assert get_thumbnail(tmp_path / "missing.png", 10, 10, cache_dir=tmp_path) is None
+
+
+def test_get_thumbnail_undecodable_image(image_file, tmp_path, monkeypatch):
+    def bomb(*args):
+        raise thumbnails.Image.DecompressionBombError("too many pixels")
+
+    monkeypatch.setattr(thumbnails, "_decode", bomb)
+    assert get_thumbnail(image_file, 40, 20, cache_dir=tmp_path / "thumbs") is None
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    for i, name in enumerate(["old", "mid", "new"]):
+        path = tmp_path / "ab" / f"{name}.ppm"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+
+    assert prune(tmp_path, max_bytes=250) == 1
+    assert sorted(p.stem for p in tmp_path.glob("*/*.ppm")) == ["mid", "new"]
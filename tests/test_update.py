@@ -0,0 +1,110 @@
+"""Tests for cosmikase.update module."""
+
+import time
+
+import pytest
+import yaml
+
+from cosmikase.cli import main
+from cosmikase.config import load_config
+from cosmikase.update import load_steps, plan_update, sudo_keepalive
+
+CONFIG = {
+    "update": {
+        "jobs": 3,
+        "locks": {"network": 2},
+        "steps": [
+            {"name": "apt", "requires": "sh", "locks": ["dpkg", "network"], "command": "echo a"},
+            {"name": "flatpak", "requires": "no-such-flatpak", "command": "echo f"},
+            {"name": "rustup", "locks": ["network"], "command": "echo r"},
+            {"name": "ghostty", "after": ["apt", "flatpak"], "command": "echo g"},
+        ],
+    }
+}
+
+
+def test_plan_update(tmp_path):
+    plan = plan_update(CONFIG, home=tmp_path)
+
+    assert list(plan.nodes) == ["apt", "rustup", "ghostty"]
+    assert plan.skipped == {"flatpak": "no-such-flatpak not found"}
+    assert plan.nodes["apt"].locks == ("dpkg", "network")
+    # Orderings on skipped steps are dropped
+    assert plan.nodes["ghostty"].deps == ("apt",)
+    assert (plan.capacity, plan.jobs) == ({"network": 2}, 3)
+
+
+def test_only_and_skip(tmp_path):
+    plan = plan_update(CONFIG, only=["apt", "ghostty"], skip=["apt"], home=tmp_path)
+
+    assert list(plan.nodes) == ["ghostty"]
+    assert plan.nodes["ghostty"].deps == ()
+    assert plan.skipped["apt"] == plan.skipped["rustup"] == "not selected"
+
+    with pytest.raises(ValueError, match="Unknown update step"):
+        plan_update(CONFIG, only=["snap"], home=tmp_path)
+
+
+def test_invalid_steps():
+    with pytest.raises(ValueError, match="needs a name and a command"):
+        load_steps({"update": {"steps": [{"name": "apt"}]}})
+    with pytest.raises(ValueError, match="Duplicate update step"):
+        load_steps({"update": {"steps": [{"name": "a", "command": "x"}] * 2}})
+    assert load_steps({}) == []
+
+
+def test_repo_config_steps():
+    steps = load_steps(load_config("cosmikase.yaml"))
+    names = [step.name for step in steps]
+
+    assert names[:2] == ["apt", "flatpak"]
+    assert "ghostty" in names and "firmware" in names
+
+
+def test_sudo_keepalive(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "sudo.log"
+    sudo = bin_dir / "sudo"
+    sudo.write_text(f'#!/bin/sh\necho "$*" >> "{log}"\n')
+    sudo.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+
+    with sudo_keepalive(interval=0.02):
+        time.sleep(0.2)
+    calls = log.read_text().splitlines()
+    assert len(calls) >= 2
+    assert set(calls) == {"-n -v"}
+    # Stopped with the block
+    time.sleep(0.1)
+    assert len(log.read_text().splitlines()) == len(calls)
+
+
+def test_cli_update(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("PATH", "/usr/bin:/bin")
+    config = {
+        "update": {
+            "steps": [
+                {"name": "one", "command": "echo first"},
+                {"name": "two", "command": "echo second; exit 4", "after": ["one"]},
+                {"name": "three", "command": "echo third", "after": ["two"]},
+            ]
+        }
+    }
+    config_file = tmp_path / "cosmikase.yaml"
+    config_file.write_text(yaml.dump(config))
+
+    assert main(["update", "-c", str(config_file), "--skip", "two,three"]) == 0
+    out = capsys.readouterr().out
+    assert "[one] first" in out
+    assert "two: skipped (not selected)" in out
+    assert "total" in out
+
+    assert main(["update", "-c", str(config_file)]) == 1
+    captured = capsys.readouterr()
+    assert "[two] second" in captured.out
+    assert "[three] blocked (two failed)" in captured.out
+    assert "Failed update steps: two, three" in captured.err
+
+    assert main(["update", "-c", str(config_file), "--only", "nope"]) == 1
+    assert "Unknown update step(s): nope" in capsys.readouterr().err